@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""Aggregation of ensemble data over realizations
+
+The agg() functions of the ensemble classes compute statistics
+like the mean and quantiles for every row, or group of rows, over
+the realizations in a stacked dataframe. The functions here do
+this for any number of statistics at once: the rows of each group
+are laid out in a (rows in group) x group x column array, and all
+statistics are read off that array, sorting it only once.
+
+The Aggregator class is the engine behind agg() in both ScratchEnsemble
+and VirtualEnsemble. It works out which columns to group by and which
+to aggregate for each key, and remembers this for as long as the
+columns and dtypes for the key stay the same.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import re
+import functools
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .etc import Interaction
+from .parallel import parallel_map
+from .realization import parse_number
+from .summarycube import array_stats
+from .virtualrealization import VirtualRealization
+
+xfmu = Interaction()
+logger = xfmu.functionlogger(__name__)
+
+QUANTILEMATCHER = re.compile(r"p(\d\d)")
+SUPPORTED_AGGREGATIONS = ["mean", "median", "min", "max", "std", "var"]
+
+# Look for data we should group by. This would be beneficial
+# to get from a metadata file, and not by pure guesswork.
+GROUPBYCOLUMNCANDIDATES = [
+    "DATE",
+    "FIPNUM",
+    "ZONE",
+    "REGION",
+    "JOBINDEX",
+    "Zone",
+    "Region_index",
+]
+
+
+class Aggregator(object):
+    """Aggregation engine for ensembles
+
+    Keeps, for each key, the plan for aggregating its data, that is
+    the columns to group by and the numerical columns. The plan is
+    reused as long as the columns and dtypes of the data for the
+    key are unchanged.
+
+    Args:
+        group_strings: bool, whether to group by all string columns
+            (except in STATUS), as ScratchEnsemble does, or only by
+            the columns in GROUPBYCOLUMNCANDIDATES, as VirtualEnsemble
+            does.
+        parse_scalars: bool, whether aggregated scalars are returned
+            as numbers, as in ScratchEnsemble, or left as one-element
+            Series, as in VirtualEnsemble.
+    """
+
+    def __init__(self, group_strings=True, parse_scalars=True):
+        self.group_strings = group_strings
+        self.parse_scalars = parse_scalars
+        # key -> (schema, plan)
+        self._plans = {}
+
+    def agg(
+        self,
+        ensemble,
+        aggregation,
+        keylist=None,
+        excludekeys=None,
+        workers=None,
+        executor=None,
+    ):
+        """Aggregate the data in an ensemble
+
+        Args:
+            ensemble: ScratchEnsemble or VirtualEnsemble
+            aggregation: string or list of strings, see
+                check_aggregations()
+            keylist: list of strings with keys to include.
+                If empty (default), all keys are included.
+            excludekeys: list of strings, keys to exclude if
+                keylist is empty.
+            workers: int, number of threads to aggregate keys with.
+            executor: concurrent.futures.Executor to aggregate keys
+                with, overrides workers.
+
+        Returns:
+            VirtualRealization, or if aggregation is a list, a
+            dict from each aggregation to its VirtualRealization.
+        """
+        if isinstance(aggregation, str):
+            aggregations = [aggregation]
+        else:
+            aggregations = list(aggregation)
+        check_aggregations(aggregations)
+
+        # Generate new empty objects:
+        vreals = OrderedDict(
+            [
+                (agg, VirtualRealization(ensemble.name + " " + agg))
+                for agg in aggregations
+            ]
+        )
+
+        # Determine keys to use
+        if isinstance(keylist, str):
+            keylist = [keylist]
+        if not keylist:  # Empty list means all keys.
+            if not isinstance(excludekeys, list):
+                excludekeys = [excludekeys]
+            keys = set(ensemble.keys()) - set(excludekeys)
+        else:
+            keys = keylist
+
+        # Ensure we operate on fully qualified localpath's
+        keys = [ensemble.shortcut2path(key) for key in keys]
+        for (key, _, _), aggregated in parallel_map(
+            functools.partial(
+                _aggregate_item,
+                aggregations=aggregations,
+                parse_scalars=self.parse_scalars,
+            ),
+            self._planned_items(ensemble, keys),
+            workers,
+            executor,
+        ):
+            for agg, result in aggregated.items():
+                vreals[agg].append(key, result)
+        if isinstance(aggregation, str):
+            return vreals[aggregation]
+        return vreals
+
+    def plan(self, key, dframe):
+        """Return the aggregation plan for the data of a key
+
+        Args:
+            key: string, the key the data belongs to
+            dframe: dataframe with the data for all realizations
+
+        Returns:
+            tuple with the list of columns to group by and the list
+            of numerical columns to aggregate. None if there is no
+            numerical data.
+        """
+        schema = tuple(zip(dframe.columns, dframe.dtypes))
+        cached = self._plans.get(key)
+        if cached is not None and cached[0] == schema:
+            return cached[1]
+        plan = _make_plan(key, dframe, self.group_strings)
+        self._plans[key] = (schema, plan)
+        return plan
+
+    def _planned_items(self, ensemble, keys):
+        """Yield the work for aggregating each key with numerical data
+
+        The plans are made here, in the calling thread, so that only
+        the data to aggregate is passed on to the workers.
+
+        Yields:
+            tuple with the key, a dataframe with the columns to group
+            by and to aggregate, and the list of columns to group by.
+        """
+        for key in keys:
+            data = ensemble.get_df(key)
+            plan = self.plan(key, data)
+            if plan is None:
+                logger.info("No numerical data to aggregate in %s", key)
+                continue
+            groupby, columns = plan
+            yield key, data[groupby + columns], groupby
+
+
+def _aggregate_item(item, aggregations, parse_scalars=True):
+    """Aggregate the data for one key, to be run by parallel_map()
+
+    Args:
+        item: tuple with the key, the data and the columns to group by,
+            see Aggregator._planned_items()
+        aggregations: list of supported aggregations
+        parse_scalars: bool, see Aggregator
+
+    Returns:
+        dict from aggregation to the aggregated data.
+    """
+    key, data, groupby = item
+    aggregated = aggregate_frame(data, groupby, aggregations)
+    if not parse_scalars:
+        return aggregated
+    for agg, result in aggregated.items():
+        # We have to recognize scalars.
+        if (
+            isinstance(result, pd.Series)
+            and len(result) == 1
+            and result.index.values[0] == key
+        ):
+            aggregated[agg] = parse_number(result.values[0])
+    return aggregated
+
+
+def _make_plan(key, dframe, group_strings=True):
+    """Determine the columns to group by and to aggregate for a key
+
+    See Aggregator.plan()
+    """
+    # This column should never appear in aggregated data
+    dframe = dframe.drop(columns="REAL", errors="ignore")
+
+    # Pick up string columns (or non-numeric values)
+    # (when strings are used as values, this breaks, but it is also
+    # meaningless to aggregate them. Most likely, strings in columns
+    # is a label we should group over)
+    stringcolumns = [x for x in dframe.columns if dframe.dtypes[x] == "object"]
+
+    groupby = [x for x in GROUPBYCOLUMNCANDIDATES if x in dframe.columns]
+
+    # Add remainding string columns to columns to group by unless
+    # we are working with the STATUS dataframe, which has too many strings..
+    if group_strings and key != "STATUS":
+        groupby = groupby + [x for x in stringcolumns if x not in groupby]
+
+    # Filter to only numerical columns and groupby columns:
+    columns = [
+        x for x in dframe.select_dtypes(include="number").columns if x not in groupby
+    ]
+    dtypes = dframe[groupby + columns].dtypes.unique()
+    if not (int in dtypes or float in dtypes):
+        return None
+    if groupby:
+        logger.info("Grouping %s by %s", key, groupby)
+    return groupby, columns
+
+
+def check_aggregations(aggregations):
+    """Raise ValueError for aggregations that are not supported
+
+    Args:
+        aggregations: list of strings, 'mean', 'median', 'min',
+            'max', 'std', 'var' or 'pXX' where XX is a number.
+    """
+    for aggregation in aggregations:
+        if aggregation not in SUPPORTED_AGGREGATIONS and not QUANTILEMATCHER.match(
+            aggregation
+        ):
+            raise ValueError(
+                "{arg} is not a".format(arg=aggregation)
+                + "supported ensemble aggregation"
+            )
+
+
+def aggregate_frame(data, groupby, aggregations):
+    """Compute a list of statistics for a dataframe, in one pass
+
+    Statistics are computed for every group of rows, or for the entire
+    dataframe if there is nothing to group by. NaN values are ignored,
+    as are rows with NaN in any of the groupby columns. Quantiles
+    'pXX' are the XX percentiles, not the oil industry notion.
+
+    Args:
+        data: dataframe with the groupby columns and numerical columns
+        groupby: list of column names to group by, may be empty.
+        aggregations: list of supported aggregations, see
+            check_aggregations()
+
+    Returns:
+        dict from aggregation to the result. If groupby is not empty,
+        the result is a dataframe with the groupby columns and the
+        aggregated columns, with one row for each group, sorted by the
+        groupby columns. Otherwise, it is a Series indexed by the
+        aggregated column names.
+    """
+    valuecolumns = [col for col in data.columns if col not in groupby]
+    values = data[valuecolumns].values.astype(np.float64)
+    if groupby:
+        groupcodes = np.asarray(
+            data.groupby(groupby, sort=True).ngroup().values, dtype=np.float64
+        )
+        # Rows with NaN in the groupby columns are not in any group
+        keep = groupcodes >= 0
+        groupcodes = groupcodes[keep].astype(int)
+        values = values[keep]
+        ngroups = groupcodes.max() + 1 if len(groupcodes) else 0
+    else:
+        groupcodes = np.zeros(len(values), dtype=int)
+        ngroups = 1
+
+    # Position of each row within its group:
+    order = np.argsort(groupcodes, kind="mergesort")
+    starts = np.searchsorted(groupcodes[order], np.arange(ngroups))
+    positions = np.empty(len(groupcodes), dtype=int)
+    positions[order] = np.arange(len(groupcodes)) - starts[groupcodes[order]]
+    # (at least one row, all NaN, when there is no data)
+    groupsize = positions.max() + 1 if len(positions) else 1
+
+    cube = np.full((groupsize, ngroups, len(valuecolumns)), np.nan)
+    cube[positions, groupcodes] = values
+
+    quantiles = [x for x in _quantile_iter(aggregations) if x is not None]
+    statistics = array_stats(cube, quantiles)
+    mean, maximum, minimum = statistics[0], statistics[-2], statistics[-1]
+    quantilevalues = dict(zip(quantiles, statistics[1:-2]))
+    if "std" in aggregations or "var" in aggregations:
+        count = np.sum(~np.isnan(cube), axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = np.nansum((cube - mean) ** 2, axis=0) / (count - 1)
+        variance[count < 2] = np.nan
+
+    if groupby:
+        groupkeys = data[groupby][keep].iloc[order[starts]].reset_index(drop=True)
+    intcolumns = [
+        col for col in valuecolumns if pd.api.types.is_integer_dtype(data[col].dtype)
+    ]
+
+    results = {}
+    for aggregation, quantile in zip(aggregations, _quantile_iter(aggregations)):
+        if aggregation == "mean":
+            result = mean
+        elif aggregation == "min":
+            result = minimum
+        elif aggregation == "max":
+            result = maximum
+        elif aggregation == "var":
+            result = variance
+        elif aggregation == "std":
+            result = np.sqrt(variance)
+        else:
+            result = quantilevalues[quantile]
+        aggregated = pd.DataFrame(result, columns=valuecolumns)
+        if aggregation in ["min", "max"] and len(values):
+            # Minimum and maximum of integers are integers
+            for col in intcolumns:
+                aggregated[col] = aggregated[col].astype(data[col].dtype)
+        if groupby:
+            results[aggregation] = pd.concat([groupkeys, aggregated], axis=1)
+        else:
+            results[aggregation] = aggregated.iloc[0].rename(None)
+    return results
+
+
+def _quantile_iter(aggregations):
+    """Yield the quantile as a fraction for each aggregation,
+    None for those that are not quantiles"""
+    for aggregation in aggregations:
+        if aggregation == "median":
+            yield 0.5
+        elif QUANTILEMATCHER.match(aggregation):
+            yield int(QUANTILEMATCHER.match(aggregation).group(1)) / 100.0
+        else:
+            yield None
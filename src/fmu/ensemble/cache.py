@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""Caches used by realizations and ensembles
+
+DiskCache is a persistent cache of parsed file contents, stored in a
+directory of pickle files. Entries are keyed on the path, modification
+time and size of the source files together with the parse arguments,
+so an entry is only reused as long as the source files are unchanged.
+Numpy arrays can also be stored, in the uncompressed .npz format.
+
+LRUCache is an in-memory cache with a budget on the number of
+entries and/or their total size in bytes, evicting the least recently
+used entries when the budget is exceeded. It is used for sharing
+EclSum objects, grid geometry and open INIT and UNRST files between
+realizations.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from six.moves import cPickle as pickle
+
+import numpy as np
+import pandas as pd
+
+from .etc import Interaction
+
+xfmu = Interaction()
+logger = xfmu.functionlogger(__name__)
+
+# Bump this if the format of cached objects changes
+CACHE_FORMAT_VERSION = 1
+
+
+class DiskCache(object):
+    """Persistent cache of parsed file contents
+
+    Stale entries (for files that have since changed) are never
+    returned, but they are not removed either. Delete the cache
+    directory to reclaim the space.
+
+    Args:
+        cachedir: str, path to a directory for the cache files.
+            Created if it does not exist.
+    """
+
+    def __init__(self, cachedir):
+        self.cachedir = os.path.abspath(cachedir)
+        if not os.path.isdir(self.cachedir):
+            try:
+                os.makedirs(self.cachedir)
+            except OSError:
+                # Might have been created concurrently
+                if not os.path.isdir(self.cachedir):
+                    raise
+
+    def key(self, fullpaths, *args):
+        """Compute a cache key for a set of source files
+
+        Args:
+            fullpaths: str or list of str, the files the
+                cached object is parsed from. Files that do not
+                exist are allowed, and are part of the key as such.
+            args: Extra arguments that influence the parsing,
+                their repr() is included in the key.
+
+        Returns:
+            str with a hex digest.
+        """
+        if not isinstance(fullpaths, (list, tuple)):
+            fullpaths = [fullpaths]
+        fingerprint = [CACHE_FORMAT_VERSION, pd.__version__]
+        for fullpath in fullpaths:
+            try:
+                stat = os.stat(fullpath)
+                fingerprint.append((fullpath, stat.st_mtime, stat.st_size))
+            except OSError:
+                fingerprint.append((fullpath, None, None))
+        fingerprint.extend(args)
+        return hashlib.sha1(repr(fingerprint).encode("utf-8")).hexdigest()
+
+    def _filename(self, key, suffix=".pickle"):
+        return os.path.join(self.cachedir, key + suffix)
+
+    def __contains__(self, key):
+        return os.path.exists(self._filename(key))
+
+    def get(self, key):
+        """Load a cached object
+
+        Raises:
+            KeyError if the object is not in the cache, or
+            could not be loaded.
+        """
+        try:
+            with open(self._filename(key), "rb") as filehandle:
+                return pickle.load(filehandle)
+        except (IOError, OSError):
+            raise KeyError(key)
+        except Exception:  # pylint: disable=broad-except
+            # Corrupt or incompatible cache file
+            logger.warning("Could not load cache file %s", self._filename(key))
+            raise KeyError(key)
+
+    def put(self, key, value):
+        """Store an object in the cache.
+
+        Failure to write is logged, not raised, as the cache
+        is only an optimization."""
+        filename = self._filename(key)
+        tmpfilename = None
+        try:
+            (tmpfd, tmpfilename) = tempfile.mkstemp(dir=self.cachedir, suffix=".tmp")
+            with os.fdopen(tmpfd, "wb") as filehandle:
+                pickle.dump(value, filehandle, protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomic, so that concurrent readers never see partial files
+            os.rename(tmpfilename, filename)
+        except (IOError, OSError, pickle.PicklingError):
+            logger.warning("Could not write cache file %s", filename)
+            if tmpfilename and os.path.exists(tmpfilename):
+                os.remove(tmpfilename)
+
+    def get_arrays(self, key):
+        """Load a dict of numpy arrays stored by put_arrays()
+
+        Raises:
+            KeyError if the arrays are not in the cache, or
+            could not be loaded.
+        """
+        filename = self._filename(key, ".npz")
+        if not os.path.exists(filename):
+            raise KeyError(key)
+        try:
+            with np.load(filename, allow_pickle=False) as npzfile:
+                return {name: npzfile[name] for name in npzfile.files}
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not load cache file %s", filename)
+            raise KeyError(key)
+
+    def put_arrays(self, key, arrays):
+        """Store a dict of numpy arrays in the cache.
+
+        Failure to write is logged, not raised."""
+        filename = self._filename(key, ".npz")
+        tmpfilename = None
+        try:
+            (tmpfd, tmpfilename) = tempfile.mkstemp(dir=self.cachedir, suffix=".tmp")
+            with os.fdopen(tmpfd, "wb") as filehandle:
+                np.savez(filehandle, **arrays)
+            os.rename(tmpfilename, filename)
+        except (IOError, OSError):
+            logger.warning("Could not write cache file %s", filename)
+            if tmpfilename and os.path.exists(tmpfilename):
+                os.remove(tmpfilename)
+
+    def cached(self, fullpaths, parser, *args):
+        """Return parser(*args), from the cache if possible.
+
+        Args:
+            fullpaths: str or list of str, the files the
+                parser reads.
+            parser: module level function doing the parsing.
+            args: arguments to the parser.
+        """
+        key = self.key(fullpaths, parser.__name__, args)
+        try:
+            return self.get(key)
+        except KeyError:
+            pass
+        value = parser(*args)
+        self.put(key, value)
+        return value
+
+
+class LRUCache(object):
+    """In-memory least-recently-used cache with a count and/or byte budget
+
+    The size in bytes of each entry must be supplied by the caller
+    when inserting, it is not computed. Lookups and insertions are
+    thread safe.
+
+    Counters for hits, misses and evictions are available as attributes,
+    and through stats().
+
+    Args:
+        maxcount: int, maximal number of entries. None means no limit.
+        maxbytes: int, maximal total size of entries in bytes. None
+            means no limit.
+        on_evict: function called with the key and the value of
+            entries that are evicted, replaced by put() or removed by
+            clear(), f.ex. to close files. Not called by pop().
+    """
+
+    def __init__(self, maxcount=None, maxbytes=None, on_evict=None):
+        self.maxcount = maxcount
+        self.maxbytes = maxbytes
+        self.on_evict = on_evict
+        self._entries = OrderedDict()  # key -> (value, nbytes), oldest first
+        self._lock = threading.RLock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return a cached value, and mark it as recently used.
+
+        Counts as a hit or a miss."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            entry = self._entries.pop(key)
+            self._entries[key] = entry
+            return entry[0]
+
+    def peek(self, key, default=None):
+        """Return a cached value without affecting order or counters"""
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+            return default
+
+    def put(self, key, value, nbytes=0):
+        """Insert a value, evicting least recently used values if
+        the budget is exceeded.
+
+        An entry larger than the whole byte budget is not kept.
+
+        Args:
+            key: hashable key
+            value: object to cache
+            nbytes: int, the size of the value in bytes.
+        """
+        with self._lock:
+            if key in self._entries:
+                oldvalue = self.pop(key)
+                if self.on_evict is not None and oldvalue is not value:
+                    self.on_evict(key, oldvalue)
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Remove a value from the cache and return it"""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value, nbytes = self._entries.pop(key)
+            self.nbytes -= nbytes
+            return value
+
+    def resize(self, maxcount=None, maxbytes=None):
+        """Change the budget, evicting values if necessary
+
+        Args:
+            maxcount: int, maximal number of entries. None means no limit.
+            maxbytes: int, maximal total size in bytes. None means no limit.
+        """
+        with self._lock:
+            self.maxcount = maxcount
+            self.maxbytes = maxbytes
+            self._evict()
+
+    def clear(self):
+        """Remove all values, and reset the counters"""
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            if self.on_evict is not None:
+                for key, (value, _) in entries:
+                    self.on_evict(key, value)
+
+    def _over_budget(self):
+        if self.maxcount is not None and len(self._entries) > self.maxcount:
+            return True
+        if self.maxbytes is not None and self.nbytes > self.maxbytes:
+            return True
+        return False
+
+    def _evict(self):
+        while self._entries and self._over_budget():
+            key = next(iter(self._entries))
+            value = self.pop(key)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+
+    def stats(self):
+        """Return a dict with the counters and the current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "count": len(self._entries),
+                "nbytes": self.nbytes,
+                "maxcount": self.maxcount,
+                "maxbytes": self.maxbytes,
+            }
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (
+            "<LRUCache, {count} entries, {nbytes} bytes, "
+            + "{hits} hits, {misses} misses>"
+        ).format(**self.stats())
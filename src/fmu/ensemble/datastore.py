@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""Storage of internalized data for virtual ensembles and realizations
+
+LazyDataStore is a dictionary where values can be registered as
+functions that load them, to be called on first access. This is used
+for data loaded from disk, so that only data actually used is read.
+
+write_frame() and read_frame() store dataframes as CSV, or in
+the columnar Parquet format if pyarrow is installed. The information
+needed to read a dataframe back, including the dtypes of the columns
+for CSV, is returned as a JSON serializable dict meant for a manifest.
+write_value() and read_value() do the same for dicts and scalars,
+whose values are kept in the manifest itself.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import json
+import datetime
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping  # Python 2
+from collections import OrderedDict
+
+import six
+import numpy as np
+import pandas as pd
+
+from .etc import Interaction
+
+try:
+    import pyarrow  # noqa
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+xfmu = Interaction()
+logger = xfmu.functionlogger(__name__)
+
+# Bump this if the on-disk format changes
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "_manifest.json"
+
+
+class _Unloaded(object):
+    """Placeholder for a value not yet loaded"""
+
+    __slots__ = ["loader"]
+
+    def __init__(self, loader):
+        self.loader = loader
+
+
+class LazyDataStore(MutableMapping):
+    """Dictionary where values can be loaded on first access
+
+    Values are set as in a dict, or registered with set_loader() as
+    a function without arguments returning the value. The function is
+    called the first time the value is accessed, and the value is kept.
+
+    Keys are kept in insertion order.
+
+    Args:
+        data: dict with initial values. Optional. The dict is used
+            as storage, not copied.
+        on_change: function called with the key when a value is set,
+            registered or deleted, f.ex. to invalidate what has been
+            computed from the value. Not called when a value is loaded.
+    """
+
+    def __init__(self, data=None, on_change=None):
+        if data is None:
+            data = OrderedDict()
+        self._values = data
+        self.on_change = on_change
+
+    def set_loader(self, key, loader):
+        """Register a function that loads the value for key"""
+        self._values[key] = _Unloaded(loader)
+        self._changed(key)
+
+    def is_loaded(self, key):
+        """Check whether the value for a key is in memory"""
+        return not isinstance(self._values[key], _Unloaded)
+
+    def __getitem__(self, key):
+        value = self._values[key]
+        if isinstance(value, _Unloaded):
+            logger.info("Loading %s", key)
+            value = value.loader()
+            self._values[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._values[key] = value
+        self._changed(key)
+
+    def __delitem__(self, key):
+        del self._values[key]
+        self._changed(key)
+
+    def _changed(self, key):
+        if self.on_change is not None:
+            self.on_change(key)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __repr__(self):
+        return "<LazyDataStore, {} keys, {} loaded>".format(
+            len(self), sum([self.is_loaded(key) for key in self])
+        )
+
+
+def write_frame(dframe, directory, localpath, fileformat="csv"):
+    """Write a dataframe to a directory, at its localpath
+
+    Parquet files get the extension .parquet added to the localpath,
+    CSV files are written to the localpath as is. If Parquet is
+    requested, but the dataframe can't be written as Parquet
+    (f.ex. for columns with mixed types), CSV is used.
+
+    The index of the dataframe is not written.
+
+    Args:
+        dframe: pd.DataFrame
+        directory: str, directory to write to.
+        localpath: str, the name of the data, may include subdirectories.
+        fileformat: str, "parquet" or "csv". Default is CSV.
+
+    Returns:
+        dict with information for read_frame(), JSON serializable.
+    """
+    if fileformat not in ["parquet", "csv"]:
+        raise ValueError("Unsupported file format " + str(fileformat))
+    if fileformat == "parquet" and not HAVE_PYARROW:
+        raise ValueError("pyarrow is required for Parquet files")
+
+    dirname = os.path.join(directory, os.path.dirname(localpath))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    entry = _frame_entry(dframe)
+    if fileformat == "parquet":
+        entry["file"] = localpath + ".parquet"
+        entry["format"] = "parquet"
+        try:
+            dframe.reset_index(drop=True).to_parquet(
+                os.path.join(directory, entry["file"]), engine="pyarrow", index=False
+            )
+            return entry
+        except (ValueError, TypeError, pyarrow.ArrowException) as err:
+            logger.warning(
+                "Could not write %s as Parquet, using CSV: %s", localpath, str(err)
+            )
+            os.remove(os.path.join(directory, entry["file"]))
+    entry["file"] = localpath
+    entry["format"] = "csv"
+    jsoncolumns = _object_list_columns(dframe)
+    if jsoncolumns:
+        # Lists can't be written to CSV cells, JSON encode them
+        entry["jsoncolumns"] = jsoncolumns
+        dframe = dframe.copy()
+        for column in jsoncolumns:
+            dframe[column] = _map_notnull(dframe[column], json.dumps)
+    dframe.to_csv(os.path.join(directory, entry["file"]), index=False)
+    return entry
+
+
+def read_frame(directory, entry):
+    """Read a dataframe written by write_frame()
+
+    Parquet files are memory mapped. For CSV files, the dtypes
+    recorded when writing are restored where possible.
+
+    Args:
+        directory: str, the directory given to write_frame()
+        entry: dict returned by write_frame()
+
+    Returns:
+        pd.DataFrame
+    """
+    filename = os.path.join(directory, entry["file"])
+    if entry["format"] == "parquet":
+        if not HAVE_PYARROW:
+            raise ValueError("pyarrow is required to read " + filename)
+        dframe = pd.read_parquet(filename, engine="pyarrow", memory_map=True)
+        dframe.columns = entry["columns"]
+        return dframe
+
+    if entry["rows"] == 0:
+        dframe = pd.DataFrame(columns=entry["columns"])
+    else:
+        dframe = pd.read_csv(filename)
+    dframe = _restore_dtypes(dframe, entry)
+    for column in entry.get("jsoncolumns", []):
+        dframe[column] = _map_notnull(dframe[column], json.loads)
+    return dframe
+
+
+def _frame_entry(dframe):
+    """Return the columns and dtypes of a dataframe as a dict"""
+    entry = {
+        "columns": dframe.columns.tolist(),
+        "dtypes": [str(dtype) for dtype in dframe.dtypes],
+        "rows": len(dframe),
+    }
+    datecolumns = _object_date_columns(dframe)
+    if datecolumns:
+        entry["datecolumns"] = datecolumns
+    return entry
+
+
+def _restore_dtypes(dframe, entry):
+    """Convert columns read from text back to the dtypes in an entry"""
+    dframe.columns = entry["columns"]
+    for column, dtype in zip(entry["columns"], entry["dtypes"]):
+        if str(dframe[column].dtype) == dtype:
+            continue
+        try:
+            if dtype.startswith("datetime"):
+                dframe[column] = _to_datetime(dframe[column], dtype)
+            else:
+                dframe[column] = dframe[column].astype(dtype)
+        except (ValueError, TypeError):
+            logger.warning("Could not convert %s to %s", str(column), dtype)
+    for column in entry.get("datecolumns", []):
+        dframe[column] = pd.to_datetime(dframe[column]).dt.date
+    return dframe
+
+
+def _to_datetime(series, dtype):
+    """Convert nanoseconds since epoch or ISO strings to a datetime dtype
+
+    Values are parsed as UTC, so that strings with and without a
+    timezone designator give the same result, and the timezone is
+    dropped again for naive datetime dtypes."""
+    if pd.api.types.is_numeric_dtype(series):
+        values = pd.to_datetime(series, unit="ns", utc=True)
+    else:
+        values = pd.to_datetime(series, utc=True)
+    if "," not in dtype:
+        values = values.dt.tz_localize(None)
+    return values.astype(dtype)
+
+
+def _object_date_columns(dframe):
+    """Return the names of object columns holding datetime.date
+    values (not datetime.datetime), which CSV would read back as strings"""
+    columns = []
+    for column in dframe.columns:
+        if dframe[column].dtype != object:
+            continue
+        values = dframe[column].dropna()
+        if (
+            len(values)
+            and isinstance(values.iloc[0], datetime.date)
+            and not isinstance(values.iloc[0], datetime.datetime)
+        ):
+            columns.append(column)
+    return columns
+
+
+def _object_list_columns(dframe):
+    """Return the names of object columns holding lists or dicts"""
+    return [
+        column
+        for column in dframe.columns
+        if dframe[column].dtype == object
+        and dframe[column].map(lambda x: isinstance(x, (list, dict))).any()
+    ]
+
+
+def _map_notnull(series, func):
+    """Apply a function to the values in a series that are not null"""
+    notnull = series.notnull()
+    series = series.astype(object)
+    series[notnull] = series[notnull].map(func)
+    return series
+
+
+def write_manifest(directory, manifest):
+    """Write a manifest dict as JSON to a directory"""
+    manifest = dict(manifest)
+    manifest["version"] = MANIFEST_VERSION
+    with open(os.path.join(directory, MANIFEST_FILENAME), "w") as fhandle:
+        json.dump(manifest, fhandle, indent=2, default=str)
+
+
+def read_manifest(directory):
+    """Read the manifest written by write_manifest()
+
+    Returns:
+        dict, None if there is no manifest in the directory.
+
+    Raises:
+        ValueError if the manifest is from a newer version.
+    """
+    filename = os.path.join(directory, MANIFEST_FILENAME)
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as fhandle:
+        manifest = json.load(fhandle, object_pairs_hook=OrderedDict)
+    if manifest.get("version", 0) > MANIFEST_VERSION:
+        raise ValueError(
+            "Manifest version {} in {} is not supported".format(
+                manifest.get("version"), directory
+            )
+        )
+    return manifest
+
+
+def pack_value(value):
+    """Pack a dataframe, dict or scalar into a JSON serializable dict
+
+    Dataframes are stored as a list of rows, together with the
+    column dtypes needed to restore them.
+
+    Args:
+        value: pd.DataFrame, dict, str, int or float
+
+    Returns:
+        dict with the keys "kind" ("frame", "dict" or "scalar") and
+        "value", and for dataframes, their columns and dtypes.
+    """
+    if isinstance(value, pd.DataFrame):
+        entry = _frame_entry(value)
+        entry["kind"] = "frame"
+        entry["value"] = json.loads(
+            value.to_json(orient="values", date_format="epoch", date_unit="ns")
+        )
+        return entry
+    if isinstance(value, (dict, pd.Series)):
+        return {
+            "kind": "dict",
+            "value": OrderedDict(
+                [(str(key), _jsonable(keyvalue)) for key, keyvalue in value.items()]
+            ),
+        }
+    value = _jsonable(value)
+    if not isinstance(value, (six.string_types, float, int)):
+        raise TypeError("Can't pack value of type {}".format(type(value)))
+    return {"kind": "scalar", "value": value}
+
+
+def unpack_value(entry):
+    """Restore a value packed by pack_value()"""
+    if entry["kind"] == "frame":
+        return _restore_dtypes(
+            pd.DataFrame(entry["value"], columns=entry["columns"]), entry
+        )
+    if entry["kind"] == "dict":
+        return dict(entry["value"])
+    return entry["value"]
+
+
+def write_value(value, directory, localpath, fileformat="csv"):
+    """Write a dataframe, dict or scalar to a directory
+
+    Dataframes are written by write_frame(). Dicts and scalars
+    are packed into the returned entry, to be stored in the manifest,
+    and in addition written to the localpath as text, key-value pairs
+    or a single value, for human readers.
+
+    Args:
+        value: pd.DataFrame, dict, str, int or float
+        directory: str, directory to write to.
+        localpath: str, the name of the data, may include subdirectories.
+        fileformat: str, file format for dataframes, see write_frame()
+
+    Returns:
+        dict with information for read_value(), JSON serializable.
+    """
+    if isinstance(value, pd.DataFrame):
+        entry = write_frame(value, directory, localpath, fileformat=fileformat)
+        entry["kind"] = "frame"
+        return entry
+    entry = pack_value(value)
+    entry["file"] = localpath
+    dirname = os.path.join(directory, os.path.dirname(localpath))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+    with open(os.path.join(directory, localpath), "w") as fhandle:
+        if entry["kind"] == "dict":
+            for key, keyvalue in entry["value"].items():
+                fhandle.write(key + " " + str(keyvalue) + "\n")
+        else:
+            fhandle.write(str(entry["value"]))
+    return entry
+
+
+def read_value(directory, entry):
+    """Read a value written by write_value()"""
+    if entry["kind"] == "frame":
+        return read_frame(directory, entry)
+    return unpack_value(entry)
+
+
+def _jsonable(value):
+    """Convert numpy scalars to the corresponding Python types"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
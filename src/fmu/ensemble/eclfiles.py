@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Shared access to Eclipse INIT and UNRST files
+
+Opening an EclFile only indexes the keyword headers in the file, the
+data of a keyword is loaded the first time it is asked for, and then
+kept in memory until the EclFile is closed. Keeping an EclFile open for
+every realization in a large ensemble thus ends up holding most of
+every restart file in memory.
+
+EclFileCache keeps a bounded number of EclFile objects open, shared by
+all realizations, and closes the least recently used file when the
+budget is exceeded. A file is not closed while it is being read from,
+but as soon as the last reader is done. Readers must copy what they
+need from the file before they are done with it.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import threading
+import contextlib
+
+from ecl.eclfile import EclFile
+from ecl import EclFileFlagEnum
+
+from .etc import Interaction
+from .cache import LRUCache
+
+xfmu = Interaction()
+logger = xfmu.functionlogger(__name__)
+
+
+class EclFileCache(object):
+    """Bounded set of open INIT and UNRST files
+
+    Files are keyed on their path, modification time and size, so a
+    file that is rewritten is opened again.
+
+    Args:
+        maxcount: int, maximal number of open files. 0 means that
+            files are closed right after each read.
+    """
+
+    def __init__(self, maxcount=16):
+        self._lock = threading.RLock()
+        self._files = LRUCache(maxcount=maxcount, on_evict=self._evicted)
+
+    @contextlib.contextmanager
+    def open(self, filename):
+        """Context manager giving the EclFile for a file, opening it
+        if it is not already open
+
+        The EclFile, and any keyword obtained from it without copying,
+        must not be used after the with-block.
+
+        Args:
+            filename: str, path to an INIT or UNRST file
+
+        Raises:
+            IOError if the file can not be opened
+        """
+        stat = os.stat(filename)
+        key = (filename, stat.st_mtime, stat.st_size)
+        with self._lock:
+            handle = self._files.get(key)
+            if handle is not None:
+                handle.readers += 1
+        if handle is None:
+            # Indexing a large file takes time, do not block other readers.
+            logger.info("Opening %s", filename)
+            handle = _EclFileHandle(
+                EclFile(filename, flags=EclFileFlagEnum.ECL_FILE_CLOSE_STREAM)
+            )
+            with self._lock:
+                handle.readers += 1
+                if key in self._files:
+                    # Opened concurrently by another reader, use
+                    # ours once and close it
+                    handle.evicted = True
+                else:
+                    self._files.put(key, handle)
+        try:
+            yield handle.eclfile
+        finally:
+            with self._lock:
+                handle.readers -= 1
+                if handle.evicted and not handle.readers:
+                    handle.close()
+
+    def keys(self, filename):
+        """Return the list of distinct keyword names in a file,
+        without loading any keyword data"""
+        with self.open(filename) as eclfile:
+            return eclfile.global_view.unique_kw()
+
+    def report_dates(self, filename):
+        """Return the list of dates for the report steps in a restart file"""
+        with self.open(filename) as eclfile:
+            return eclfile.report_dates
+
+    def resize(self, maxcount):
+        """Change the maximal number of open files, closing files if
+        necessary"""
+        with self._lock:
+            self._files.resize(maxcount=maxcount)
+
+    def clear(self):
+        """Close all files, as soon as they are not being read from"""
+        with self._lock:
+            self._files.clear()
+
+    def stats(self):
+        """Return a dict with the counters and the number of open files,
+        see LRUCache.stats()"""
+        return self._files.stats()
+
+    def _evicted(self, key, handle):
+        """Called by the LRUCache, with self._lock held"""
+        logger.info("Closing %s", key[0])
+        handle.evicted = True
+        if not handle.readers:
+            handle.close()
+
+    def __len__(self):
+        return len(self._files)
+
+    def __repr__(self):
+        return "<EclFileCache, {count} open files, max {maxcount}>".format(
+            **self.stats()
+        )
+
+
+class _EclFileHandle(object):
+    """An open EclFile with the number of readers using it"""
+
+    def __init__(self, eclfile):
+        self.eclfile = eclfile
+        self.readers = 0
+        self.evicted = False
+
+    def close(self):
+        self.eclfile.close()
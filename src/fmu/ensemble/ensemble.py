@@ -6,9 +6,10 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import re
 import os
 import glob
+import functools
+from collections import OrderedDict
 import six
 
 from datetime import datetime, date, time
@@ -19,10 +20,13 @@ from ecl.eclfile import EclKW
 
 from .etc import Interaction
 from .realization import ScratchRealization
-from .virtualrealization import VirtualRealization
 from .virtualensemble import VirtualEnsemble
 from .ensemblecombination import EnsembleCombination
-from .realization import parse_number
+from .realization import date_intervals
+from .parallel import parallel_map
+from .summarycube import SummaryCube, smry_stats
+from .aggregation import Aggregator, QUANTILEMATCHER
+from .gridstats import CellStats, CellQuantiles
 
 xfmu = Interaction()
 logger = xfmu.functionlogger(__name__)
@@ -69,6 +73,17 @@ class ScratchEnsemble(object):
         autodiscovery: boolean. True by default, means that the class
             can try to autodiscover data in the realization. Turn
             off to gain more fined tuned control.
+        lazy: boolean, sent to initializing Realization objects. If True,
+            the default files (STATUS, OK, parameters.txt) in each
+            realization are not parsed until the data is asked for.
+        cachedir: str, path to a directory where parsed file contents
+            are cached across sessions, sent to initializing Realization
+            objects. Entries are reused as long as the source files
+            are unchanged. Default None means no caching.
+        workers: int, number of threads to use when initializing
+            realizations. Default None means serial initialization.
+        executor: concurrent.futures.Executor to initialize
+            realizations with, overrides workers.
     """
 
     def __init__(
@@ -79,6 +94,10 @@ class ScratchEnsemble(object):
         runpathfile=None,
         runpathfilter=None,
         autodiscovery=True,
+        lazy=False,
+        cachedir=None,
+        workers=None,
+        executor=None,
     ):
         self._name = ensemble_name  # ensemble name
         self._realizations = {}  # dict of ScratchRealization objects,
@@ -87,6 +106,7 @@ class ScratchEnsemble(object):
         self._global_active = None
         self._global_size = None
         self._global_grid = None
+        self._aggregator = Aggregator()  # Caches plans for agg()
         self.obs = None
 
         if isinstance(paths, str):
@@ -121,13 +141,33 @@ class ScratchEnsemble(object):
             # Search and locate minimal set of files
             # representing the realizations.
             count = self.add_realizations(
-                paths, realidxregexp, autodiscovery=autodiscovery
+                paths,
+                realidxregexp,
+                autodiscovery=autodiscovery,
+                lazy=lazy,
+                cachedir=cachedir,
+                workers=workers,
+                executor=executor,
             )
 
         if isinstance(runpathfile, str) and runpathfile:
-            count = self.add_from_runpathfile(runpathfile, runpathfilter)
+            count = self.add_from_runpathfile(
+                runpathfile,
+                runpathfilter,
+                lazy=lazy,
+                cachedir=cachedir,
+                workers=workers,
+                executor=executor,
+            )
         if isinstance(runpathfile, pd.DataFrame) and not runpathfile.empty:
-            count = self.add_from_runpathfile(runpathfile, runpathfilter)
+            count = self.add_from_runpathfile(
+                runpathfile,
+                runpathfilter,
+                lazy=lazy,
+                cachedir=cachedir,
+                workers=workers,
+                executor=executor,
+            )
 
         if count:
             logger.info("ScratchEnsemble initialized with %d realizations", count)
@@ -189,7 +229,16 @@ class ScratchEnsemble(object):
         # calling function handle further errors.
         return shortpath
 
-    def add_realizations(self, paths, realidxregexp=None, autodiscovery=True):
+    def add_realizations(
+        self,
+        paths,
+        realidxregexp=None,
+        autodiscovery=True,
+        lazy=False,
+        cachedir=None,
+        workers=None,
+        executor=None,
+    ):
         """Utility function to add realizations to the ensemble.
 
         Realizations are identified by their integer index.
@@ -204,6 +253,13 @@ class ScratchEnsemble(object):
                 to file system. Absolute or relative paths.
             autodiscovery: boolean, whether files can be attempted
                 auto-discovered
+            lazy: boolean, whether parsing of the default files
+                in the realizations should be deferred
+            cachedir: str, directory for caching parsed file contents
+            workers: int, number of threads to use for initializing
+                realizations. Default None means serial.
+            executor: concurrent.futures.Executor to initialize
+                realizations with, overrides workers.
 
         Returns:
             count (int): Number of realizations successfully added.
@@ -217,11 +273,17 @@ class ScratchEnsemble(object):
         else:
             globbedpaths = glob.glob(paths)
 
+        initializer = functools.partial(
+            _init_realization,
+            realidxregexp=realidxregexp,
+            autodiscovery=autodiscovery,
+            lazy=lazy,
+            cachedir=cachedir,
+        )
         count = 0
-        for realdir in globbedpaths:
-            realization = ScratchRealization(
-                realdir, realidxregexp=realidxregexp, autodiscovery=autodiscovery
-            )
+        for realdir, realization in parallel_map(
+            initializer, globbedpaths, workers, executor
+        ):
             if realization.index is None:
                 logger.critical(
                     "Could not determine realization index " + "for path " + realdir
@@ -236,7 +298,15 @@ class ScratchEnsemble(object):
         logger.info("add_realizations() found %d realizations", len(self._realizations))
         return count
 
-    def add_from_runpathfile(self, runpath, runpathfilter=None):
+    def add_from_runpathfile(
+        self,
+        runpath,
+        runpathfilter=None,
+        lazy=False,
+        cachedir=None,
+        workers=None,
+        executor=None,
+    ):
         """Add realizations from a runpath file typically
         coming from ERT.
 
@@ -253,6 +323,13 @@ class ScratchEnsemble(object):
                 a Pandas DataFrame parsed from a runpath file
             runpathfilter: str which each filepath has to match
                 in order to be included. Default None which means not filter
+            lazy: boolean, whether parsing of the default files
+                in the realizations should be deferred
+            cachedir: str, directory for caching parsed file contents
+            workers: int, number of threads to use for initializing
+                realizations. Default None means serial.
+            executor: concurrent.futures.Executor to initialize
+                realizations with, overrides workers.
 
         Returns:
             int - Number of successfully added realizations.
@@ -278,18 +355,20 @@ class ScratchEnsemble(object):
             ):
                 raise ValueError("runpath dataframe not correct")
 
+        runpaths = []
         for idx, row in runpath_df.iterrows():
             if runpathfilter and runpathfilter not in row["runpath"]:
                 continue
             logger.info("Adding realization from " + row["runpath"])
-            realization = ScratchRealization(
-                row["runpath"], index=int(row["index"]), autodiscovery=False
-            )
-            # Use the ECLBASE from the runpath file to
-            # ensure we recognize the correct UNSMRY file
-            realization.find_files(row["eclbase"] + ".DATA")
-            realization.find_files(row["eclbase"] + ".UNSMRY")
-            self._realizations[int(row["index"])] = realization
+            runpaths.append((row["runpath"], int(row["index"]), row["eclbase"]))
+
+        initializer = functools.partial(
+            _init_runpath_realization, lazy=lazy, cachedir=cachedir
+        )
+        for runpathrow, realization in parallel_map(
+            initializer, runpaths, workers, executor
+        ):
+            self._realizations[runpathrow[1]] = realization
 
         return len(self) - prelength
 
@@ -556,6 +635,8 @@ class ScratchEnsemble(object):
         start_date=None,
         end_date=None,
         include_restart=True,
+        workers=None,
+        executor=None,
     ):
         """
         Fetch and internalize summary data from all realizations.
@@ -590,13 +671,16 @@ class ScratchEnsemble(object):
                 typically 'monthly', 'daily' or 'yearly'.
             column_keys: str or list of column key wildcards. Default is '*'
                 which will match all vectors in the Eclipse output.
-            stacked: boolean determining the dataframe layout. If
+            stacked: boolean determining the data layout. If
                 true, the realization index is a column, and dates are repeated
                 for each realization in the DATES column.
-                If false, a dictionary of dataframes is returned, indexed
-                by vector name, and with realization index as columns.
-                This only works when time_index is the same for all
-                realizations. Not implemented yet!
+                If false, a SummaryCube is returned, holding the data in
+                one dense array of shape realization x date x vector. It
+                can be indexed by vector name to give dataframes with
+                realization index as columns. The date axis is shared by
+                all realizations, for raw time_index it is the union of all
+                report dates and data missing in a realization is NaN. The
+                data is not internalized in the realizations.
             cache_eclsum: Boolean for whether we should cache the EclSum
                 objects. Set to False if you cannot keep all EclSum files in
                 memory simultaneously
@@ -610,32 +694,129 @@ class ScratchEnsemble(object):
                 is 'last'. If string, use ISO-format, YYYY-MM-DD.
             include_restart: boolean sent to libecl for wheter restarts
                 files should be traversed
+            workers: int, number of threads to use for loading
+                realizations concurrently. Default None means serial
+                loading.
+            executor: concurrent.futures.Executor to load realizations
+                with, overrides workers. With a process pool, EclSum
+                objects are not cached in this process.
         Returns:
             A DataFame of summary vectors for the ensemble, or
-            a dict of dataframes if stacked=False.
+            a SummaryCube if stacked=False.
         """
         if not stacked:
-            raise NotImplementedError
-        # Future: Multithread this!
-        for realidx, realization in self._realizations.items():
-            # We do not store the returned DataFrames here,
-            # instead we look them up afterwards using get_df()
-            # Downside is that we have to compute the name of the
-            # cached object as it is not returned.
-            logger.info("Loading smry from realization %s", realidx)
-            realization.load_smry(
+            return self._load_smry_cube(
                 time_index=time_index,
                 column_keys=column_keys,
                 cache_eclsum=cache_eclsum,
                 start_date=start_date,
                 end_date=end_date,
                 include_restart=include_restart,
+                workers=workers,
+                executor=executor,
             )
         if isinstance(time_index, list):
-            time_index = "custom"
-        return self.get_df("share/results/tables/unsmry--" + time_index + ".csv")
+            time_index_path = "custom"
+        else:
+            time_index_path = time_index
+        localpath = "share/results/tables/unsmry--" + time_index_path + ".csv"
+        loader = functools.partial(
+            _load_realization_smry,
+            localpath=localpath,
+            time_index=time_index,
+            column_keys=column_keys,
+            cache_eclsum=cache_eclsum,
+            start_date=start_date,
+            end_date=end_date,
+            include_restart=include_restart,
+        )
+        for (_, realization), dframe in parallel_map(
+            loader, list(self._realizations.items()), workers, executor
+        ):
+            # The realization has internalized the frame already unless
+            # it was loaded in another process, so store it here as well.
+            if dframe is not None:
+                realization.data[localpath] = dframe
+        return self.get_df(localpath)
+
+    def _load_smry_cube(
+        self,
+        time_index="raw",
+        column_keys=None,
+        cache_eclsum=True,
+        start_date=None,
+        end_date=None,
+        include_restart=True,
+        workers=None,
+        executor=None,
+    ):
+        """Load summary data from all realizations into a SummaryCube.
+
+        See load_smry() for the arguments.
 
-    def get_volumetric_rates(self, column_keys=None, time_index=None):
+        Returns:
+            SummaryCube
+        """
+        if isinstance(time_index, str):
+            dates = self.get_smry_dates(
+                freq=time_index,
+                start_date=start_date,
+                end_date=end_date,
+                cache_eclsum=cache_eclsum,
+                include_restart=include_restart,
+            )
+        else:
+            dates = time_index
+        dates = np.unique(pd.to_datetime(pd.Index(dates)).values)
+        if isinstance(time_index, str) and time_index == "raw":
+            # Each realization is put on the union of dates, with NaN
+            # for dates it does not have.
+            real_time_index = "raw"
+        else:
+            real_time_index = list(pd.DatetimeIndex(dates).to_pydatetime())
+
+        if isinstance(column_keys, str):
+            column_keys = [column_keys]
+        vectors = sorted(self.get_smrykeys(column_keys))
+        vectorindex = {vector: idx for idx, vector in enumerate(vectors)}
+        reals = sorted(self._realizations.keys())
+        realindex = {real: idx for idx, real in enumerate(reals)}
+
+        values = np.full((len(reals), len(dates), len(vectors)), np.nan)
+        if not len(dates) or not vectors:
+            return SummaryCube(values, reals, dates, vectors)
+
+        loader = functools.partial(
+            _get_realization_smry,
+            time_index=real_time_index,
+            column_keys=column_keys,
+            cache_eclsum=cache_eclsum,
+            include_restart=include_restart,
+        )
+        for (realidx, _), dframe in parallel_map(
+            loader, list(self._realizations.items()), workers, executor
+        ):
+            if dframe.empty:
+                continue
+            realdates = pd.to_datetime(dframe.index).values
+            datepos = np.minimum(np.searchsorted(dates, realdates), len(dates) - 1)
+            ondates = dates[datepos] == realdates
+            columns = [col for col in dframe.columns if col in vectorindex]
+            colpos = [vectorindex[col] for col in columns]
+            realvalues = values[realindex[realidx]]
+            realvalues[np.ix_(datepos[ondates], colpos)] = dframe[columns].values[
+                ondates
+            ]
+        return SummaryCube(values, reals, dates, vectors)
+
+    def get_volumetric_rates(
+        self,
+        column_keys=None,
+        time_index=None,
+        time_unit=None,
+        workers=None,
+        executor=None,
+    ):
         """Compute volumetric rates from cumulative summary vectors
 
         Column names that are not referring to cumulative summary
@@ -650,28 +831,48 @@ class ScratchEnsemble(object):
         opposed to rates coming directly from the Eclipse simulator which
         are valid backwards in time.
 
+        Each realization is resampled on its own dates, as in
+        ScratchRealization.get_volumetric_rates(), and the rates for all
+        realizations are then computed in one operation.
+
         Args:
             column_keys: str or list of strings, cumulative summary vectors
             time_index: str or list of datetimes
+            time_unit: str or None. If None, the rates returned will
+                be the difference in cumulative between each included
+                time step (where the time interval can vary arbitrarily)
+                If set to 'days', 'months' or 'years', the rates will
+                be scaled to represent a daily, monthly or yearly rate that
+                is compatible with the date index and the cumulative data.
+            workers: int, number of threads to read realizations with.
+            executor: concurrent.futures.Executor to read realizations
+                with, overrides workers.
 
         Returns:
             DataFrame analoguous to the dataframe returned by get_smry().
+            Rates for vectors a realization does not have are NaN.
             Empty dataframe if no data found.
         """
-        vol_dfs = []
-        for realidx, real in self._realizations.items():
-            vol_real = real.get_volumetric_rates(
-                column_keys=column_keys, time_index=time_index
-            )
-            if "DATE" not in vol_real.columns and vol_real.index.name == "DATE":
-                # This should be true, if not we might be in trouble.
-                vol_real.reset_index(inplace=True)
-            vol_real.insert(0, "REAL", realidx)
-            vol_dfs.append(vol_real)
-
-        if not vol_dfs:
+        if isinstance(time_unit, str):
+            if time_unit not in ["days", "months", "years"]:
+                raise ValueError(
+                    "Unsupported time_unit " + time_unit + " for volumetric rates"
+                )
+        loader = functools.partial(
+            _get_realization_cumulatives,
+            column_keys=column_keys,
+            time_index=time_index,
+        )
+        cum_dfs = OrderedDict()
+        for (realidx, _), cum_df in parallel_map(
+            loader, list(self._realizations.items()), workers, executor
+        ):
+            if not cum_df.empty:
+                cum_dfs[realidx] = cum_df
+        if not cum_dfs:
+            logger.error("No valid cumulative columns given to volumetric computation")
             return pd.DataFrame()
-        return pd.concat(vol_dfs, ignore_index=True, sort=False)
+        return volumetric_rates(cum_dfs, time_unit)
 
     def filter(self, localpath, inplace=True, **kwargs):
         """Filter realizations or data within realizations
@@ -724,8 +925,9 @@ class ScratchEnsemble(object):
             return self
         else:
             filtered = VirtualEnsemble(self.name + " filtered")
-            for realidx in keepthese:
-                filtered.add_realization(self._realizations[realidx])
+            filtered.add_realizations(
+                [self._realizations[realidx] for realidx in keepthese]
+            )
             return filtered
 
     def drop(self, localpath, **kwargs):
@@ -827,14 +1029,11 @@ class ScratchEnsemble(object):
         # Build list of list of eclsum dates
         eclsumsdates = []
         for _, realization in self._realizations.items():
-            if realization.get_eclsum(
+            eclsum = realization.get_eclsum(
                 cache=cache_eclsum, include_restart=include_restart
-            ):
-                eclsumsdates.append(
-                    realization.get_eclsum(
-                        cache=cache_eclsum, include_restart=include_restart
-                    ).dates
-                )
+            )
+            if eclsum:
+                eclsumsdates.append(eclsum.dates)
         return ScratchEnsemble._get_smry_dates(
             eclsumsdates, freq, normalize, start_date, end_date
         )
@@ -997,22 +1196,11 @@ class ScratchEnsemble(object):
             start_date=start_date,
             end_date=end_date,
         )
-        if "REAL" in dframe:
-            dframe = dframe.drop(columns="REAL").groupby("DATE")
-        else:
+        if "REAL" not in dframe:
             logger.warning("No data found for get_smry_stats")
             return pd.DataFrame()
 
-        # Build a dictionary of dataframes to be concatenated
-        dframes = {}
-        dframes["mean"] = dframe.mean()
-        for quantile in quantiles:
-            quantile_str = "p" + str(quantile)
-            dframes[quantile_str] = dframe.quantile(q=quantile / 100.0)
-        dframes["maximum"] = dframe.max()
-        dframes["minimum"] = dframe.min()
-
-        return pd.concat(dframes, names=["STATISTIC"], sort=False)
+        return smry_stats(dframe, quantiles)
 
     def get_wellnames(self, well_match=None):
         """
@@ -1073,14 +1261,22 @@ class ScratchEnsemble(object):
 
         return sorted(list(result))
 
-    def agg(self, aggregation, keylist=None, excludekeys=None):
+    def agg(
+        self, aggregation, keylist=None, excludekeys=None, workers=None, executor=None
+    ):
         """Aggregate the ensemble data into one VirtualRealization
 
         All data will be attempted aggregated. String data will typically
         be dropped in the result.
 
+        Several aggregations can be asked for at once, they are then
+        all computed from the same pass over the data for each key.
+        The columns to group by and aggregate are worked out once for
+        each key, and reused in later calls until the columns or their
+        dtypes change.
+
         Arguments:
-            aggregation: string, supported modes are
+            aggregation: string or list of strings, supported modes are
                 'mean', 'median', 'p10', 'p90', 'min',
                 'max', 'std, 'var', 'pXX' where X is a number
             keylist: list of strings, indicating which keys
@@ -1088,99 +1284,22 @@ class ScratchEnsemble(object):
                 (default), all data will be attempted included.
             excludekeys: list of strings that should be excluded if
                 keylist is empty, otherwise ignored
+            workers: int, number of threads to aggregate keys with.
+            executor: concurrent.futures.Executor to aggregate keys
+                with, overrides workers.
         Returns:
-            VirtualRealization. Its name will include the aggregation operator
-
-        WARNING: This code is duplicated in virtualensemble.py
+            VirtualRealization. Its name will include the aggregation
+            operator. If aggregation is a list, a dict from each
+            aggregation to its VirtualRealization.
         """
-        quantilematcher = re.compile(r"p(\d\d)")
-        supported_aggs = ["mean", "median", "min", "max", "std", "var"]
-        if aggregation not in supported_aggs and not quantilematcher.match(aggregation):
-            raise ValueError(
-                "{arg} is not a".format(arg=aggregation)
-                + "supported ensemble aggregation"
-            )
-
-        # Generate a new empty object:
-        vreal = VirtualRealization(self.name + " " + aggregation)
-
-        # Determine keys to use
-        if isinstance(keylist, str):
-            keylist = [keylist]
-        if not keylist:  # Empty list means all keys.
-            if not isinstance(excludekeys, list):
-                excludekeys = [excludekeys]
-            keys = set(self.keys()) - set(excludekeys)
-        else:
-            keys = keylist
-
-        for key in keys:
-            # Aggregate over this ensemble:
-            # Ensure we operate on fully qualified localpath's
-            key = self.shortcut2path(key)
-            data = self.get_df(key)
-
-            # This column should never appear in aggregated data
-            del data["REAL"]
-
-            # Look for data we should group by. This would be beneficial
-            # to get from a metadata file, and not by pure guesswork.
-            groupbycolumncandidates = [
-                "DATE",
-                "FIPNUM",
-                "ZONE",
-                "REGION",
-                "JOBINDEX",
-                "Zone",
-                "Region_index",
-            ]
-
-            # Pick up string columns (or non-numeric values)
-            # (when strings are used as values, this breaks, but it is also
-            # meaningless to aggregate them. Most likely, strings in columns
-            # is a label we should group over)
-            stringcolumns = [x for x in data.columns if data.dtypes[x] == "object"]
-
-            groupby = [x for x in groupbycolumncandidates if x in data.columns]
-
-            # Add remainding string columns to columns to group by unless
-            # we are working with the STATUS dataframe, which has too many strings..
-            if key != "STATUS":
-                groupby = list(set(groupby + stringcolumns))
-
-            # Filter to only numerical columns and groupby columns:
-            numerical_and_groupby_cols = list(
-                set(list(groupby) + list(data.select_dtypes(include="number").columns))
-            )
-            data = data[numerical_and_groupby_cols]
-
-            dtypes = data.dtypes.unique()
-            if not (int in dtypes or float in dtypes):
-                logger.info("No numerical data to aggregate in %s", key)
-                continue
-            if len(groupby):
-                logger.info("Grouping %s by %s", key, groupby)
-                aggobject = data.groupby(groupby)
-            else:
-                aggobject = data
-
-            if quantilematcher.match(aggregation):
-                quantile = int(quantilematcher.match(aggregation).group(1))
-                aggregated = aggobject.quantile(quantile / 100.0)
-            else:
-                # Passing through the variable 'aggregation' to
-                # Pandas, thus supporting more than we have listed in
-                # the docstring.
-                aggregated = aggobject.agg(aggregation)
-
-            if groupby:
-                aggregated.reset_index(inplace=True)
-
-            # We have to recognize scalars.
-            if len(aggregated) == 1 and aggregated.index.values[0] == key:
-                aggregated = parse_number(aggregated.values[0])
-            vreal.append(key, aggregated)
-        return vreal
+        return self._aggregator.agg(
+            self,
+            aggregation,
+            keylist=keylist,
+            excludekeys=excludekeys,
+            workers=workers,
+            executor=executor,
+        )
 
     @property
     def files(self):
@@ -1289,36 +1408,78 @@ class ScratchEnsemble(object):
             return pd.concat(dflist, sort=False).reset_index()
         return pd.DataFrame()
 
-    def get_eclgrid(self, props, report=0, agg="mean", active_only=False):
+    def get_eclgrid(
+        self,
+        props,
+        report=0,
+        agg="mean",
+        active_only=False,
+        maxbytes=None,
+        workers=None,
+        executor=None,
+    ):
         """
         Returns the grid (i,j,k) and (x,y), and any requested init
         and/or unrst property. The values are aggregated over the
-        ensemble (mean/ std currently supported).
+        ensemble (mean, std, median and quantiles pXX supported).
+
+        The grid geometry is taken from the first realization, and
+        cached, see ScratchRealization.get_grid_geometry().
 
         Args:
             props: list of column key wildcards
             report: int. for unrst props only. Report step for given date.
                     Use the function get_unrst_report_dates to get an overview
                     of the report steps availible.
-            agg: String. "mean" or "std".
+            agg: String. "mean", "std", "median" or "pXX" where XX is
+                a percentile. A list of these can be given, the columns
+                are then named by the property and the aggregation,
+                f.ex. PORO_p10.
             active_only: bool. True if activate cells only.
+            maxbytes: int, memory budget for computing quantiles. Values
+                for all realizations beyond this are kept in a temporary
+                file, and quantiles computed for blocks of cells.
+            workers: int, number of threads to read the realizations'
+                files with. Default None means serial reading.
+            executor: concurrent.futures.Executor to read the
+                realizations' files with, overrides workers.
         Returns:
             A dictionary. Index by grid attribute, and contains a list
             corresponding to a set of values for each grid cells.
         """
         ref = list(self._realizations.values())[0]
-        grid_index = ref.get_grid_index(active_only=active_only)
-        corners = ref.get_grid_corners(grid_index)
-        centre = ref.get_grid_centre(grid_index)
-        dframe = grid_index.reset_index().join(corners).join(centre)
+        # The geometry is cached, and must not be modified:
+        dframe = ref.get_grid_geometry(active_only=active_only).copy()
+        if not self._global_active:
+            self._global_active = self._read_global_active(workers, executor)
         dframe["realizations_active"] = self.global_active.numpy_copy()
+        if isinstance(agg, str):
+            aggs = [agg]
+        else:
+            aggs = list(agg)
+        init_keys = self.init_keys
+        unrst_keys = self.unrst_keys
         for prop in props:
             print("Reading the grid property: " + prop)
-            if prop in self.init_keys:
-                dframe[prop] = self.get_init(prop, agg=agg)
-            if prop in self.unrst_keys:
-                dframe[prop] = self.get_unrst(prop, agg=agg, report=report)
-        dframe.drop("index", axis=1, inplace=True)
+            aggregated = {}
+            if prop in init_keys:
+                aggregated = self._keyword_agg(
+                    prop, aggs, maxbytes=maxbytes, workers=workers, executor=executor
+                )
+            if prop in unrst_keys:
+                aggregated = self._keyword_agg(
+                    prop,
+                    aggs,
+                    report=report,
+                    maxbytes=maxbytes,
+                    workers=workers,
+                    executor=executor,
+                )
+            for propagg, values in aggregated.items():
+                if isinstance(agg, str):
+                    dframe[prop] = values
+                else:
+                    dframe[prop + "_" + propagg] = values
         dframe.set_index(["i", "j", "k", "active"])
         return dframe
 
@@ -1329,14 +1490,31 @@ class ScratchEnsemble(object):
             the number of realizations where the cell is active.
         """
         if not self._global_active:
-            self._global_active = EclKW(
-                "eactive", self.global_size, EclDataType.ECL_INT
-            )
-            for realization in self._realizations.values():
-                self._global_active += realization.actnum
-
+            self._global_active = self._read_global_active()
         return self._global_active
 
+    def _read_global_active(self, workers=None, executor=None):
+        """Count the realizations where each cell is active
+
+        The realizations are read concurrently if workers or
+        an executor is given.
+
+        Returns:
+            EclKW of ints
+        """
+        counts = np.zeros(self.global_size, dtype=np.int32)
+        for _, actnum in parallel_map(
+            _read_realization_actnum,
+            self._realizations.items(),
+            workers,
+            executor,
+            ordered=False,
+        ):
+            counts += actnum
+        global_active = EclKW("eactive", self.global_size, EclDataType.ECL_INT)
+        global_active.numpy_view()[:] = counts
+        return global_active
+
     @property
     def global_size(self):
         """
@@ -1365,7 +1543,7 @@ class ScratchEnsemble(object):
             return None
         all_keys = set.union(
             *[
-                set(realization.get_init().keys())
+                set(realization.init_keys)
                 for _, realization in six.iteritems(self._realizations)
             ]
         )
@@ -1378,7 +1556,7 @@ class ScratchEnsemble(object):
             return None
         all_keys = set.union(
             *[
-                set(realization.get_unrst().keys())
+                set(realization.unrst_keys)
                 for _, realization in six.iteritems(self._realizations)
             ]
         )
@@ -1403,80 +1581,290 @@ class ScratchEnsemble(object):
     def get_init(self, prop, agg):
         """
         :param prop: A time independent property,
-        :returns: Dictionary with ``mean`` or ``std_dev`` as keys,
-            and corresponding values for given property as values.
-        :raises ValueError: If prop is not found.
+        :param agg: String, "mean", "std", "median" or "pXX".
+        :returns: Series with the aggregated value of the property
+            for each cell in the global grid.
+        :raises ValueError: If agg is not supported.
         """
-        if agg == "mean":
-            mean = self._keyword_mean(prop, self.global_active)
-            return pd.Series(mean.numpy_copy(), name=prop)
-        if agg == "std":
-            std_dev = self._keyword_std_dev(prop, self.global_active, mean)
-            return pd.Series(std_dev.numpy_copy(), name=prop)
+        return self._keyword_agg(prop, [agg])[agg]
 
     def get_unrst(self, prop, report, agg):
         """
         :param prop: A time dependent property, see
             `fmu_postprocessing.modelling.SimulationGrid.TIME_DEPENDENT`.
-        :returns: Dictionary with ``mean`` and ``std_dev`` as keys,
-            and corresponding values for given property as values.
-        :raises ValueError: If prop is not in `TIME_DEPENDENT`.
+        :param report: Report step
+        :param agg: String, "mean", "std", "median" or "pXX".
+        :returns: Series with the aggregated value of the property
+            for each cell in the global grid.
+        :raises ValueError: If agg is not supported.
         """
+        return self._keyword_agg(prop, [agg], report=report)[agg]
 
-        if agg == "mean":
-            mean = self._keyword_mean(prop, self.global_active, report=report)
-            return pd.Series(mean.numpy_copy(), name=prop)
-        if agg == "std":
-            std_dev = self._keyword_std_dev(
-                prop, self.global_active, mean, report=report
+    def _keyword_agg(
+        self, prop, aggs, report=None, maxbytes=None, workers=None, executor=None
+    ):
+        """Aggregate a keyword over the realizations
+
+        Mean, standard deviation and quantiles are all computed in one
+        pass, reading each realization's keyword once.
+
+        :param aggs: List of aggregations, "mean", "std", "median"
+            or "pXX"
+        :param report: Report step for unrst keywords, None for init
+        :param maxbytes: Memory budget for quantiles, see CellQuantiles
+        :param workers: Number of threads to read realizations with
+        :param executor: concurrent.futures.Executor to read
+            realizations with, overrides workers
+        :returns: Dict from aggregation to Series
+        """
+        quantiles = {}
+        for agg in aggs:
+            if agg == "median":
+                quantiles[agg] = 0.5
+            elif QUANTILEMATCHER.match(agg):
+                quantiles[agg] = int(QUANTILEMATCHER.match(agg).group(1)) / 100.0
+            elif agg not in ["mean", "std"]:
+                raise ValueError("Unsupported grid aggregation " + str(agg))
+        moments = [agg for agg in aggs if agg not in quantiles]
+        stats = None
+        cellquantiles = None
+        accumulators = []
+        if moments:
+            stats = CellStats(self.global_size)
+            accumulators.append(stats)
+        if quantiles:
+            cellquantiles = CellQuantiles(
+                self.global_size, len(self), maxbytes=maxbytes
             )
-            return pd.Series(std_dev.numpy_copy(), name=prop)
+            accumulators.append(cellquantiles)
+        result = {}
+        try:
+            self._accumulate_keyword(prop, accumulators, report, workers, executor)
+            for agg in moments:
+                result[agg] = pd.Series(getattr(stats, agg), name=prop)
+            if quantiles:
+                values = cellquantiles.quantiles(list(quantiles.values()))
+                for agg, quantilevalues in zip(quantiles.keys(), values):
+                    result[agg] = pd.Series(quantilevalues, name=prop)
+        finally:
+            if cellquantiles is not None:
+                cellquantiles.close()
+        return result
 
-    def _keyword_mean(self, prop, global_active, report=None):
+    def _accumulate_keyword(
+        self, prop, accumulators, report=None, workers=None, executor=None
+    ):
         """
-        :returns: Mean values of keywords.
-        :param prop: Name of resulting Keyword.
-        :param global_active: A EclKW with, for each cell, The number of
-            realizations where the cell is active.
-        :param report: Report step for unrst keywords
+        Add a keyword from each realization to a list of accumulators,
+        reading each realization's keyword once. The realizations
+        are read concurrently if workers or an executor is given,
+        and added to the accumulators as they are read.
+
+        :param prop: Name of keyword.
+        :param accumulators: List of CellStats and CellQuantiles
+        :param report: Report step for unrst keywords, None for init
+        :param workers: Number of threads to read realizations with
+        :param executor: concurrent.futures.Executor to read
+            realizations with, overrides workers
         """
-        if report:
-            mean = EclKW(prop, len(global_active), EclDataType.ECL_FLOAT)
-            for real, realization in six.iteritems(self._realizations):
-                mean += realization.get_global_unrst_keyword(prop, report)
-            mean.safe_div(global_active)
-            return mean
-        else:
-            mean = EclKW(prop, len(global_active), EclDataType.ECL_FLOAT)
-            for _, realization in six.iteritems(self._realizations):
-                mean += realization.get_global_init_keyword(prop)
-            mean.safe_div(global_active)
-            return mean
+        reader = functools.partial(_read_realization_keyword, prop=prop, report=report)
+        for _, (values, active) in parallel_map(
+            reader, self._realizations.items(), workers, executor, ordered=False
+        ):
+            for accumulator in accumulators:
+                accumulator.add(values, active)
 
-    def _keyword_std_dev(self, prop, global_active, mean, report=0):
-        """
-        :returns: Standard deviation of keywords.
-        :param name: Name of resulting Keyword.
-        :param keywords: List of pairs of keywords and list of active cell
-        :param global_active: A EclKW with, for each cell, The number of
-            realizations where the cell is active.
-        :param mean: Mean of keywords.
-        """
-        if report:
-            std_dev = EclKW(prop, len(global_active), EclDataType.ECL_FLOAT)
-            for real, realization in six.iteritems(self._realizations):
-                real_prop = realization.get_global_unrst_keyword(prop, report)
-                std_dev.add_squared(real_prop - mean)
-            std_dev.safe_div(global_active)
-            return std_dev.isqrt()
 
-        else:
-            std_dev = EclKW(prop, len(global_active), EclDataType.ECL_FLOAT)
-            for real, realization in six.iteritems(self._realizations):
-                real_prop = realization.get_global_init_keyword(prop)
-                std_dev.add_squared(real_prop - mean)
-            std_dev.safe_div(global_active)
-            return std_dev.isqrt()
+def _init_realization(
+    realdir, realidxregexp=None, autodiscovery=True, lazy=False, cachedir=None
+):
+    """Initialize a ScratchRealization from a directory.
+
+    Module level function so that it can be sent to
+    process pools by parallel_map()."""
+    return ScratchRealization(
+        realdir,
+        realidxregexp=realidxregexp,
+        autodiscovery=autodiscovery,
+        lazy=lazy,
+        cachedir=cachedir,
+    )
+
+
+def _init_runpath_realization(runpathrow, lazy=False, cachedir=None):
+    """Initialize a ScratchRealization from a row in a runpath file
+
+    Args:
+        runpathrow: tuple with runpath, realization index and eclbase.
+        lazy: boolean, whether parsing of default files is deferred
+        cachedir: str, directory for caching parsed file contents
+    """
+    (runpath, index, eclbase) = runpathrow
+    realization = ScratchRealization(
+        runpath, index=index, autodiscovery=False, lazy=lazy, cachedir=cachedir
+    )
+    # Use the ECLBASE from the runpath file to
+    # ensure we recognize the correct UNSMRY file
+    realization.find_files(eclbase + ".DATA")
+    realization.find_files(eclbase + ".UNSMRY")
+    return realization
+
+
+def _get_realization_smry(realitem, **kwargs):
+    """Get summary data for one realization, to be run by parallel_map()
+
+    Args:
+        realitem: tuple with realization index and ScratchRealization
+        kwargs: passed on to ScratchRealization.get_smry()
+
+    Returns:
+        DataFrame indexed by date, empty if no data.
+    """
+    realidx, realization = realitem
+    logger.info("Getting smry from realization %s", realidx)
+    return realization.get_smry(**kwargs)
+
+
+def _get_realization_cumulatives(realitem, column_keys, time_index):
+    """Get the cumulative summary vectors for one realization, to be
+    run by parallel_map()
+
+    Args:
+        realitem: tuple with realization index and ScratchRealization
+        column_keys: passed on to ScratchRealization.get_smry(), only
+            the keys that are cumulative vectors are included.
+        time_index: passed on to ScratchRealization.get_smry()
+
+    Returns:
+        DataFrame indexed by date, empty if no data.
+    """
+    realidx, realization = realitem
+    logger.info("Getting cumulatives from realization %s", realidx)
+    if realization.get_eclsum() is None:
+        return pd.DataFrame()
+    column_keys = [
+        key
+        for key in realization._glob_smry_keys(column_keys)
+        if ScratchRealization._cum_smrycol2rate(key)
+    ]
+    if not column_keys:
+        return pd.DataFrame()
+    return realization.get_smry(column_keys=column_keys, time_index=time_index)
+
+
+def volumetric_rates(cum_dfs, time_unit=None):
+    """Compute volumetric rates for several realizations at once
+
+    The rates are computed as in
+    ScratchRealization.get_volumetric_rates(), on the dates of each
+    realization.
+
+    Args:
+        cum_dfs: dict from realization index to a dataframe with
+            cumulative vectors, indexed by increasing dates.
+        time_unit: str or None, see
+            ScratchEnsemble.get_volumetric_rates()
+
+    Returns:
+        DataFrame with the columns REAL, DATE and the rates, with
+        the rows for each realization in the order of cum_dfs.
+        Rates for vectors missing in a realization are NaN.
+    """
+    realindices = list(cum_dfs.keys())
+    frames = list(cum_dfs.values())
+    cum_df = pd.concat(frames, sort=False)
+    column_keys = list(cum_df.columns)
+    lengths = [len(frame) for frame in frames]
+    # Vectors in each row's realization:
+    present = np.repeat(
+        np.array([[key in frame for key in column_keys] for frame in frames]),
+        lengths,
+        axis=0,
+    )
+    # The last row for each realization:
+    lastrows = np.zeros(len(cum_df), dtype=bool)
+    lastrows[np.cumsum(lengths)[np.array(lengths) > 0] - 1] = True
+
+    # The rate given for a specific date is valid from that
+    # date until the next date, and zero at the last date.
+    cums = cum_df.values.astype(np.float64)
+    rates = np.zeros_like(cums)
+    rates[:-1] = cums[1:] - cums[:-1]
+    rates[lastrows] = 0
+    rates[np.isnan(rates)] = 0
+
+    if time_unit:
+        intervals = np.zeros(len(cum_df))
+        intervals[:-1] = date_intervals(cum_df.index, time_unit)
+        intervals[lastrows] = 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = rates / intervals[:, np.newaxis]
+        # The last row for each realization is now 0/0
+        rates[np.isnan(rates)] = 0
+    rates[~present] = np.nan
+
+    vol_df = pd.DataFrame(
+        rates,
+        columns=[ScratchRealization._cum_smrycol2rate(x) for x in column_keys],
+    )
+    vol_df.insert(0, "DATE", cum_df.index.values)
+    vol_df.insert(0, "REAL", np.repeat(realindices, lengths))
+    return vol_df
+
+
+def _load_realization_smry(realitem, localpath, **kwargs):
+    """Load summary data for one realization, to be run by parallel_map()
+
+    Args:
+        realitem: tuple with realization index and ScratchRealization
+        localpath: str, the datastore key load_smry() will store under
+        kwargs: passed on to ScratchRealization.load_smry()
+
+    Returns:
+        The internalized DataFrame, None if nothing was internalized.
+    """
+    realidx, realization = realitem
+    logger.info("Loading smry from realization %s", realidx)
+    realization.load_smry(**kwargs)
+    return realization.data.get(localpath)
+
+
+def _read_realization_actnum(realitem):
+    """Read the active cells for one realization, to be run by
+    parallel_map()
+
+    Args:
+        realitem: tuple with realization index and ScratchRealization
+
+    Returns:
+        numpy array of ints for each cell in the global grid,
+        1 for active cells.
+    """
+    realidx, realization = realitem
+    logger.info("Reading active cells from realization %s", realidx)
+    return realization.actnum.numpy_copy()
+
+
+def _read_realization_keyword(realitem, prop, report=None):
+    """Read a grid keyword for one realization, to be run by
+    parallel_map()
+
+    Args:
+        realitem: tuple with realization index and ScratchRealization
+        prop: str, name of the keyword
+        report: int, report step for unrst keywords, None for init
+
+    Returns:
+        tuple with numpy arrays of the values for each cell in the
+        global grid, and of booleans telling which cells are active.
+    """
+    realidx, realization = realitem
+    logger.info("Reading %s from realization %s", prop, realidx)
+    if report is None:
+        values = realization.get_global_init_keyword(prop)
+    else:
+        values = realization.get_global_unrst_keyword(prop, report)
+    return values.numpy_copy(), realization.actnum.numpy_view() > 0
 
 
 def _convert_numeric_columns(dataframe):
@@ -6,10 +6,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import pandas as pd
-
 from .etc import Interaction
 from fmu.ensemble.virtualensemble import VirtualEnsemble
+from .summarycube import smry_stats
 
 xfmu = Interaction()
 logger = xfmu.functionlogger(__name__)
@@ -187,23 +186,9 @@ class EnsembleCombination(object):
         # Obtain an aggregated dataframe for only the needed columns over
         # the entire ensemble.
 
-        dframe = (
-            self.get_smry(time_index=time_index, column_keys=column_keys)
-            .drop(columns="REAL")
-            .groupby("DATE")
-        )
-        mean = dframe.mean()
-        p90 = dframe.quantile(q=0.90)
-        p10 = dframe.quantile(q=0.10)
-        maximum = dframe.max()
-        minimum = dframe.min()
-
-        return pd.concat(
-            [mean, p10, p90, maximum, minimum],
-            keys=["mean", "p10", "p90", "maximum", "minimum"],
-            names=["statistic"],
-            sort=False,
-        )
+        dframe = self.get_smry(time_index=time_index, column_keys=column_keys)
+
+        return smry_stats(dframe, [10, 90], index_name="statistic")
 
     def __getitem__(self, localpath):
         return self.get_df(localpath)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Module for the FileRegistry class
+
+The file registry keeps track of the files discovered or loaded
+in a ScratchRealization, indexed on full path, local path and
+file type.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class FileRegistry(object):
+    """Registry of files belonging to a realization
+
+    Each file is represented by a dict with at least the keys
+    * FULLPATH absolute path to a file
+    * FILETYPE filename extension (after last dot)
+    * LOCALPATH relative filename inside realization diretory
+    * BASENAME filename only. No path. Includes extension
+    and any user supplied metadata.
+
+    Files are indexed on FULLPATH (unique), and additionally on
+    LOCALPATH and FILETYPE, so that insertion, removal and lookup
+    are all constant time operations. The order of insertion is
+    preserved, and a DataFrame representation is available
+    on demand through to_dataframe().
+    """
+
+    COLUMNS = ["FULLPATH", "FILETYPE", "LOCALPATH", "BASENAME"]
+
+    def __init__(self):
+        self._rows = OrderedDict()  # FULLPATH -> dict
+        self._localpaths = {}  # LOCALPATH -> FULLPATH
+        self._filetypes = {}  # FILETYPE -> OrderedDict of FULLPATH -> None
+        self._columns = list(self.COLUMNS)  # Includes all metadata ever seen
+
+    def add(self, filerow):
+        """Add a file to the registry.
+
+        If a file with the same FULLPATH is already registered,
+        it is replaced, and the new row is placed last.
+
+        Args:
+            filerow: dict with at least the key FULLPATH, and
+                normally also FILETYPE, LOCALPATH and BASENAME.
+        """
+        fullpath = filerow["FULLPATH"]
+        if fullpath in self._rows:
+            self.remove(fullpath)
+        self._rows[fullpath] = dict(filerow)
+        for key in filerow:
+            if key not in self._columns:
+                self._columns.append(key)
+        if "LOCALPATH" in filerow:
+            self._localpaths[filerow["LOCALPATH"]] = fullpath
+        if "FILETYPE" in filerow:
+            self._filetypes.setdefault(filerow["FILETYPE"], OrderedDict())[
+                fullpath
+            ] = None
+
+    def remove(self, fullpath):
+        """Remove a file from the registry, identified by its full path.
+
+        Nothing happens if the file is not registered."""
+        filerow = self._rows.pop(fullpath, None)
+        if filerow is None:
+            return
+        localpath = filerow.get("LOCALPATH")
+        if self._localpaths.get(localpath) == fullpath:
+            del self._localpaths[localpath]
+        filetype = filerow.get("FILETYPE")
+        if filetype in self._filetypes:
+            self._filetypes[filetype].pop(fullpath, None)
+            if not self._filetypes[filetype]:
+                del self._filetypes[filetype]
+
+    def __contains__(self, fullpath):
+        return fullpath in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows.values())
+
+    def get(self, fullpath):
+        """Return the file row for a full path, None if not registered"""
+        return self._rows.get(fullpath)
+
+    def has_localpath(self, localpath):
+        """Check if a file with a given local path is registered"""
+        return localpath in self._localpaths
+
+    def by_localpath(self, localpath):
+        """Return the file row registered for a local path,
+        None if not registered"""
+        fullpath = self._localpaths.get(localpath)
+        if fullpath is None:
+            return None
+        return self._rows[fullpath]
+
+    def by_filetype(self, filetype):
+        """Return a list of file rows with a given file type,
+        in insertion order"""
+        return [self._rows[x] for x in self._filetypes.get(filetype, {})]
+
+    def to_dataframe(self):
+        """Return the registry as a DataFrame, one row pr. file.
+
+        The columns FULLPATH, FILETYPE, LOCALPATH and BASENAME
+        come first, then any metadata columns in the order
+        they were first seen. Metadata columns are kept even
+        if the files having them have been replaced."""
+        return pd.DataFrame(list(self._rows.values()), columns=self._columns)
+
+    @classmethod
+    def from_dataframe(cls, dframe):
+        """Construct a registry from a DataFrame on the
+        format provided by to_dataframe()
+
+        Missing metadata values (NaN) are not registered."""
+        registry = cls()
+        for column in dframe.columns:
+            if column not in registry._columns:
+                registry._columns.append(column)
+        for filerow in dframe.to_dict(orient="records"):
+            registry.add(
+                {
+                    key: value
+                    for key, value in filerow.items()
+                    if key in cls.COLUMNS or not pd.isnull(value)
+                }
+            )
+        return registry
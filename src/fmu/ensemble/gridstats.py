@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Statistics for grid properties over an ensemble
+
+Grid properties are read one realization at a time, as arrays over
+all cells in the global grid (inactive cells included). CellStats
+accumulates count, mean and standard deviation for every cell from
+such arrays in one pass, using Welford's algorithm, counting a
+realization in a cell only where the cell is active.
+
+CellQuantiles computes quantiles for every cell. It keeps the values
+of all realizations, in a temporary file if they do not fit within a
+memory budget, and computes the quantiles for one block of cells at a
+time, so that the memory used is bounded independently of the size
+of the grid and the ensemble.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tempfile
+
+import numpy as np
+
+from .summarycube import array_stats
+
+# Default memory budget for CellQuantiles, in bytes
+DEFAULT_MAXBYTES = 256 * 1024**2
+
+
+class CellStats(object):
+    """Streaming count, mean and standard deviation for grid cells
+
+    Args:
+        size: int, number of cells in the global grid
+    """
+
+    def __init__(self, size):
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size, dtype=np.float64)
+        self._sumsquares = np.zeros(size, dtype=np.float64)
+
+    def add(self, values, active):
+        """Add the values for one realization
+
+        Args:
+            values: array with a value for every cell in the global grid
+            active: boolean array, True where the cell is active in
+                this realization. Values in inactive cells are ignored.
+        """
+        active = np.asarray(active, dtype=bool)
+        values = np.asarray(values, dtype=np.float64)[active]
+        self.count[active] += 1
+        mean = self.mean[active]
+        delta = values - mean
+        mean += delta / self.count[active]
+        self.mean[active] = mean
+        self._sumsquares[active] += delta * (values - mean)
+
+    @property
+    def std(self):
+        """Population standard deviation for each cell, zero for cells
+        that are never active"""
+        std = np.zeros(len(self.count), dtype=np.float64)
+        counted = self.count > 0
+        std[counted] = np.sqrt(self._sumsquares[counted] / self.count[counted])
+        return std
+
+    def __len__(self):
+        return len(self.count)
+
+    def __repr__(self):
+        return "<CellStats, {} cells, at most {} realizations>".format(
+            len(self), self.count.max() if len(self) else 0
+        )
+
+
+class CellQuantiles(object):
+    """Quantiles for grid cells, computed in blocks of cells
+
+    Values are stored as float32, one row for each realization. If
+    that exceeds maxbytes, the rows are stored in a temporary file,
+    which is removed by close(). Quantiles are computed from blocks
+    of cells for all realizations at a time, the work for a block
+    using at most maxbytes.
+
+    Args:
+        size: int, number of cells in the global grid
+        nreals: int, the maximal number of realizations to add
+        maxbytes: int, memory budget in bytes.
+        tmpdir: str, directory for the temporary file, defaults
+            to the system default.
+    """
+
+    def __init__(self, size, nreals, maxbytes=None, tmpdir=None):
+        if maxbytes is None:
+            maxbytes = DEFAULT_MAXBYTES
+        self.maxbytes = maxbytes
+        self._size = size
+        self._nadded = 0
+        self._tmpfile = None
+        if nreals * size * 4 > maxbytes:
+            self._tmpfile = tempfile.TemporaryFile(dir=tmpdir)
+            self._values = np.memmap(
+                self._tmpfile, dtype=np.float32, mode="w+", shape=(nreals, size)
+            )
+        else:
+            self._values = np.empty((nreals, size), dtype=np.float32)
+
+    def add(self, values, active):
+        """Add the values for one realization
+
+        Args:
+            values: array with a value for every cell in the global grid
+            active: boolean array, True where the cell is active in
+                this realization. Values in inactive cells are ignored.
+        """
+        if self._nadded == len(self._values):
+            raise ValueError("All {} realizations added".format(self._nadded))
+        self._values[self._nadded] = np.where(active, values, np.nan)
+        self._nadded += 1
+
+    def quantiles(self, quantiles):
+        """Compute quantiles for each cell, over the realizations
+        where the cell is active. Quantiles are linearly interpolated.
+
+        Args:
+            quantiles: list of floats between 0 and 1.
+
+        Returns:
+            list of arrays, one for each quantile, with a value for
+            each cell. Zero for cells that are never active.
+        """
+        result = [np.zeros(self._size, dtype=np.float64) for _ in quantiles]
+        if not self._nadded:
+            return result
+        # The sorting in array_stats needs a few copies of each block
+        chunksize = max(1, self.maxbytes // (4 * 8 * self._nadded))
+        for start in range(0, self._size, chunksize):
+            stop = min(start + chunksize, self._size)
+            block = np.array(self._values[: self._nadded, start:stop], np.float64)
+            statistics = array_stats(block, quantiles)[1:-2]
+            for quantilevalues, blockvalues in zip(result, statistics):
+                quantilevalues[start:stop] = np.nan_to_num(blockvalues)
+        return result
+
+    def close(self):
+        """Release the storage, removing any temporary file"""
+        self._values = np.empty((0, self._size), dtype=np.float32)
+        if self._tmpfile is not None:
+            self._tmpfile.close()
+            self._tmpfile = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return "<CellQuantiles, {} cells, {} realizations{}>".format(
+            self._size, self._nadded, ", on disk" if self._tmpfile else ""
+        )
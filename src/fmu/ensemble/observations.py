@@ -9,10 +9,13 @@ from __future__ import print_function
 
 import os
 import math
+import hashlib
+import functools
 import datetime
 from collections import OrderedDict
 
 import yaml
+import numpy as np
 import pandas as pd
 import dateutil
 
@@ -22,6 +25,7 @@ from .ensemble import ScratchEnsemble
 from .ensembleset import EnsembleSet
 from .virtualrealization import VirtualRealization
 from .virtualensemble import VirtualEnsemble
+from .parallel import parallel_map
 
 xfmu = Interaction()
 logger = xfmu.functionlogger(__name__)
@@ -93,59 +97,87 @@ class Observations(object):
         # Identify and warn about errors in observation syntax (dates etc)
         self._clean_observations()
 
+        # Digest of the last covariance matrix in misfit(), with the
+        # inverse of its Cholesky factor
+        self._whitening = None
+
+        # Columnar representation of the observations, used
+        # in mismatch and misfit calculations
+        self._compile_observations()
+
         logger.info("Initialized observation with obstypes %s", str(self.keys()))
-        for obskey in self.keys():
-            # (fixme: this string does not make sense)
-            logger.info(" %s: ", str(len(self.observations[obskey])))
+        for obstype in self.keys():
+            logger.info(
+                " %s: %d observation units", obstype, len(self.observations[obstype])
+            )
 
     def __getitem__(self, someobject):
         """Pick objects from the observations dict"""
         return self.observations[someobject]
 
-    def mismatch(self, ens_or_real):
+    def mismatch(self, ens_or_real, workers=None, executor=None):
         """Compute the mismatch from the current observation set
         to the incoming ensemble or realization.
 
         In the case of an ensemble, it will calculate individually
-        for every realization, and aggregate the results.
+        for every realization, and aggregate the results. The
+        realizations can be processed concurrently, by a pool of
+        threads or by a user supplied executor. For a process pool,
+        the observation object and each realization are pickled to
+        the worker processes.
+
+        Args:
+            ens_or_real: ScratchRealization, VirtualRealization,
+                ScratchEnsemble, VirtualEnsemble or EnsembleSet
+            workers: int, number of threads to use for ensembles.
+                Default None means serial computation.
+            executor: concurrent.futures.Executor to submit the
+                realizations to. Overrides workers.
 
         Returns:
             dataframe with REAL (only if ensemble), OBSKEY, DATE,
                 L1, L2. One row for every observation unit.
         """
-        # For ensembles, we should in the future be able to loop
-        # over realizations in a multiprocessing fashion
+        self._ensure_compiled()
+        return self._mismatch(ens_or_real, workers, executor)
+
+    def _mismatch(self, ens_or_real, workers=None, executor=None):
+        """Compute the mismatch, see mismatch(), from the compiled
+        observations as they are"""
         if isinstance(ens_or_real, EnsembleSet):
-            mismatches = {}
-            for ensname, ens in ens_or_real._ensembles.items():
-                logger.info("Calculating mismatch for ensemble %s", ensname)
-                for realidx, real in ens._realizations.items():
-                    logger.info("Calculating mismatch for realization %s", str(realidx))
-                    mismatches[(ensname, realidx)] = self._realization_mismatch(real)
-                    mismatches[(ensname, realidx)]["REAL"] = realidx
-                    mismatches[(ensname, realidx)]["ENSEMBLE"] = ensname
-            return pd.concat(mismatches, axis=0, ignore_index=True)
+            realitems = [
+                ((ensname, realidx), real)
+                for ensname, ens in ens_or_real._ensembles.items()
+                for realidx, real in ens._realizations.items()
+            ]
         elif isinstance(ens_or_real, ScratchEnsemble):
-            mismatches = {}
-            for realidx, real in ens_or_real._realizations.items():
-                mismatches[realidx] = self._realization_mismatch(real)
-                mismatches[realidx]["REAL"] = realidx
-            return pd.concat(mismatches, axis=0, ignore_index=True, sort=False)
+            realitems = [
+                ((None, realidx), real)
+                for realidx, real in ens_or_real._realizations.items()
+            ]
         elif isinstance(ens_or_real, VirtualEnsemble):
-            mismatches = {}
-            for realidx in ens_or_real.realindices:
-                mismatches[realidx] = self._realization_mismatch(
-                    ens_or_real.get_realization(realidx)
-                )
-                mismatches[realidx]["REAL"] = realidx
-            return pd.concat(mismatches, axis=0, ignore_index=True, sort=False)
+            # Extracted here, so that only the realization is sent to
+            # a worker process, not the whole ensemble
+            realitems = [
+                ((None, realidx), ens_or_real.get_realization(realidx))
+                for realidx in ens_or_real.realindices
+            ]
         elif isinstance(ens_or_real, (ScratchRealization, VirtualRealization)):
             return self._realization_mismatch(ens_or_real)
-        elif isinstance(ens_or_real, EnsembleSet):
-            pass
         else:
             raise ValueError("Unsupported object for mismatch calculation")
-        return None
+
+        mismatches = {}
+        for realitem, mismatch in parallel_map(
+            functools.partial(_tagged_realization_mismatch, self),
+            realitems,
+            workers,
+            executor,
+        ):
+            mismatches[realitem[0]] = mismatch
+        if not mismatches:
+            return pd.DataFrame()
+        return pd.concat(mismatches, axis=0, ignore_index=True, sort=False)
 
     def load_smry(self, realization, smryvector, time_index="yearly", smryerror=None):
         """Add an observation unit from a VirtualRealization or
@@ -200,20 +232,24 @@ class Observations(object):
                 {"value": value, "error": smryerror, "date": date}
             )
         self.observations["smry"].append(virtobs)
+        self._compile_observations()
 
     def __len__(self):
+        """Return the number of observations present
 
-        """Return the number of observation units present"""
-        # This is not correctly implemented yet..
-        return len(self.observations.keys())
+        Every date in a smry observation unit counts as one
+        observation. Observations in categories not supported
+        in mismatch calculations (rft) are not counted."""
+        self._ensure_compiled()
+        return len(self._obsindex)
 
     @property
     def empty(self):
         """Decide if the observation set is empty
 
-        An empty observation set is has zero observation
-        unit count"""
-        return not self.__len__()
+        An empty observation set has no observation units in any
+        category, including those not counted by len() (rft)."""
+        return not any(self.observations.values())
 
     def keys(self):
         """Return a list of observation units present.
@@ -251,129 +287,152 @@ class Observations(object):
         """
         # mismatch_df = pd.DataFrame(columns=['OBSTYPE', 'OBSKEY',
         #     'DATE', 'OBSINDEX', 'MISMATCH', 'L1', 'L2', 'SIGN'])
-        mismatches = []
-        for obstype in self.observations.keys():
-            for obsunit in self.observations[obstype]:  # (list)
+        mismatch_dfs = []
+        for obstype, obsrows in self._compiled.items():
+            if obstype == "smry":
+                mismatch_dfs.append(self._realization_smry_mismatch(real))
+                continue
+            mismatches = []
+            for obsrow in obsrows.itertuples(index=False):
                 if obstype == "txt":
                     try:
-                        sim_value = real.get_df(obsunit["localpath"])[obsunit["key"]]
+                        sim_value = real.get_df(obsrow.LOCALPATH)[obsrow.KEY]
                     except KeyError:
                         logger.warning(
-                            "%s in %s not found, ignored",
-                            obsunit["key"],
-                            obsunit["localpath"],
+                            "%s in %s not found, ignored", obsrow.KEY, obsrow.LOCALPATH
                         )
                         continue
                     except ValueError:
-                        logger.warning("%s not found, ignored", obsunit["localpath"])
+                        logger.warning("%s not found, ignored", obsrow.LOCALPATH)
                         continue
-                    mismatch = float(sim_value - obsunit["value"])
+                    mismatch = float(sim_value - obsrow.OBSVALUE)
                     measerror = 1
                     sign = (mismatch > 0) - (mismatch < 0)
                     mismatches.append(
                         dict(
                             OBSTYPE=obstype,
-                            OBSKEY=str(obsunit["localpath"])
-                            + "/"
-                            + str(obsunit["key"]),
+                            OBSKEY=obsrow.OBSKEY,
                             MISMATCH=mismatch,
                             L1=abs(mismatch),
                             L2=abs(mismatch) ** 2,
                             SIMVALUE=sim_value,
-                            OBSVALUE=obsunit["value"],
+                            OBSVALUE=obsrow.OBSVALUE,
                             MEASERROR=measerror,
                             SIGN=sign,
                         )
                     )
                 if obstype == "scalar":
                     try:
-                        sim_value = real.get_df(obsunit["key"])
+                        sim_value = real.get_df(obsrow.KEY)
                     except ValueError:
                         logger.warning(
-                            "No data found for scalar: %s, ignored", obsunit["key"]
+                            "No data found for scalar: %s, ignored", obsrow.KEY
                         )
                         continue
-                    mismatch = float(sim_value - obsunit["value"])
+                    mismatch = float(sim_value - obsrow.OBSVALUE)
                     measerror = 1
                     sign = (mismatch > 0) - (mismatch < 0)
                     mismatches.append(
                         dict(
                             OBSTYPE=obstype,
-                            OBSKEY=str(obsunit["key"]),
+                            OBSKEY=obsrow.OBSKEY,
                             MISMATCH=mismatch,
                             L1=abs(mismatch),
                             SIMVALUE=sim_value,
-                            OBSVALUE=obsunit["value"],
+                            OBSVALUE=obsrow.OBSVALUE,
                             MEASERROR=measerror,
                             L2=abs(mismatch) ** 2,
                             SIGN=sign,
                         )
                     )
                 if obstype == "smryh":
-                    if "time_index" in obsunit:
+                    if obsrow.TIME_INDEX is not None:
                         sim_hist = real.get_smry(
-                            time_index=obsunit["time_index"],
-                            column_keys=[obsunit["key"], obsunit["histvec"]],
+                            time_index=obsrow.TIME_INDEX,
+                            column_keys=[obsrow.KEY, obsrow.HISTVEC],
                         )
                     else:
                         sim_hist = real.get_smry(
-                            column_keys=[obsunit["key"], obsunit["histvec"]]
+                            column_keys=[obsrow.KEY, obsrow.HISTVEC]
                             # (let get_smry() determine the possible time_index)
                         )
                     # If empty df returned, we don't have the data for this:
                     if sim_hist.empty:
                         logger.warning(
                             "No data found for smryh: %s and %s, ignored.",
-                            obsunit["key"],
-                            obsunit["histvec"],
+                            obsrow.KEY,
+                            obsrow.HISTVEC,
                         )
                         continue
                     sim_hist["mismatch"] = (
-                        sim_hist[obsunit["key"]] - sim_hist[obsunit["histvec"]]
+                        sim_hist[obsrow.KEY] - sim_hist[obsrow.HISTVEC]
                     )
                     measerror = 1
                     mismatches.append(
                         dict(
                             OBSTYPE="smryh",
-                            OBSKEY=obsunit["key"],
+                            OBSKEY=obsrow.OBSKEY,
                             MISMATCH=sim_hist["mismatch"].sum(),
                             MEASERROR=measerror,
                             L1=sim_hist["mismatch"].abs().sum(),
                             L2=math.sqrt((sim_hist["mismatch"] ** 2).sum()),
                         )
                     )
-                if obstype == "smry":
-                    # For 'smry', there is a list of
-                    # observations (indexed by date)
-                    for unit in obsunit["observations"]:
-                        try:
-                            sim_value = real.get_smry(
-                                time_index=[unit["date"]], column_keys=obsunit["key"]
-                            )[obsunit["key"]].values[0]
-                        except KeyError:
-                            logger.warning(
-                                "No data found for smry: %s at %s, ignored.",
-                                obsunit["key"],
-                                str(unit["date"]),
-                            )
-                            continue
-                        mismatch = float(sim_value - unit["value"])
-                        sign = (mismatch > 0) - (mismatch < 0)
-                        mismatches.append(
-                            dict(
-                                OBSTYPE="smry",
-                                OBSKEY=obsunit["key"],
-                                DATE=unit["date"],
-                                MEASERROR=unit["error"],
-                                MISMATCH=mismatch,
-                                OBSVALUE=unit["value"],
-                                SIMVALUE=sim_value,
-                                L1=abs(mismatch),
-                                L2=abs(mismatch) ** 2,
-                                SIGN=sign,
-                            )
-                        )
-        return pd.DataFrame(mismatches)
+            mismatch_dfs.append(pd.DataFrame(mismatches))
+        mismatch_dfs = [dframe for dframe in mismatch_dfs if not dframe.empty]
+        if not mismatch_dfs:
+            return pd.DataFrame()
+        return pd.concat(mismatch_dfs, ignore_index=True, sort=False)
+
+    def _realization_smry_mismatch(self, real):
+        """Compute the mismatch for all smry observations
+        to a realization.
+
+        All summary vectors needed are extracted in one get_smry()
+        call at the union of the observation dates, and the mismatch
+        columns are computed as vectors.
+
+        Args:
+            real : ScratchRealization or VirtualRealization
+        Returns:
+            dataframe: One row per observation (date) with mismatch
+                data, columns as in _realization_mismatch().
+        """
+        obs_df = self._compiled["smry"]
+        smrykeys = list(obs_df["OBSKEY"].unique())
+        sim_df = _get_smry_at(real, smrykeys, self._smrydates)
+
+        for smrykey in smrykeys:
+            if smrykey not in sim_df:
+                logger.warning("No data found for smry: %s, ignored.", smrykey)
+        obs_df = obs_df[obs_df["OBSKEY"].isin(sim_df.columns)]
+        if obs_df.empty:
+            return pd.DataFrame()
+
+        # Look up the simulated value for every observation:
+        keyidx = sim_df.columns.get_indexer(obs_df["OBSKEY"])
+        dateidx = pd.Index(sim_df.index).get_indexer(pd.to_datetime(obs_df["DATE"]))
+        simvalues = sim_df.values[dateidx, keyidx].astype(np.float64)
+        obsvalues = obs_df["OBSVALUE"].values.astype(np.float64)
+        mismatch = simvalues - obsvalues
+        return pd.DataFrame(
+            OrderedDict(
+                [
+                    ("OBSTYPE", "smry"),
+                    ("OBSKEY", obs_df["OBSKEY"].values),
+                    ("DATE", obs_df["DATE"].values),
+                    ("MEASERROR", obs_df["MEASERROR"].values),
+                    ("MISMATCH", mismatch),
+                    ("OBSVALUE", obs_df["OBSVALUE"].values),
+                    ("SIMVALUE", simvalues),
+                    ("L1", np.abs(mismatch)),
+                    ("L2", mismatch ** 2),
+                    # Comparisons are False for NaN, so missing
+                    # simulated values get zero sign, not a garbage integer:
+                    ("SIGN", (mismatch > 0).astype(int) - (mismatch < 0).astype(int)),
+                ]
+            )
+        )
 
     def _realization_misfit(self, real, defaulterrors=False, corr=None):
         """The misfit value for the observation set
@@ -384,33 +443,262 @@ class Observations(object):
             real : a ScratchRealization or a VirtualRealization
             defaulterrors: (boolean) If set to True, zero measurement errors
                 will be set to 1.
-            corr : correlation or weigthing matrix (numpy matrix).
-                If a list or numpy vector is supplied, it is interpreted
-                as a diagonal matrix. If omitted, the identity matrix is used
+            corr : error covariance matrix (numpy array). If a list or
+                numpy vector is supplied, it is interpreted as a diagonal
+                matrix. If omitted, the squared measurement errors are used
+                as the diagonal.
 
         Returns:
             float : the misfit value for the observation set and realization
         """  # noqa
-        if corr:
-            raise NotImplementedError(
-                "correlations in misfit " + "calculation is not supported"
+        return self.misfit(real, defaulterrors=defaulterrors, covariance=corr)
+
+    def misfit(
+        self,
+        ens_or_real,
+        defaulterrors=False,
+        covariance=None,
+        workers=None,
+        executor=None,
+    ):
+        """Compute the misfit for a realization or for every
+        realization in an ensemble.
+
+        The misfit for a realization is r^T C^-1 r, where r is the
+        vector of mismatches and C is the error covariance matrix.
+        The observations (rows and columns in C) are ordered as in the
+        observation set, see observation_table(). Observations not
+        found for a realization are treated as having zero mismatch.
+
+        A full covariance matrix C is Cholesky factorized, C = L L^T,
+        and the inverse of L is computed once and reused as long as the
+        same matrix is given. The misfits for all realizations are then
+        computed in one matrix product.
+
+        Args:
+            ens_or_real: ScratchRealization, VirtualRealization,
+                ScratchEnsemble, VirtualEnsemble or EnsembleSet
+            defaulterrors: boolean. If True, zero measurement errors
+                are set to 1 when no covariance is given. If False,
+                zero measurement errors give a ValueError.
+            covariance: numpy array. Either a square symmetric positive
+                definite matrix, or a vector with its diagonal (the
+                variances). Default None means the squared measurement
+                errors on the diagonal.
+            workers: int, number of threads for the mismatch computation.
+            executor: concurrent.futures.Executor for the mismatch
+                computation, overrides workers.
+
+        Returns:
+            float for realizations. For ensembles, a dataframe with the
+            columns REAL (and ENSEMBLE for ensemble sets) and MISFIT, one
+            row for every realization.
+
+        Raises:
+            ValueError if the covariance does not match the number of
+            observations, or is not positive definite, or if a mismatch
+            can't be matched to an observation.
+        """
+        self._ensure_compiled()
+        if covariance is not None:
+            covariance = np.asarray(covariance, dtype=np.float64)
+            nobs = len(self._obsindex)
+            if covariance.shape not in [(nobs,), (nobs, nobs)]:
+                raise ValueError(
+                    (
+                        "Covariance must be a vector of length {0} or a {0}x{0} "
+                        + "matrix for this observation set, not of shape {1}"
+                    ).format(nobs, covariance.shape)
+                )
+        isrealization = isinstance(
+            ens_or_real, (ScratchRealization, VirtualRealization)
+        )
+        mismatch = self._mismatch(ens_or_real, workers=workers, executor=executor)
+        tagcolumns = [col for col in ["ENSEMBLE", "REAL"] if col in mismatch]
+        if mismatch.empty:
+            if isrealization:
+                return 0.0
+            return pd.DataFrame(columns=tagcolumns + ["MISFIT"])
+
+        obstable = self._obsindex
+        if not obstable["LABEL"].is_unique:
+            raise ValueError(
+                "Duplicated observations in observation set, can't calculate misfit"
+            )
+        labels = _observation_labels(mismatch)
+        obsidx = pd.Index(obstable["LABEL"]).get_indexer(labels)
+        if (obsidx < 0).any():
+            raise ValueError(
+                "Mismatches for observations not in the observation set: "
+                + str(sorted(set(labels[obsidx < 0])))
             )
-        mismatch = self._realization_mismatch(real)
 
-        zeroerrors = mismatch["MEASERROR"] < 1e-7
-        if defaulterrors:
-            mismatch[zeroerrors]["MEASERROR"] = 1
+        # Align the mismatches to a realization x observation array
+        if tagcolumns:
+            # Realizations numbered in order of appearance:
+            realcodes = mismatch.groupby(tagcolumns, sort=False).ngroup().values
+            realtags = mismatch[tagcolumns].drop_duplicates()
         else:
+            realcodes = np.zeros(len(mismatch), dtype=int)
+            realtags = [None]
+        residuals = np.full((len(realtags), len(obstable)), np.nan)
+        # Residuals with the square L2, which for smryh is the
+        # root of the sum of squared mismatches over time:
+        residuals[realcodes, obsidx] = np.sign(mismatch["MISMATCH"].values) * np.sqrt(
+            mismatch["L2"].values
+        )
+
+        if covariance is None:
+            variances = obstable["MEASERROR"].values.astype(np.float64) ** 2
+            zeroerrors = variances < 1e-14
+            zeroerrors[np.setdiff1d(np.arange(len(obstable)), obsidx)] = False
             if zeroerrors.any():
-                print(mismatch[zeroerrors])
-                raise ValueError(
-                    "Zero measurement error in observation set"
-                    + ". can't be used to calculate misfit"
+                if defaulterrors:
+                    variances[zeroerrors] = 1
+                else:
+                    logger.error(
+                        "Zero measurement errors for %s",
+                        str(list(obstable["LABEL"][zeroerrors])),
+                    )
+                    raise ValueError(
+                        "Zero measurement error in observation set"
+                        + ". can't be used to calculate misfit"
+                    )
+            misfits = _batched_misfit(residuals, variances)
+        else:
+            if covariance.ndim == 2:
+                misfits = _batched_misfit(
+                    residuals, whitening=self._whitening_matrix(covariance)
+                )
+            else:
+                misfits = _batched_misfit(residuals, covariance)
+
+        if isrealization:
+            return float(misfits[0])
+        misfit_df = realtags.reset_index(drop=True)
+        misfit_df["MISFIT"] = misfits
+        return misfit_df
+
+    def _whitening_matrix(self, covariance):
+        """Return the inverse of the lower triangular Cholesky factor
+        of a covariance matrix, reusing the result for the previous
+        matrix if it is the same"""
+        digest = hashlib.sha1(np.ascontiguousarray(covariance).tobytes()).hexdigest()
+        if self._whitening is None or self._whitening[0] != digest:
+            try:
+                cholesky = np.linalg.cholesky(covariance)
+            except np.linalg.LinAlgError:
+                raise ValueError("Covariance matrix is not positive definite")
+            # Computed once, each misfit is then a matrix-vector product
+            inverse = np.linalg.solve(cholesky, np.eye(len(cholesky)))
+            self._whitening = (digest, inverse)
+        return self._whitening[1]
+
+    def observation_table(self):
+        """Return a dataframe with one row for every observation.
+
+        This is the order of the observations in misfit calculations.
+        The rows are ordered by category, and then as in the
+        observation set. smry observation units give one row per date.
+
+        Returns:
+            dataframe with the columns OBSTYPE, OBSKEY, DATE (only
+            for smry), OBSVALUE, MEASERROR and LABEL, a unique string
+            for each observation.
+        """
+        self._ensure_compiled()
+        return self._obsindex[
+            ["OBSTYPE", "OBSKEY", "DATE", "OBSVALUE", "MEASERROR", "LABEL"]
+        ].copy()
+
+    def _compile_observations(self):
+        """Compile the observation set into columnar form.
+
+        Each observation category is represented by a dataframe with
+        one row per observation, stored in the dict self._compiled,
+        and self._obsindex has the rows from all categories, in the
+        order given by the observation set. Mismatch and misfit
+        calculations work from these, and not from the dict structure.
+
+        The compiled form is recompiled by _ensure_compiled() when
+        the observation dict has been modified. This is checked once
+        in each public method using it, not for every realization.
+        """
+        self._digest = _observations_digest(self.observations)
+        columns = {
+            "txt": ["OBSKEY", "LOCALPATH", "KEY", "OBSVALUE", "MEASERROR"],
+            "scalar": ["OBSKEY", "KEY", "OBSVALUE", "MEASERROR"],
+            "smryh": ["OBSKEY", "KEY", "HISTVEC", "TIME_INDEX", "MEASERROR"],
+            "smry": ["OBSKEY", "DATE", "OBSVALUE", "MEASERROR"],
+        }
+        self._compiled = OrderedDict()
+        for obstype in self.observations.keys():
+            if obstype not in columns:
+                continue
+            rows = []
+            for obsunit in self.observations[obstype]:
+                if obstype == "txt":
+                    rows.append(
+                        (
+                            str(obsunit["localpath"]) + "/" + str(obsunit["key"]),
+                            obsunit["localpath"],
+                            obsunit["key"],
+                            obsunit["value"],
+                            1,
+                        )
+                    )
+                elif obstype == "scalar":
+                    rows.append(
+                        (str(obsunit["key"]), obsunit["key"], obsunit["value"], 1)
+                    )
+                elif obstype == "smryh":
+                    rows.append(
+                        (
+                            obsunit["key"],
+                            obsunit["key"],
+                            obsunit["histvec"],
+                            obsunit.get("time_index"),
+                            1,
+                        )
+                    )
+                elif obstype == "smry":
+                    for unit in obsunit["observations"]:
+                        rows.append(
+                            (obsunit["key"], unit["date"], unit["value"], unit["error"])
+                        )
+            if rows:
+                # The time_index for smryh can be anything, keep it as is:
+                self._compiled[obstype] = pd.DataFrame(
+                    rows,
+                    columns=columns[obstype],
+                    dtype=object if obstype == "smryh" else None,
                 )
-        if "MISFIT" not in mismatch.columns:
-            mismatch["MISFIT"] = mismatch["L2"] / (mismatch["MEASERROR"] ** 2)
 
-        return mismatch["MISFIT"].sum()
+        obsindex = [
+            obsrows.assign(OBSTYPE=obstype)
+            for obstype, obsrows in self._compiled.items()
+        ]
+        if obsindex:
+            obsindex = pd.concat(obsindex, ignore_index=True, sort=False)
+        else:
+            obsindex = pd.DataFrame(columns=["OBSTYPE", "OBSKEY", "MEASERROR"])
+        for column in ["DATE", "OBSVALUE"]:
+            if column not in obsindex:
+                obsindex[column] = None
+        obsindex["LABEL"] = _observation_labels(obsindex)
+        self._obsindex = obsindex
+
+        if "smry" in self._compiled:
+            self._smrydates = sorted(set(self._compiled["smry"]["DATE"]))
+        else:
+            self._smrydates = []
+
+    def _ensure_compiled(self):
+        """Compile the observations again if the observation dict has
+        been modified since it was last compiled"""
+        if self._digest != _observations_digest(self.observations):
+            logger.info("Observations modified, compiling again")
+            self._compile_observations()
 
     def _clean_observations(self):
         """Verify integrity of observations, remove
@@ -520,3 +808,100 @@ class Observations(object):
             os.makedirs(dirname)
         with open(filename, "w") as fhandle:
             fhandle.write(self.to_yaml())
+
+
+def _tagged_realization_mismatch(observations, realitem):
+    """Compute the mismatch for one realization in an ensemble,
+    and tag the rows with REAL and possibly ENSEMBLE.
+
+    Module level function, so that it can be sent to process pools.
+
+    Args:
+        observations: Observations object
+        realitem: tuple with a tuple (ensemble name or None,
+            realization index), and the realization.
+    """
+    (ensname, realidx), real = realitem
+    if ensname is not None:
+        logger.info(
+            "Calculating mismatch for ensemble %s realization %s", ensname, realidx
+        )
+    mismatch = observations._realization_mismatch(real)
+    mismatch["REAL"] = realidx
+    if ensname is not None:
+        mismatch["ENSEMBLE"] = ensname
+    return mismatch
+
+
+def _observations_digest(observations):
+    """Fingerprint of the contents of an observation dict"""
+    return hashlib.sha1(repr(observations).encode("utf-8")).hexdigest()
+
+
+def _observation_labels(dframe):
+    """Unique strings identifying observations, from the columns
+    OBSTYPE, OBSKEY and DATE in a mismatch dataframe or
+    an observation table"""
+    labels = dframe["OBSTYPE"].astype(str) + "/" + dframe["OBSKEY"].astype(str)
+    if "DATE" in dframe:
+        dated = dframe["OBSTYPE"] == "smry"
+        labels[dated] = labels[dated] + "@" + dframe["DATE"][dated].astype(str)
+    return labels.values
+
+
+def _batched_misfit(residuals, variances=None, whitening=None):
+    """Compute r^T C^-1 r for every row r in an array
+
+    Missing (NaN) residuals do not contribute.
+
+    Args:
+        residuals: numpy array, realization x observation.
+        variances: numpy vector, the diagonal of C.
+        whitening: numpy array, the inverse of the lower triangular
+            Cholesky factor L of C. Used if variances is not given.
+
+    Returns:
+        numpy vector, one misfit value for every row.
+    """
+    if variances is not None:
+        return np.nansum(residuals ** 2 / variances, axis=1)
+    # z = L^-1 r for all realizations at once, r^T C^-1 r = z^T z
+    whitened = whitening.dot(np.nan_to_num(residuals).T)
+    return (whitened ** 2).sum(axis=0)
+
+
+def _get_smry_at(real, smrykeys, dates):
+    """Extract summary vectors from a realization at a set of dates
+
+    One get_smry() call is made for all vectors. If this does not give
+    all vectors (a ScratchRealization returns nothing at all if one of
+    them is missing), each vector is extracted separately.
+
+    Args:
+        real: ScratchRealization or VirtualRealization
+        smrykeys: list of summary vector names
+        dates: sorted list of dates
+
+    Returns:
+        dataframe with the dates as a DatetimeIndex, and one column
+        for each vector found.
+    """
+
+    def _get_smry(column_keys):
+        try:
+            dframe = real.get_smry(time_index=list(dates), column_keys=column_keys)
+        except (KeyError, ValueError):
+            return pd.DataFrame()
+        if "DATE" in dframe.columns:
+            dframe = dframe.set_index("DATE")
+        dframe.index = pd.to_datetime(dframe.index)
+        return dframe[[key for key in column_keys if key in dframe.columns]]
+
+    sim_df = _get_smry(smrykeys)
+    if len(sim_df.columns) < len(smrykeys) and len(smrykeys) > 1:
+        sim_dfs = [_get_smry([smrykey]) for smrykey in smrykeys]
+        sim_dfs = [dframe for dframe in sim_dfs if len(dframe.columns)]
+        if not sim_dfs:
+            return pd.DataFrame()
+        sim_df = pd.concat(sim_dfs, axis=1)
+    return sim_df
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Helpers for running realization-wise work concurrently
+
+The ensemble classes loop over their realizations for most of their
+work, and for ensembles on network file systems most of the wall time
+is spent waiting for I/O. The functions here let that work be fanned
+out to a pool of threads, or to any concurrent.futures executor
+supplied by the user (e.g. a process pool).
+
+Only about as many items as there are workers are submitted at a
+time, so that results are held in memory only until they have been
+consumed, and the memory used does not grow with the number of
+realizations.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import itertools
+import multiprocessing
+from collections import OrderedDict
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+except ImportError:
+    # Python 2 without the 'futures' backport, we can only run serially
+    ThreadPoolExecutor = None
+    wait = None
+    FIRST_COMPLETED = None
+
+from .etc import Interaction
+
+xfmu = Interaction()
+logger = xfmu.functionlogger(__name__)
+
+
+def parallel_map(
+    func, items, workers=None, executor=None, ordered=True, maxpending=None
+):
+    """Apply a function to every item, possibly concurrently.
+
+    Exceptions raised by func are re-raised when the corresponding
+    result is reached.
+
+    Args:
+        func: callable taking one argument. Must be picklable
+            (a module level function or a functools.partial of one)
+            if a process pool executor is supplied.
+        items: iterable of arguments to func. Items are only taken
+            from it as they are submitted, so a generator can be used
+            to make large items on demand.
+        workers: int, number of worker threads to use. None or 1
+            means serial execution in the calling thread.
+        executor: concurrent.futures.Executor (thread or process pool)
+            to submit the work to. Overrides workers. The executor is
+            not shut down afterwards.
+        ordered: boolean. If True, results are yielded in the order of
+            the incoming items. If False, results are yielded as soon
+            as they are ready.
+        maxpending: int, maximal number of items submitted and not yet
+            yielded. Defaults to the number of workers in the pool.
+
+    Returns:
+        generator of (item, result) tuples.
+    """
+    items = iter(items)
+    firstitems = list(itertools.islice(items, 2))
+    items = itertools.chain(firstitems, items)
+    if executor is None and (not workers or workers < 2 or len(firstitems) < 2):
+        for item in items:
+            yield item, func(item)
+        return
+    if executor is None and ThreadPoolExecutor is None:
+        logger.warning("concurrent.futures not available, running serially")
+        for item in items:
+            yield item, func(item)
+        return
+
+    if executor is None:
+        pool = ThreadPoolExecutor(max_workers=int(workers))
+    else:
+        pool = executor
+    if maxpending is None:
+        maxpending = _pool_size(pool)
+    pending = OrderedDict()  # future -> item, in order of submission
+    try:
+        for item in itertools.islice(items, max(1, maxpending)):
+            pending[pool.submit(func, item)] = item
+        while pending:
+            if ordered:
+                done = [next(iter(pending))]
+            else:
+                done = wait(list(pending), return_when=FIRST_COMPLETED)[0]
+            for future in done:
+                item = pending.pop(future)
+                result = future.result()
+                for nextitem in itertools.islice(items, 1):
+                    pending[pool.submit(func, nextitem)] = nextitem
+                yield item, result
+            # Do not keep the yielded items and results alive while waiting
+            done = future = item = result = None
+    finally:
+        if executor is None:
+            pool.shutdown(wait=True)
+
+
+def _pool_size(pool):
+    """Return the number of workers in an executor, guessing if
+    it is not known"""
+    size = getattr(pool, "_max_workers", None)
+    if not size:
+        size = multiprocessing.cpu_count()
+    return size
@@ -29,12 +29,18 @@ from ecl.grid import EclGrid
 from ecl import EclFileFlagEnum
 
 from .etc import Interaction
+from .fileregistry import FileRegistry
+from .cache import DiskCache, LRUCache
+from .eclfiles import EclFileCache
 from .virtualrealization import VirtualRealization
 from .realizationcombination import RealizationCombination
 
 fmux = Interaction()
 logger = fmux.basiclogger(__name__)
 
+# Default maximal number of EclSum objects in ScratchRealization.eclsum_cache
+ECLSUM_CACHE_MAXCOUNT = 100
+
 
 class ScratchRealization(object):
     r"""A representation of results still present on disk
@@ -50,15 +56,16 @@ class ScratchRealization(object):
     When asked for, this object will return data from the
     filesystem (or from cache if already computed).
 
-    The files dataframe is the central filesystem pointer
-    repository for the object. It will at least contain
-    the columns
+    The file registry is the central filesystem pointer
+    repository for the object. It is available as the
+    files dataframe, which will at least contain the columns
     * FULLPATH absolute path to a file
     * FILETYPE filename extension (after last dot)
     * LOCALPATH relative filename inside realization diretory
     * BASENAME filename only. No path. Includes extension
 
-    This dataframe is available as a read-only property from the object
+    The dataframe is built on demand, modifying it does not
+    modify the realization unless it is assigned back.
 
     Args:
         path (str): absolute or relative path to a directory
@@ -74,12 +81,47 @@ class ScratchRealization(object):
             override anything else.
         autodiscovery: boolean, whether the realization should try to
             auto-discover certain data (UNSMRY files in standard location)
+        lazy: boolean. If True, only the path and the index is
+            determined at initialization. STATUS, jobs.json, OK and
+            parameters.txt are then parsed on first access to the
+            internalized data or the files dataframe.
+            Default False.
+        cachedir: str, path to a directory for caching parsed file
+            contents (STATUS, txt, scalar and csv files) across
+            sessions. Cached contents are reused as long as the
+            source files have unchanged modification time and size.
+            Default None means no caching.
     """
 
-    def __init__(self, path, realidxregexp=None, index=None, autodiscovery=True):
+    # EclSum objects are cached here, shared by all realizations, keyed
+    # by the UNSMRY file (path, mtime and size) and include_restart. Set a budget with
+    # ScratchRealization.eclsum_cache.resize(maxcount=..., maxbytes=...)
+    eclsum_cache = LRUCache(maxcount=ECLSUM_CACHE_MAXCOUNT)
+
+    # Grid geometry (cell indices, corners and centres) is cached here,
+    # shared by all realizations, keyed by the EGRID file (path, mtime and
+    # size) and active_only. Set a budget with
+    # ScratchRealization.geometry_cache.resize(maxcount=..., maxbytes=...)
+    geometry_cache = LRUCache(maxcount=4)
+
+    # Open INIT and UNRST files, shared by all realizations. Set the
+    # maximal number of open files with
+    # ScratchRealization.eclfile_cache.resize(maxcount=...)
+    eclfile_cache = EclFileCache(maxcount=16)
+
+    def __init__(
+        self,
+        path,
+        realidxregexp=None,
+        index=None,
+        autodiscovery=True,
+        lazy=False,
+        cachedir=None,
+    ):
         self._origpath = os.path.abspath(path)
         self.index = None
         self._autodiscovery = autodiscovery
+        self._defaults_loaded = False
 
         if not realidxregexp:
             realidxregexp = re.compile(r"realization-(\d+)")
@@ -89,18 +131,17 @@ class ScratchRealization(object):
         if isinstance(realidxregexp, str):
             raise ValueError("Supplied realidxregexp not valid")
 
-        self.files = pd.DataFrame(
-            columns=["FULLPATH", "FILETYPE", "LOCALPATH", "BASENAME"]
-        )
-        self._eclsum = None  # Placeholder for caching
-        self._eclsum_include_restart = None  # Flag for cached object
+        self._files = FileRegistry()
+        if cachedir:
+            self._diskcache = DiskCache(cachedir)
+        else:
+            self._diskcache = None
+        self._eclsum_key = None  # Key in eclsum_cache for our EclSum
 
         # The datastore for internalized data. Dictionary
         # indexed by filenames (local to the realization).
         # values in the dictionary can be either dicts or dataframes
-        self.data = {}
-        self._eclinit = None
-        self._eclunrst = None
+        self._data = {}
         self._eclgrid = None
         self._ecldata = None
         self._actnum = None
@@ -125,6 +166,23 @@ class ScratchRealization(object):
         else:
             self.index = int(index)
 
+        if not lazy:
+            self._load_defaults()
+
+        logger.info("Initialized %s", abspath)
+
+    def _load_defaults(self):
+        """Discover and parse the files that are internalized by
+        default, STATUS (merged with jobs.json), OK and parameters.txt.
+
+        Only done once, at initialization or, for lazy realizations,
+        on first access to the data or the files.
+        """
+        if self._defaults_loaded:
+            return
+        self._defaults_loaded = True
+        abspath = self._origpath
+
         # Now look for some common files, but don't require any
         if os.path.exists(os.path.join(abspath, "STATUS")):
             filerow = {
@@ -133,7 +191,7 @@ class ScratchRealization(object):
                 "FULLPATH": os.path.join(abspath, "STATUS"),
                 "BASENAME": "STATUS",
             }
-            self.files = self.files.append(filerow, ignore_index=True)
+            self._files.add(filerow)
             self.load_status()
         else:
             logger.warning("No STATUS file, %s", abspath)
@@ -145,7 +203,7 @@ class ScratchRealization(object):
                 "FULLPATH": os.path.join(abspath, "jobs.json"),
                 "BASENAME": "jobs.json",
             }
-            self.files = self.files.append(filerow, ignore_index=True)
+            self._files.add(filerow)
 
         if os.path.exists(os.path.join(abspath, "OK")):
             self.load_scalar("OK")
@@ -153,7 +211,42 @@ class ScratchRealization(object):
         if os.path.exists(os.path.join(abspath, "parameters.txt")):
             self.load_txt("parameters.txt")
 
-        logger.info("Initialized %s", abspath)
+    @property
+    def data(self):
+        """The datastore for internalized data, a dictionary
+        indexed by filenames local to the realization. Values
+        are dataframes, dicts or scalars."""
+        self._load_defaults()
+        return self._data
+
+    @data.setter
+    def data(self, datastore):
+        self._load_defaults()
+        self._data = datastore
+
+    def _parse(self, fullpaths, parser, *args):
+        """Return parser(*args), through the disk cache if
+        the realization has one.
+
+        Args:
+            fullpaths: str or list of str, files read by the parser.
+            parser: module level function doing the parsing
+            args: arguments to the parser
+        """
+        if self._diskcache is None:
+            return parser(*args)
+        return self._diskcache.cached(fullpaths, parser, *args)
+
+    def __getstate__(self):
+        """Prepare the object for pickling, f.ex. when sent to
+        another process by a process pool.
+
+        The libecl objects cannot be pickled, they are dropped and
+        will be reopened on demand."""
+        state = self.__dict__.copy()
+        for eclobject in ["_eclgrid", "_actnum"]:
+            state[eclobject] = None
+        return state
 
     def runpath(self):
         """Return the runpath ("root") of the realization
@@ -230,40 +323,36 @@ class ScratchRealization(object):
         if not os.path.exists(fullpath):
             raise IOError("File not found: " + fullpath)
         else:
-            if fullpath in self.files["FULLPATH"].values and not force_reread:
+            if fullpath in self._files and not force_reread:
                 # Return cached version
-                return self.data[localpath]
-            elif fullpath not in self.files["FULLPATH"].values:
+                return self._data[localpath]
+            elif fullpath not in self._files:
                 filerow = {
                     "LOCALPATH": localpath,
                     "FILETYPE": localpath.split(".")[-1],
                     "FULLPATH": fullpath,
                     "BASENAME": os.path.split(localpath)[-1],
                 }
-                self.files = self.files.append(filerow, ignore_index=True)
-            try:
-                value = pd.read_csv(
-                    fullpath,
-                    header=None,
-                    sep="DONOTSEPARATEANYTHING *%magic%*",
-                    engine="python",
-                    skip_blank_lines=skip_blank_lines,
-                    skipinitialspace=skipinitialspace,
-                    comment=comment,
-                ).iloc[0, 0]
-            except pd.errors.EmptyDataError:
-                value = ""
+                self._files.add(filerow)
+            value = self._parse(
+                fullpath,
+                _parse_scalar,
+                fullpath,
+                comment,
+                skip_blank_lines,
+                skipinitialspace,
+            )
             if convert_numeric:
                 value = parse_number(value)
                 if not isinstance(value, str):
-                    self.data[localpath] = value
+                    self._data[localpath] = value
                 else:
                     # In case we are re-reading, we must
                     # ensure there is no value present now:
-                    if localpath in self.data:
-                        del self.data[localpath]
+                    if localpath in self._data:
+                        del self._data[localpath]
             else:
-                self.data[localpath] = value
+                self._data[localpath] = value
             return value
 
     def load_txt(self, localpath, convert_numeric=True, force_reread=False):
@@ -307,32 +396,19 @@ class ScratchRealization(object):
         if not os.path.exists(fullpath):
             raise IOError("File not found: " + fullpath)
         else:
-            if fullpath in self.files["FULLPATH"].values and not force_reread:
+            if fullpath in self._files and not force_reread:
                 # Return cached version
-                return self.data[localpath]
-            elif fullpath not in self.files["FULLPATH"].values:
+                return self._data[localpath]
+            elif fullpath not in self._files:
                 filerow = {
                     "LOCALPATH": localpath,
                     "FILETYPE": localpath.split(".")[-1],
                     "FULLPATH": fullpath,
                     "BASENAME": os.path.split(localpath)[-1],
                 }
-                self.files = self.files.append(filerow, ignore_index=True)
-            try:
-                keyvalues = pd.read_csv(
-                    fullpath,
-                    sep=r"\s+",
-                    index_col=0,
-                    dtype=str,
-                    usecols=[0, 1],
-                    header=None,
-                )[1].to_dict()
-            except pd.errors.EmptyDataError:
-                keyvalues = {}
-            if convert_numeric:
-                for key in keyvalues:
-                    keyvalues[key] = parse_number(keyvalues[key])
-            self.data[localpath] = keyvalues
+                self._files.add(filerow)
+            keyvalues = self._parse(fullpath, _parse_txt, fullpath, convert_numeric)
+            self._data[localpath] = keyvalues
             return keyvalues
 
     def load_csv(self, localpath, convert_numeric=True, force_reread=False):
@@ -361,30 +437,21 @@ class ScratchRealization(object):
             raise IOError("File not found: " + fullpath)
         else:
             # Look for cached version
-            if localpath in self.data and not force_reread:
-                return self.data[localpath]
+            if localpath in self._data and not force_reread:
+                return self._data[localpath]
             # Check the file store, append if not there
-            if localpath not in self.files["LOCALPATH"].values:
+            if not self._files.has_localpath(localpath):
                 filerow = {
                     "LOCALPATH": localpath,
                     "FILETYPE": localpath.split(".")[-1],
                     "FULLPATH": fullpath,
                     "BASENAME": os.path.split(localpath)[-1],
                 }
-                self.files = self.files.append(filerow, ignore_index=True)
-            try:
-                if convert_numeric:
-                    # Trust that Pandas will determine sensible datatypes
-                    # faster than the convert_numeric() function
-                    dtype = None
-                else:
-                    dtype = str
-                dframe = pd.read_csv(fullpath, dtype=dtype)
-            except pd.errors.EmptyDataError:
-                dframe = None  # or empty dataframe?
+                self._files.add(filerow)
+            dframe = self._parse(fullpath, _parse_csv, fullpath, convert_numeric)
 
             # Store parsed data:
-            self.data[localpath] = dframe
+            self._data[localpath] = dframe
             return dframe
 
     def load_status(self):
@@ -406,87 +473,10 @@ class ScratchRealization(object):
             # This should not happen as long as __init__ requires STATUS
             # to be present.
             return pd.DataFrame()  # will be empty
-        errorcolumns = ["error" + str(x) for x in range(0, 10)]
-        status = pd.read_csv(
-            statusfile,
-            sep=r"\s+",
-            skiprows=1,
-            header=None,
-            names=["FORWARD_MODEL", "colon", "STARTTIME", "dots", "ENDTIME"]
-            + errorcolumns,
-            dtype=str,
-            engine="python",
-            error_bad_lines=False,
-            warn_bad_lines=True,
-        )
-
-        # dtype str messes up a little bit, pre-Pandas 0.24.1 gives 'None' as
-        # a string where data is missing.
-        status.replace("None", "", inplace=True)
-        # While Pandas 0.24.1 will insert proper Null values in those cells,
-        # we fill them with the empty string for the rest of this code to work
-        status.fillna("", inplace=True)
-        # It should be ok to have both of these statements running, but the
-        # replace() is probably superfluous when pandas 0.23 is gone.
-
-        errorjobs = status[errorcolumns[0]] != ""
-
-        # Merge any error strings:
-        status.loc[errorjobs, "errorstring"] = (
-            status.loc[errorjobs, errorcolumns]
-            .astype(str)
-            .apply(" ".join, axis=1)
-            .apply(str.strip)
-        )
-        status.drop(errorcolumns, axis=1, inplace=True)
-
-        # Delete potential unwanted row
-        status = status[~((status.FORWARD_MODEL == "LSF") & (status.colon == "JOBID:"))]
-
-        if status.empty:
-            logger.warning("No parseable data in STATUS")
-            self.data["STATUS"] = status
-            return status
-
-        status = status.reset_index().drop("colon", axis=1).drop("dots", axis=1)
-
-        # Index the jobs, this makes it possible to match with jobs.json:
-        status.insert(0, "JOBINDEX", status.index.astype(int))
-        status = status.drop("index", axis=1)
-        # Calculate duration. Only Python 3.6 has time.fromisoformat().
-        # Warning: Unpandaic code..
-        durations = []
-        for _, jobrow in status.iterrows():
-            if not jobrow["ENDTIME"]:  # A job that is not finished.
-                durations.append(numpy.nan)
-            else:
-                hms = list(map(int, jobrow["STARTTIME"].split(":")))
-                start = datetime.combine(
-                    date.today(), time(hour=hms[0], minute=hms[1], second=hms[2])
-                )
-                hms = list(map(int, jobrow["ENDTIME"].split(":")))
-                end = datetime.combine(
-                    date.today(), time(hour=hms[0], minute=hms[1], second=hms[2])
-                )
-                # This works also when we have crossed 00:00:00.
-                # Jobs > 24 h will be wrong.
-                durations.append((end - start).seconds)
-        status["DURATION"] = durations
-
-        # Augment data from jobs.json if that file is available:
         jsonfilename = os.path.join(self._origpath, "jobs.json")
-        if jsonfilename and os.path.exists(jsonfilename):
-            try:
-                jobsinfo = json.load(open(jsonfilename))
-                jobsinfodf = pd.DataFrame(jobsinfo["jobList"])
-                jobsinfodf["JOBINDEX"] = jobsinfodf.index.astype(int)
-                # Outer merge means that we will also have jobs from
-                # jobs.json that has not started (failed or perhaps
-                # the jobs are still running on the cluster)
-                status = status.merge(jobsinfodf, how="outer", on="JOBINDEX")
-            except ValueError:
-                logger.warning("Parsing file %s failed, skipping", jsonfilename)
-        status.sort_values(["JOBINDEX"], ascending=True, inplace=True)
+        status = self._parse(
+            [statusfile, jsonfilename], _parse_status, statusfile, jsonfilename
+        )
         self.data["STATUS"] = status
         return status
 
@@ -639,8 +629,25 @@ class ScratchRealization(object):
         # calling function handle further errors.
         return shortpath
 
+    @property
+    def files(self):
+        """Return a dataframe with the files registered for
+        this realization, one row pr. file.
+
+        The dataframe is built on demand, changes to it will
+        only have effect if it is assigned back to this property.
+        """
+        self._load_defaults()
+        return self._files.to_dataframe()
+
+    @files.setter
+    def files(self, dframe):
+        """Replace the file registry with the contents of a dataframe"""
+        self._load_defaults()
+        self._files = FileRegistry.from_dataframe(dframe)
+
     def find_files(self, paths, metadata=None):
-        """Discover realization files. The files dataframe
+        """Discover realization files. The file registry
         will be updated.
 
         Certain functionality requires up-front file discovery,
@@ -662,9 +669,7 @@ class ScratchRealization(object):
         """
         if isinstance(paths, str):
             paths = [paths]
-        returnedslice = pd.DataFrame(
-            columns=["FULLPATH", "FILETYPE", "LOCALPATH", "BASENAME"]
-        )
+        discovered = FileRegistry()
         for searchpath in paths:
             globs = glob.glob(os.path.join(self._origpath, searchpath))
             for match in globs:
@@ -675,14 +680,12 @@ class ScratchRealization(object):
                     "FULLPATH": absmatch,
                     "BASENAME": os.path.basename(match),
                 }
-                # Delete this row if it already exists, determined by FULLPATH
-                if absmatch in self.files["FULLPATH"].values:
-                    self.files = self.files[self.files["FULLPATH"] != absmatch]
                 if metadata:
                     filerow.update(metadata)
-                self.files = self.files.append(filerow, ignore_index=True)
-                returnedslice = returnedslice.append(filerow, ignore_index=True)
-        return returnedslice
+                # An existing row for the same FULLPATH is replaced
+                self._files.add(filerow)
+                discovered.add(filerow)
+        return discovered.to_dataframe()
 
     @property
     def parameters(self):
@@ -693,6 +696,24 @@ class ScratchRealization(object):
         """
         return self.data["parameters.txt"]
 
+    @property
+    def _eclsum(self):
+        """The EclSum object for this realization if it is currently
+        in the shared cache, otherwise None"""
+        if self._eclsum_key is None:
+            return None
+        return self.eclsum_cache.peek(self._eclsum_key)
+
+    @_eclsum.setter
+    def _eclsum(self, eclsum):
+        """Only setting to None is supported, which removes the
+        EclSum object from the cache so it can be garbage collected."""
+        if eclsum is not None:
+            raise ValueError("Use get_eclsum() to cache EclSum objects")
+        if self._eclsum_key is not None:
+            self.eclsum_cache.pop(self._eclsum_key)
+        self._eclsum_key = None
+
     def get_eclsum(self, cache=True, include_restart=True):
         """
         Fetch the Eclipse Summary file from the realization
@@ -706,9 +727,14 @@ class ScratchRealization(object):
         If you have multiple UNSMRY files in eclipse/model
         turning off autodiscovery is strongly recommended.
 
+        EclSum objects are cached in ScratchRealization.eclsum_cache,
+        which is shared by all realizations and has an optional budget
+        on the number of objects or their size, evicting the least
+        recently used objects.
+
         Arguments:
-            cache: boolean indicating whether we should keep an
-                object reference to the EclSum object. Set to
+            cache: boolean indicating whether we should look up and keep
+                the EclSum object in the shared cache. Set to
                 false if you need to conserve memory.
             include_restart: boolean sent to libecl for whether restarts
                 files should be traversed
@@ -717,14 +743,22 @@ class ScratchRealization(object):
            EclSum: object representing the summary file. None if
                nothing was found.
         """
-        if cache and self._eclsum:  # Return cached object if available
-            if self._eclsum_include_restart == include_restart:
-                return self._eclsum
+        if cache and self._eclsum_key is not None:
+            if self._eclsum_key[1] == include_restart:
+                # Only if the file has not changed since it was read:
+                key = _eclsum_cache_key(self._eclsum_key[0], include_restart)
+                if key == self._eclsum_key:
+                    eclsum = self.eclsum_cache.get(key)
+                    if eclsum is not None:
+                        return eclsum
+                else:
+                    self.eclsum_cache.pop(self._eclsum_key)
+                    self._eclsum_key = None
 
-        unsmry_file_row = self.files[self.files.FILETYPE == "UNSMRY"]
+        unsmry_file_rows = self._files.by_filetype("UNSMRY")
         unsmry_filename = None
-        if len(unsmry_file_row) == 1:
-            unsmry_filename = unsmry_file_row.FULLPATH.values[0]
+        if len(unsmry_file_rows) == 1:
+            unsmry_filename = unsmry_file_rows[0]["FULLPATH"]
         elif self._autodiscovery:
             unsmry_fileguess = os.path.join(self._origpath, "eclipse/model", "*.UNSMRY")
             unsmry_filenamelist = glob.glob(unsmry_fileguess)
@@ -741,8 +775,15 @@ class ScratchRealization(object):
             # There is no UNSMRY file to be found.
             return None
 
-        if not os.path.exists(unsmry_filename):
+        key = _eclsum_cache_key(unsmry_filename, include_restart)
+        if key is None:
             return None
+        if cache:
+            # Possibly cached by another realization object
+            eclsum = self.eclsum_cache.get(key)
+            if eclsum is not None:
+                self._eclsum_key = key
+                return eclsum
         try:
             eclsum = ecl.summary.EclSum(
                 unsmry_filename, lazy_load=False, include_restart=include_restart
@@ -754,8 +795,8 @@ class ScratchRealization(object):
             return None
 
         if cache:
-            self._eclsum = eclsum
-            self._eclsum_include_restart = include_restart
+            self.eclsum_cache.put(key, eclsum, nbytes=_eclsum_filesize(unsmry_filename))
+            self._eclsum_key = key
 
         return eclsum
 
@@ -812,7 +853,8 @@ class ScratchRealization(object):
                 keys do not exist.
 
         """
-        if not self.get_eclsum(cache=cache_eclsum):
+        eclsum = self.get_eclsum(cache=cache_eclsum, include_restart=include_restart)
+        if not eclsum:
             # Return empty, but do not store the empty dataframe in self.data
             return pd.DataFrame()
         time_index_path = time_index
@@ -834,9 +876,7 @@ class ScratchRealization(object):
             column_keys = [column_keys]
 
         # Do the actual work:
-        dframe = self.get_eclsum(
-            cache=cache_eclsum, include_restart=include_restart
-        ).pandas_frame(time_index_arg, column_keys)
+        dframe = eclsum.pandas_frame(time_index_arg, column_keys)
         dframe = dframe.reset_index()
         dframe.rename(columns={"index": "DATE"}, inplace=True)
 
@@ -898,11 +938,10 @@ class ScratchRealization(object):
         else:
             time_index_arg = time_index
 
-        if self.get_eclsum(cache=cache_eclsum, include_restart=include_restart):
+        eclsum = self.get_eclsum(cache=cache_eclsum, include_restart=include_restart)
+        if eclsum:
             try:
-                dataframe = self.get_eclsum(
-                    cache=cache_eclsum, include_restart=include_restart
-                ).pandas_frame(time_index_arg, column_keys)
+                dataframe = eclsum.pandas_frame(time_index_arg, column_keys)
             except ValueError:
                 # We get here if we have requested non-existing column keys
                 return pd.DataFrame()
@@ -924,10 +963,11 @@ class ScratchRealization(object):
         """
         if not isinstance(column_keys, list):
             column_keys = [column_keys]
+        eclsum = self.get_eclsum()
         keys = set()
         for key in column_keys:
             if isinstance(key, str):
-                keys = keys.union(set(self._eclsum.keys(key)))
+                keys = keys.union(set(eclsum.keys(key)))
         return list(keys)
 
     def get_volumetric_rates(self, column_keys=None, time_index=None, time_unit=None):
@@ -972,9 +1012,6 @@ class ScratchRealization(object):
 
         This method is to be used by both ScratchRealization
         and VirtualRealization, and is documented there."""
-        import calendar
-        from dateutil.relativedelta import relativedelta
-
         if isinstance(time_unit, str):
             if time_unit not in ["days", "months", "years"]:
                 raise ValueError(
@@ -1004,52 +1041,10 @@ class ScratchRealization(object):
         diff_cum = cum_df.diff().shift(-1).fillna(value=0)
 
         if time_unit:
-            # Calculate the relative timedelta between consecutive
-            # DateIndices. relativedeltas are correct in terms
-            # of number of years and number of months, but it will
-            # only give us integer months, and then leftover days.
-            rel_deltas = [
-                relativedelta(t[1], t[0])
-                for t in zip(diff_cum.index, diff_cum.index[1:])
-            ]
-            whole_days = [
-                (t[1] - t[0]).days for t in zip(diff_cum.index, diff_cum.index[1:])
-            ]
-            # Need to know which years are leap years for our index:
-            dayspryear = [
-                365 if not calendar.isleap(x.year) else 366
-                for x in pd.to_datetime(diff_cum.index[1:])
-            ]
-            # Float-contribution to years from days:
-            days = [
-                t[0] / float(t[1])
-                for t in zip([r.days for r in rel_deltas], dayspryear)
-            ]
-            floatyearsnodays = [r.years + r.months / 12.0 for r in rel_deltas]
-            floatyears = [x + y for x, y in zip(floatyearsnodays, days)]
-
-            # Calculate month-difference:
-            floatmonthsnodays = [r.years * 12.0 + r.months for r in rel_deltas]
-            # How many days pr. month? We check this for the right
-            # end of the relevant time interval.
-            daysprmonth = [
-                calendar.monthrange(t.year, t.month)[1] for t in diff_cum.index[1:]
-            ]
-            days = [
-                t[0] / float(t[1])
-                for t in zip([r.days for r in rel_deltas], daysprmonth)
-            ]
-            floatmonths = [x + y for x, y in zip(floatmonthsnodays, days)]
-
-            diff_cum["DAYS"] = whole_days + [0]
-            diff_cum["MONTHS"] = floatmonths + [0]
-            diff_cum["YEARS"] = floatyears + [0]
-            for vec in column_keys:
-                diff_cum[vec] = diff_cum[vec] / diff_cum[time_unit.upper()]
-            # Drop temporary columns
-            diff_cum.drop(["DAYS", "MONTHS", "YEARS"], inplace=True, axis=1)
-            # Set NaN at the final row to zero
-            diff_cum.fillna(value=0, inplace=True)
+            # Divide by the length of each time interval, leaving
+            # the final row (0/0) at zero:
+            intervals = numpy.append(date_intervals(diff_cum.index, time_unit), 0)
+            diff_cum = diff_cum.div(intervals, axis=0).fillna(value=0)
 
         # Translate the column vectors, 'FOPT' -> 'FOPR' etc.
         rate_names = []
@@ -1095,24 +1090,19 @@ class ScratchRealization(object):
             a dataframe with values. Raw times from UNSMRY.
             Empty dataframe if no summary file data available
         """
-        if not self._eclsum:  # check if it is cached
-            self.get_eclsum()
-
-        if not self._eclsum:
+        eclsum = self.get_eclsum()
+        if not eclsum:
             return pd.DataFrame()
 
         props = self._glob_smry_keys(props_wildcard)
 
-        if "numpy_vector" in dir(self._eclsum):
+        if "numpy_vector" in dir(eclsum):
             data = {
-                prop: self._eclsum.numpy_vector(prop, report_only=False)
-                for prop in props
+                prop: eclsum.numpy_vector(prop, report_only=False) for prop in props
             }
         else:  # get_values() is deprecated in newer libecl
-            data = {
-                prop: self._eclsum.get_values(prop, report_only=False) for prop in props
-            }
-        dates = self._eclsum.get_dates(report_only=False)
+            data = {prop: eclsum.get_values(prop, report_only=False) for prop in props}
+        dates = eclsum.get_dates(report_only=False)
         return pd.DataFrame(data=data, index=dates)
 
     def get_smry_dates(
@@ -1304,48 +1294,93 @@ class ScratchRealization(object):
 
     def get_init(self):
         """
+        The file is opened for the caller on every call, it is not
+        shared through ScratchRealization.eclfile_cache. Use
+        get_global_init_keyword() for reading single keywords.
+
         :returns: init file of the realization.
         """
-        init_file_row = self.files[self.files.FILETYPE == "INIT"]
-        init_filename = None
-        if len(init_file_row) == 1:
-            init_filename = init_file_row.FULLPATH.values[0]
-        else:
-            init_fileguess = os.path.join(self._origpath, "eclipse/model", "*.INIT")
-            init_filenamelist = glob.glob(init_fileguess)
-            if not init_filenamelist:
-                return None  # No filename matches
-            init_filename = init_filenamelist[0]
-        if not os.path.exists(init_filename):
+        init_filename = self._ecl_filename("INIT")
+        if init_filename is None:
             return None
-
-        if not self._eclinit:
-            self._eclinit = EclFile(
-                init_filename, flags=EclFileFlagEnum.ECL_FILE_CLOSE_STREAM
-            )
-        return self._eclinit
+        return EclFile(init_filename, flags=EclFileFlagEnum.ECL_FILE_CLOSE_STREAM)
 
     def get_unrst(self):
         """
+        The file is opened for the caller on every call, it is not
+        shared through ScratchRealization.eclfile_cache. Use
+        get_global_unrst_keyword() for reading single keywords.
+
         :returns: restart file of the realization.
         """
-        unrst_file_row = self.files[self.files.FILETYPE == "UNRST"]
-        unrst_filename = None
-        if len(unrst_file_row) == 1:
-            unrst_filename = unrst_file_row.FULLPATH.values[0]
-        else:
-            unrst_fileguess = os.path.join(self._origpath, "eclipse/model", "*.UNRST")
-            unrst_filenamelist = glob.glob(unrst_fileguess)
-            if not unrst_filenamelist:
-                return None  # No filename matches
-            unrst_filename = unrst_filenamelist[0]
-        if not os.path.exists(unrst_filename):
+        unrst_filename = self._ecl_filename("UNRST")
+        if unrst_filename is None:
+            return None
+        return EclFile(unrst_filename, flags=EclFileFlagEnum.ECL_FILE_CLOSE_STREAM)
+
+    @property
+    def init_keys(self):
+        """List of keywords in the init file, empty if there is none"""
+        init_filename = self._ecl_filename("INIT")
+        if init_filename is None:
+            return []
+        return self.eclfile_cache.keys(init_filename)
+
+    @property
+    def unrst_keys(self):
+        """List of keywords in the restart file, empty if there is none"""
+        unrst_filename = self._ecl_filename("UNRST")
+        if unrst_filename is None:
+            return []
+        return self.eclfile_cache.keys(unrst_filename)
+
+    def get_grid_geometry(self, active_only=False):
+        """Return the grid index together with the corners and the
+        centre of each cell, as in get_grid_index(), get_grid_corners()
+        and get_grid_centre().
+
+        The geometry is cached in ScratchRealization.geometry_cache,
+        shared by all realizations, and if the realization has a cache
+        directory, also on disk. Cached geometry is reused as long as the
+        EGRID file is unchanged. The returned dataframe must not be
+        modified.
+
+        Args:
+            active_only: bool. True if active cells only.
+
+        Returns:
+            dataframe with the columns i, j, k, active, x1, y1, z1, ...,
+            z8 and cell_x, cell_y, cell_z. None if there is no grid.
+        """
+        grid_filename = self._grid_filename()
+        if grid_filename is None:
             return None
-        if not self._eclunrst:
-            self._eclunrst = EclFile(
-                unrst_filename, flags=EclFileFlagEnum.ECL_FILE_CLOSE_STREAM
+        stat = os.stat(grid_filename)
+        key = (grid_filename, stat.st_mtime, stat.st_size, active_only)
+        geometry = self.geometry_cache.get(key)
+        if geometry is not None:
+            return geometry
+
+        diskkey = None
+        if self._diskcache is not None:
+            diskkey = self._diskcache.key(grid_filename, "grid_geometry", active_only)
+            try:
+                geometry = _unpack_geometry(self._diskcache.get_arrays(diskkey))
+            except KeyError:
+                pass
+        if geometry is None:
+            grid_index = self.get_grid_index(active_only=active_only)
+            geometry = (
+                grid_index.reset_index(drop=True)
+                .join(self.get_grid_corners(grid_index))
+                .join(self.get_grid_centre(grid_index))
             )
-        return self._eclunrst
+            if diskkey is not None:
+                self._diskcache.put_arrays(diskkey, _pack_geometry(geometry))
+        self.geometry_cache.put(
+            key, geometry, nbytes=int(geometry.memory_usage(index=False).sum())
+        )
+        return geometry
 
     def get_grid_index(self, active_only):
         """
@@ -1398,22 +1433,34 @@ class ScratchRealization(object):
         """
         :returns: grid file of the realization.
         """
-        grid_file_row = self.files[self.files.FILETYPE == "EGRID"]
-        grid_filename = None
-        if len(grid_file_row) == 1:
-            grid_filename = grid_file_row.FULLPATH.values[0]
-        else:
-            grid_fileguess = os.path.join(self._origpath, "eclipse/model", "*.EGRID")
-            grid_filenamelist = glob.glob(grid_fileguess)
-            if not grid_filenamelist:
-                return None  # No filename matches
-            grid_filename = grid_filenamelist[0]
-        if not os.path.exists(grid_filename):
+        grid_filename = self._grid_filename()
+        if grid_filename is None:
             return None
         if not self._eclgrid:
             self._eclgrid = EclGrid(grid_filename)
         return self._eclgrid
 
+    def _grid_filename(self):
+        """Return the path to the EGRID file, None if not found"""
+        return self._ecl_filename("EGRID")
+
+    def _ecl_filename(self, filetype):
+        """Return the path to the Eclipse output file of a type,
+        f.ex. EGRID, INIT or UNRST, None if not found"""
+        file_rows = self._files.by_filetype(filetype)
+        filename = None
+        if len(file_rows) == 1:
+            filename = file_rows[0]["FULLPATH"]
+        else:
+            fileguess = os.path.join(self._origpath, "eclipse/model", "*." + filetype)
+            filenamelist = glob.glob(fileguess)
+            if not filenamelist:
+                return None  # No filename matches
+            filename = filenamelist[0]
+        if not os.path.exists(filename):
+            return None
+        return filename
+
     @property
     def global_size(self):
         """
@@ -1429,7 +1476,8 @@ class ScratchRealization(object):
             inactive cells have value 1.
         """
         if not self._actnum:
-            self._actnum = self.get_init()["PORV"][0].create_actnum()
+            with self.eclfile_cache.open(self._require_ecl_filename("INIT")) as init:
+                self._actnum = init.iget_named_kw("PORV", 0).create_actnum()
         return self._actnum
 
     @property
@@ -1437,7 +1485,7 @@ class ScratchRealization(object):
         """
         :returns: List of DateTime.DateTime for which values are reported.
         """
-        return self.get_unrst().report_dates
+        return self.eclfile_cache.report_dates(self._require_ecl_filename("UNRST"))
 
     def get_global_init_keyword(self, prop):
         """
@@ -1445,15 +1493,77 @@ class ScratchRealization(object):
         :returns: The EclKw of given name. Length is global_size.
             non-active cells are given value 0.
         """
-        return self.get_init()[prop][0].scatter_copy(self.actnum)
+        actnum = self.actnum
+        with self.eclfile_cache.open(self._require_ecl_filename("INIT")) as init:
+            return init.iget_named_kw(prop, 0).scatter_copy(actnum)
 
     def get_global_unrst_keyword(self, prop, report):
         """
+        Only the keyword at the given report step is loaded.
+
         :param prop: A name of a keyword in the realization's restart file.
+        :param report: int, index of the report step.
         :returns: The EclKw of given name. Length is global_size.
             non-active cells are given value 0.
         """
-        return self.get_unrst()[prop][report].scatter_copy(self.actnum)
+        actnum = self.actnum
+        with self.eclfile_cache.open(self._require_ecl_filename("UNRST")) as unrst:
+            if report < 0:
+                report += unrst.num_named_kw(prop)
+            return unrst.iget_named_kw(prop, report).scatter_copy(actnum)
+
+    def _require_ecl_filename(self, filetype):
+        """Return the path to the Eclipse output file of a type,
+        raising IOError if not found"""
+        filename = self._ecl_filename(filetype)
+        if filename is None:
+            raise IOError(
+                "No {} file found in realization at {}".format(filetype, self._origpath)
+            )
+        return filename
+
+
+GRID_INDEX_COLUMNS = ["i", "j", "k", "active"]
+GRID_CORNER_COLUMNS = [
+    axis + str(corner) for corner in range(1, 9) for axis in ["x", "y", "z"]
+]
+GRID_CENTRE_COLUMNS = ["cell_x", "cell_y", "cell_z"]
+
+
+def _pack_geometry(geometry):
+    """Convert grid geometry to compact arrays for the disk cache
+
+    Coordinates are stored as float32 offsets from an origin for each
+    of x, y and z, as float32 is too coarse for map coordinates."""
+    corners = geometry[GRID_CORNER_COLUMNS].values.reshape(len(geometry), 8, 3)
+    centres = geometry[GRID_CENTRE_COLUMNS].values
+    if len(geometry):
+        origin = numpy.nanmin(centres, axis=0)
+    else:
+        origin = numpy.zeros(3)
+    return {
+        "index": geometry[GRID_INDEX_COLUMNS].values.astype(numpy.int32),
+        "origin": origin,
+        "corners": (corners - origin).astype(numpy.float32),
+        "centres": (centres - origin).astype(numpy.float32),
+    }
+
+
+def _unpack_geometry(arrays):
+    """Convert arrays from _pack_geometry() back to a dataframe"""
+    origin = arrays["origin"]
+    nrows = len(arrays["index"])
+    corners = arrays["corners"].astype(numpy.float64) + origin
+    geometry = pd.DataFrame(arrays["index"].astype(int), columns=GRID_INDEX_COLUMNS)
+    geometry = geometry.join(
+        pd.DataFrame(corners.reshape(nrows, 24), columns=GRID_CORNER_COLUMNS)
+    )
+    return geometry.join(
+        pd.DataFrame(
+            arrays["centres"].astype(numpy.float64) + origin,
+            columns=GRID_CENTRE_COLUMNS,
+        )
+    )
 
 
 def normalize_dates(start_date, end_date, freq):
@@ -1499,6 +1609,221 @@ def normalize_dates(start_date, end_date, freq):
     return (start_date, end_date)
 
 
+def date_intervals(dates, time_unit):
+    """Compute the length of the intervals between consecutive dates
+
+    The number of months and years between two dates are counted as
+    whole calendar months and years, as dateutil.relativedelta does,
+    and the remaining days are counted as a fraction of the number
+    of days in the month or year of the latter date. Month lengths
+    and leap years are thus correctly handled.
+
+    Args:
+        dates: list or array of datetimes, increasing.
+        time_unit: str, 'days', 'months' or 'years'.
+
+    Returns:
+        numpy array of floats, one shorter than dates.
+    """
+    dates = numpy.asarray(pd.to_datetime(pd.Index(dates)).values, dtype="datetime64[s]")
+    start = dates[:-1]
+    end = dates[1:]
+    oneday = numpy.timedelta64(1, "D")
+    if time_unit == "days":
+        return ((end - start) // oneday).astype(numpy.float64)
+    if time_unit not in ["months", "years"]:
+        raise ValueError("Unsupported time_unit " + str(time_unit))
+
+    # Whole months, reduced by one if a date this many months
+    # after start is past the end date:
+    months = (end.astype("datetime64[M]") - start.astype("datetime64[M]")).astype(int)
+    shifted = _add_months(start, months)
+    months = months - (shifted > end)
+    shifted = _add_months(start, months)
+    days = ((end - shifted) // oneday).astype(numpy.float64)
+
+    if time_unit == "months":
+        endmonth = end.astype("datetime64[M]")
+        monthlength = (endmonth + 1).astype("datetime64[D]") - endmonth.astype(
+            "datetime64[D]"
+        )
+        return months + days / (monthlength // oneday)
+    endyear = end.astype("datetime64[Y]")
+    yearlength = (endyear + 1).astype("datetime64[D]") - endyear.astype("datetime64[D]")
+    years, months = numpy.divmod(months, 12)
+    return years + months / 12.0 + days / (yearlength // oneday)
+
+
+def _add_months(dates, months):
+    """Add a number of months to datetime64 values, the day in
+    month is clipped to the length of the resulting month"""
+    month = dates.astype("datetime64[M]") + months
+    day = dates.astype("datetime64[D]")
+    dayinmonth = day - dates.astype("datetime64[M]").astype("datetime64[D]")
+    monthlength = (month + 1).astype("datetime64[D]") - month.astype("datetime64[D]")
+    return (
+        month.astype("datetime64[D]")
+        + numpy.minimum(dayinmonth, monthlength - numpy.timedelta64(1, "D"))
+        + (dates - day)
+    )
+
+
+def _eclsum_cache_key(unsmry_filename, include_restart):
+    """Return the key for an EclSum object in the shared cache,
+    None if the UNSMRY file does not exist.
+
+    The modification time and size of the file is part of the key, so
+    that an outdated EclSum object is never returned from the cache."""
+    try:
+        stat = os.stat(unsmry_filename)
+    except OSError:
+        return None
+    return (unsmry_filename, include_restart, stat.st_mtime, stat.st_size)
+
+
+def _eclsum_filesize(unsmry_filename):
+    """Estimate the memory footprint of an EclSum object by the
+    size of its UNSMRY and SMSPEC files, in bytes."""
+    nbytes = 0
+    for filename in [unsmry_filename, os.path.splitext(unsmry_filename)[0] + ".SMSPEC"]:
+        try:
+            nbytes += os.path.getsize(filename)
+        except OSError:
+            pass
+    return nbytes
+
+
+def _parse_scalar(fullpath, comment, skip_blank_lines, skipinitialspace):
+    """Parse the first value in a file, the empty string
+    for empty files. See ScratchRealization.load_scalar()"""
+    try:
+        return pd.read_csv(
+            fullpath,
+            header=None,
+            sep="DONOTSEPARATEANYTHING *%magic%*",
+            engine="python",
+            skip_blank_lines=skip_blank_lines,
+            skipinitialspace=skipinitialspace,
+            comment=comment,
+        ).iloc[0, 0]
+    except pd.errors.EmptyDataError:
+        return ""
+
+
+def _parse_txt(fullpath, convert_numeric):
+    """Parse a key-value text file into a dict.
+    See ScratchRealization.load_txt()"""
+    try:
+        keyvalues = pd.read_csv(
+            fullpath, sep=r"\s+", index_col=0, dtype=str, usecols=[0, 1], header=None
+        )[1].to_dict()
+    except pd.errors.EmptyDataError:
+        keyvalues = {}
+    if convert_numeric:
+        for key in keyvalues:
+            keyvalues[key] = parse_number(keyvalues[key])
+    return keyvalues
+
+
+def _parse_csv(fullpath, convert_numeric):
+    """Parse a CSV file into a dataframe, None for empty files.
+    See ScratchRealization.load_csv()"""
+    try:
+        if convert_numeric:
+            # Trust that Pandas will determine sensible datatypes
+            # faster than the convert_numeric() function
+            dtype = None
+        else:
+            dtype = str
+        return pd.read_csv(fullpath, dtype=dtype)
+    except pd.errors.EmptyDataError:
+        return None  # or empty dataframe?
+
+
+def _parse_status(statusfile, jsonfilename):
+    """Parse a STATUS file, merged with information from
+    jobs.json if that is available. See ScratchRealization.load_status()"""
+    errorcolumns = ["error" + str(x) for x in range(0, 10)]
+    status = pd.read_csv(
+        statusfile,
+        sep=r"\s+",
+        skiprows=1,
+        header=None,
+        names=["FORWARD_MODEL", "colon", "STARTTIME", "dots", "ENDTIME"] + errorcolumns,
+        dtype=str,
+        engine="python",
+        error_bad_lines=False,
+        warn_bad_lines=True,
+    )
+
+    # dtype str messes up a little bit, pre-Pandas 0.24.1 gives 'None' as
+    # a string where data is missing.
+    status.replace("None", "", inplace=True)
+    # While Pandas 0.24.1 will insert proper Null values in those cells,
+    # we fill them with the empty string for the rest of this code to work
+    status.fillna("", inplace=True)
+    # It should be ok to have both of these statements running, but the
+    # replace() is probably superfluous when pandas 0.23 is gone.
+
+    errorjobs = status[errorcolumns[0]] != ""
+
+    # Merge any error strings:
+    status.loc[errorjobs, "errorstring"] = (
+        status.loc[errorjobs, errorcolumns]
+        .astype(str)
+        .apply(" ".join, axis=1)
+        .apply(str.strip)
+    )
+    status.drop(errorcolumns, axis=1, inplace=True)
+
+    # Delete potential unwanted row
+    status = status[~((status.FORWARD_MODEL == "LSF") & (status.colon == "JOBID:"))]
+
+    if status.empty:
+        logger.warning("No parseable data in STATUS")
+        return status
+
+    status = status.reset_index().drop("colon", axis=1).drop("dots", axis=1)
+
+    # Index the jobs, this makes it possible to match with jobs.json:
+    status.insert(0, "JOBINDEX", status.index.astype(int))
+    status = status.drop("index", axis=1)
+    # Calculate duration. Only Python 3.6 has time.fromisoformat().
+    # Warning: Unpandaic code..
+    durations = []
+    for _, jobrow in status.iterrows():
+        if not jobrow["ENDTIME"]:  # A job that is not finished.
+            durations.append(numpy.nan)
+        else:
+            hms = list(map(int, jobrow["STARTTIME"].split(":")))
+            start = datetime.combine(
+                date.today(), time(hour=hms[0], minute=hms[1], second=hms[2])
+            )
+            hms = list(map(int, jobrow["ENDTIME"].split(":")))
+            end = datetime.combine(
+                date.today(), time(hour=hms[0], minute=hms[1], second=hms[2])
+            )
+            # This works also when we have crossed 00:00:00.
+            # Jobs > 24 h will be wrong.
+            durations.append((end - start).seconds)
+    status["DURATION"] = durations
+
+    # Augment data from jobs.json if that file is available:
+    if jsonfilename and os.path.exists(jsonfilename):
+        try:
+            jobsinfo = json.load(open(jsonfilename))
+            jobsinfodf = pd.DataFrame(jobsinfo["jobList"])
+            jobsinfodf["JOBINDEX"] = jobsinfodf.index.astype(int)
+            # Outer merge means that we will also have jobs from
+            # jobs.json that has not started (failed or perhaps
+            # the jobs are still running on the cluster)
+            status = status.merge(jobsinfodf, how="outer", on="JOBINDEX")
+        except ValueError:
+            logger.warning("Parsing file %s failed, skipping", jsonfilename)
+    status.sort_values(["JOBINDEX"], ascending=True, inplace=True)
+    return status
+
+
 def parse_number(value):
     """Try to parse the string first as an integer, then as float,
     if both fails, return the original string.
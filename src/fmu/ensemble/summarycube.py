@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""Module for the SummaryCube class
+
+A SummaryCube holds summary data for an ensemble as one dense
+array of shape realization x date x vector, together with the
+index arrays for each axis.
+
+The module also holds the statistics engine for summary data,
+computing mean, quantiles, maximum and minimum over realizations
+from such an array in one pass, and a resampler interpolating
+summary data for all realizations at once.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+
+
+class SummaryCube(object):
+    """Dense representation of ensemble summary data
+
+    The values are stored as a contiguous float array with
+    shape (number of realizations, number of dates, number of vectors).
+    Data that are not available, f.ex. dates not present in a
+    realization when raw dates are used, or vectors missing in
+    some realizations, are NaN.
+
+    Args:
+        values: numpy array with shape (len(reals), len(dates), len(vectors))
+        reals: list or array of realization indices (integers)
+        dates: list or array of dates, will be converted to datetime64
+        vectors: list of summary vector names
+    """
+
+    def __init__(self, values, reals, dates, vectors):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.reals = np.asarray(reals, dtype=int)
+        self.dates = pd.to_datetime(pd.Index(dates)).values
+        self.vectors = list(vectors)
+        if self.values.shape != (len(self.reals), len(self.dates), len(self.vectors)):
+            raise ValueError(
+                "Shape of values {} does not match the axes {}".format(
+                    self.values.shape,
+                    (len(self.reals), len(self.dates), len(self.vectors)),
+                )
+            )
+        self._vectorindex = {vector: idx for idx, vector in enumerate(self.vectors)}
+
+    @property
+    def shape(self):
+        """Tuple with the shape of the cube,
+        (realizations, dates, vectors)"""
+        return self.values.shape
+
+    def keys(self):
+        """Return the summary vector names in the cube"""
+        return list(self.vectors)
+
+    def __contains__(self, vector):
+        return vector in self._vectorindex
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def __repr__(self):
+        return "<SummaryCube, {} realizations, {} dates, {} vectors>".format(
+            *self.shape
+        )
+
+    def vector_values(self, vector):
+        """Return a 2D array view (realization x date) for one vector"""
+        return self.values[:, :, self._vectorindex[vector]]
+
+    def __getitem__(self, vector):
+        """Return a dataframe for one summary vector, with dates
+        as index and realization indices as columns"""
+        if vector not in self._vectorindex:
+            raise KeyError(vector)
+        return pd.DataFrame(
+            self.vector_values(vector).T,
+            index=pd.DatetimeIndex(self.dates, name="DATE"),
+            columns=pd.Index(self.reals, name="REAL"),
+        )
+
+    def stats(self, quantiles=None):
+        """Compute statistics over the realizations
+
+        Args:
+            quantiles: list of ints between 0 and 100, default [10, 90].
+
+        Returns:
+            A MultiIndex dataframe, outer index is 'mean', the 'pXX'
+            quantiles, 'maximum' and 'minimum', inner index are the dates.
+            Columns are the vectors.
+        """
+        if quantiles is None:
+            quantiles = [10, 90]
+        labels = ["mean"] + ["p" + str(x) for x in quantiles] + ["maximum", "minimum"]
+        return _stats_frame(
+            array_stats(self.values, [x / 100.0 for x in quantiles]),
+            labels,
+            pd.DatetimeIndex(self.dates),
+            self.vectors,
+            "STATISTIC",
+        )
+
+    def to_frame(self, dropna=True):
+        """Return the data as a stacked dataframe, with the columns
+        REAL, DATE and one column pr. vector, similar to what
+        ScratchEnsemble.load_smry() returns for stacked=True
+
+        Args:
+            dropna: boolean, whether rows with only NaN values
+                should be dropped. Default True.
+        """
+        nreals, ndates, nvectors = self.shape
+        dframe = pd.DataFrame(
+            self.values.reshape(nreals * ndates, nvectors), columns=self.vectors
+        )
+        dframe.insert(0, "DATE", np.tile(self.dates, nreals))
+        dframe.insert(0, "REAL", np.repeat(self.reals, ndates))
+        if dropna and nvectors:
+            dframe = dframe[~np.isnan(self.values).all(axis=2).ravel()]
+        return dframe.reset_index(drop=True)
+
+
+def array_stats(values, quantiles):
+    """Compute mean, quantiles, maximum and minimum along the
+    first axis of an array, ignoring NaN.
+
+    The array is sorted once, and all the order statistics are
+    read off the sorted array. Quantiles are linearly interpolated,
+    as in pandas and numpy.
+
+    Args:
+        values: numpy array, first axis is the realizations.
+        quantiles: list of floats between 0 and 1.
+
+    Returns:
+        list of arrays with the shape of values without the first axis,
+        the mean, each of the quantiles, the maximum and the minimum.
+        Where there is no data, the statistics are NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = np.sum(~np.isnan(values), axis=0)
+    nodata = count == 0
+    # NaN is sorted last:
+    sortedvalues = np.sort(values, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(values, axis=0) / count
+    lastidx = np.maximum(count - 1, 0)
+
+    def _order_statistic(index):
+        return np.take_along_axis(sortedvalues, index[np.newaxis], axis=0)[0]
+
+    statistics = [mean]
+    for quantile in quantiles:
+        position = quantile * lastidx
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, lastidx)
+        lowervalue = _order_statistic(lower)
+        uppervalue = _order_statistic(upper)
+        statistics.append(lowervalue + (uppervalue - lowervalue) * (position - lower))
+    statistics.append(_order_statistic(lastidx))
+    statistics.append(sortedvalues[0].copy())
+    for statistic in statistics:
+        statistic[nodata] = np.nan
+    return statistics
+
+
+def smry_stats(dframe, quantiles, invert_quantiles=False, index_name="STATISTIC"):
+    """Compute summary statistics from a stacked dataframe
+
+    This is the engine behind the get_smry_stats() functions. The
+    dataframe is aligned to a realization x date x vector array,
+    and all statistics are computed in one pass over it.
+
+    Args:
+        dframe: dataframe with the columns REAL and DATE, and one
+            column pr. summary vector. Non-numeric columns are ignored.
+        quantiles: list of ints between 0 and 100.
+        invert_quantiles: boolean. If True, the quantile 'pXX'
+            is computed as the (100 - XX) percentile, the oil
+            industry convention.
+        index_name: str, name of the outer index level.
+
+    Returns:
+        A MultiIndex dataframe. Outer index is 'mean', the 'pXX'
+        quantiles, 'maximum' and 'minimum', inner index are the
+        dates (sorted). Columns are the vectors.
+    """
+    vectors = [
+        col
+        for col in dframe.columns
+        if col not in ["REAL", "DATE"]
+        and pd.api.types.is_numeric_dtype(dframe[col].dtype)
+    ]
+    realcodes, reals = pd.factorize(dframe["REAL"], sort=True)
+    datecodes, dates = pd.factorize(dframe["DATE"], sort=True)
+    values = np.full((len(reals), len(dates), len(vectors)), np.nan)
+    values[realcodes, datecodes] = dframe[vectors].values.astype(np.float64)
+
+    if invert_quantiles:
+        fractions = [1 - x / 100.0 for x in quantiles]
+    else:
+        fractions = [x / 100.0 for x in quantiles]
+    labels = ["mean"] + ["p" + str(x) for x in quantiles] + ["maximum", "minimum"]
+    return _stats_frame(
+        array_stats(values, fractions), labels, dates, vectors, index_name
+    )
+
+
+def resample_smry(dframe, vectors, cumulative, time_index):
+    """Interpolate stacked summary data to a new time index
+
+    All realizations are resampled at once. The data is aligned to a
+    realization x date x vector array on the union of the existing
+    dates and the requested dates, and for every requested date the
+    nearest preceding and following date with data in each realization
+    and vector are looked up.
+
+    Cumulative vectors are linearly interpolated in time, and are
+    extended with the first or last value outside the range of the
+    data. Rates are backfilled, and are zero after the last date
+    with data.
+
+    Args:
+        dframe: dataframe with the columns REAL and DATE, and one
+            column pr. summary vector. If a date occurs more than
+            once for a realization, the first row is used.
+        vectors: list of column names to resample.
+        cumulative: list of booleans, one for each vector, telling
+            whether the vector is cumulative.
+        time_index: list of dates to interpolate at.
+
+    Returns:
+        A dataframe with the columns DATE, the vectors and REAL,
+        with the requested dates for each realization, realizations
+        in the order they first appear in dframe.
+    """
+    dates = pd.to_datetime(dframe["DATE"]).values
+    targets = pd.to_datetime(pd.Index(time_index)).values
+    grid = np.union1d(dates, targets)
+    realcodes, reals = pd.factorize(dframe["REAL"])
+    datecodes = np.searchsorted(grid, dates)
+    first = ~pd.DataFrame({"REAL": realcodes, "DATE": datecodes}).duplicated().values
+
+    values = np.full((len(reals), len(grid), len(vectors)), np.nan)
+    values[realcodes[first], datecodes[first]] = (
+        dframe[vectors].apply(pd.to_numeric).values.astype(np.float64)[first]
+    )
+
+    # Position of the last and next date with data, at every date:
+    positions = np.arange(len(grid))[np.newaxis, :, np.newaxis]
+    valid = ~np.isnan(values)
+    targetpos = np.searchsorted(grid, targets)
+    prevpos = np.maximum.accumulate(np.where(valid, positions, -1), axis=1)
+    nextpos = np.minimum.accumulate(
+        np.where(valid, positions, len(grid))[:, ::-1], axis=1
+    )[:, ::-1]
+    prevpos = prevpos[:, targetpos]
+    nextpos = nextpos[:, targetpos]
+    hasprev = prevpos >= 0
+    hasnext = nextpos < len(grid)
+    prevpos = np.where(hasprev, prevpos, 0)
+    nextpos = np.where(hasnext, nextpos, 0)
+    prevvalue = np.take_along_axis(values, prevpos, axis=1)
+    nextvalue = np.take_along_axis(values, nextpos, axis=1)
+
+    times = grid.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    prevtime = times[prevpos]
+    span = times[nextpos] - prevtime
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(
+            span > 0, (times[targetpos][np.newaxis, :, np.newaxis] - prevtime) / span, 0
+        )
+    interpolated = np.where(
+        hasprev & hasnext,
+        prevvalue + (nextvalue - prevvalue) * weight,
+        np.where(hasprev, prevvalue, np.where(hasnext, nextvalue, np.nan)),
+    )
+    backfilled = np.where(hasnext, nextvalue, 0.0)
+    resampled = np.where(
+        np.asarray(cumulative, dtype=bool)[np.newaxis, np.newaxis, :],
+        interpolated,
+        backfilled,
+    )
+
+    nreals, ntargets = len(reals), len(targets)
+    result = pd.DataFrame(
+        resampled.reshape(nreals * ntargets, len(vectors)), columns=vectors
+    )
+    result.insert(0, "DATE", np.tile(targets, nreals))
+    result["REAL"] = np.repeat(np.asarray(reals), ntargets)
+    return result
+
+
+def _stats_frame(statistics, labels, dates, vectors, index_name):
+    """Stack a list of date x vector arrays into a dataframe with
+    a (statistic, DATE) MultiIndex"""
+    # The statistics are kept in the given order, not sorted:
+    return pd.concat(
+        [
+            pd.DataFrame(
+                statistic, index=pd.Index(dates, name="DATE"), columns=vectors
+            )
+            for statistic in statistics
+        ],
+        keys=labels,
+        names=[index_name, "DATE"],
+    )
@@ -6,11 +6,26 @@ from __future__ import division
 from __future__ import print_function
 
 import os
-import re
+import shutil
+import fnmatch
+import functools
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
 from .etc import Interaction
-from .virtualrealization import VirtualRealization
+from .virtualrealization import VirtualRealization, smry_date_range
+from .summarycube import smry_stats, resample_smry
+from .aggregation import Aggregator
+from .datastore import (
+    HAVE_PYARROW,
+    LazyDataStore,
+    write_frame,
+    read_frame,
+    write_manifest,
+    read_manifest,
+)
 
 fmux = Interaction()
 logger = fmux.basiclogger(__name__)
@@ -44,15 +59,43 @@ class VirtualEnsemble(object):
 
         self._longdescription = longdescription
 
+        # Row positions for each realization in each dataframe, as a
+        # dict from key to {realidx: positions}. Entries are dropped
+        # whenever the data for the key is set or deleted.
+        self._realrows = {}
+
         # At ensemble level, this dictionary has dataframes only.
-        # All dataframes have the column REAL.
-        if data:
-            self.data = data
-        else:
-            self.data = {}
+        # All dataframes have the column REAL. Data loaded from disk
+        # is read on first access.
+        self.data = data
 
         self.realindices = []
 
+        # Caches plans for agg(). Unlike in ScratchEnsemble, string columns
+        # are not grouped by, and scalars are not converted to numbers.
+        self._aggregator = Aggregator(group_strings=False, parse_scalars=False)
+
+    @property
+    def data(self):
+        """The datastore, a dictionary of dataframes indexed by localpath
+
+        Dataframes in the datastore should not be modified in place.
+        Set a modified dataframe again for the key, so that the row
+        positions of the realizations are recomputed."""
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        if not isinstance(data, LazyDataStore):
+            data = LazyDataStore(data)
+        data.on_change = self._forget_rows
+        self._data = data
+        self._realrows = {}
+
+    def _forget_rows(self, key):
+        """Drop the cached row positions for a key"""
+        self._realrows.pop(key, None)
+
     def __len__(self):
         """Return the number of realizations (integer) included in the
         ensemble"""
@@ -104,6 +147,26 @@ class VirtualEnsemble(object):
 
         return ScratchEnsemble._shortcut2path(self.keys(), shortpath)
 
+    def _realization_rows(self, key):
+        """Return a dict from realization index to an array of the
+        row positions of that realization in the dataframe for a key.
+
+        The row positions are computed once for each dataframe,
+        and reused until the data for the key is set again or deleted.
+        """
+        rows = self._realrows.get(key)
+        if rows is None:
+            rows = self.data[key].groupby("REAL", sort=False).indices
+            self._realrows[key] = rows
+        return rows
+
+    def _realization_frame(self, key, realindex):
+        """Return the rows for one realization in the dataframe for a key"""
+        rows = self._realization_rows(key).get(realindex)
+        if rows is None:
+            return self.data[key].iloc[0:0]
+        return self.data[key].iloc[rows]
+
     def __getitem__(self, localpath):
         """Shorthand for .get_df()
 
@@ -125,12 +188,15 @@ class VirtualEnsemble(object):
         Returns:
             VirtualRealization, populated with data.
         """
+        return self._get_realization(realindex, self.data.keys())
+
+    def _get_realization(self, realindex, keys):
+        """Return a virtual realization with data for the given keys only"""
         vreal = VirtualRealization(
             description="Realization %d from %s" % (realindex, self._name)
         )
-        for key in self.data.keys():
-            data = self.get_df(key)
-            realizationdata = data[data["REAL"] == realindex]
+        for key in keys:
+            realizationdata = self._realization_frame(key, realindex)
             if len(realizationdata) == 1:
                 # Convert scalar values to dictionaries, avoiding
                 # getting length-one-series returned later on access.
@@ -167,27 +233,80 @@ class VirtualEnsemble(object):
             raise ValueError(
                 "Can't add virtual realizations " + "without specifying index"
             )
-        if not realidx:
+        if realidx is None:
             realidx = realization.index
+        self.add_realizations({realidx: realization}, overwrite=overwrite)
 
-        if not overwrite and realidx in self.realindices:
+    def add_realizations(self, realizations, overwrite=False):
+        """Add a batch of realizations.
+
+        The data from all the realizations is collected per key,
+        and each key is concatenated once, which is much faster than
+        adding realizations one at a time with add_realization().
+
+        Unless overwrite is True, a ValueError will be raised if any
+        of the realization indices already exist, and nothing is added.
+
+        Args:
+            realizations: list of ScratchRealizations, which know their
+                realization index, or a dict with realization indices as
+                keys and ScratchRealizations or VirtualRealizations
+                as values.
+            overwrite: boolean whether existing realizations with the same
+                indices should be removed prior to adding
+        """
+        if isinstance(realizations, dict):
+            realitems = list(realizations.items())
+        else:
+            for realization in realizations:
+                if isinstance(realization, VirtualRealization):
+                    raise ValueError(
+                        "Can't add virtual realizations " + "without specifying index"
+                    )
+            realitems = [(real.index, real) for real in realizations]
+        if not realitems:
+            return
+
+        newindices = [realidx for realidx, _ in realitems]
+        if len(set(newindices)) < len(newindices):
+            raise ValueError("Error, duplicate realization indices")
+        existing = list(set(newindices) & set(self.realindices))
+        if existing and not overwrite:
             raise ValueError("Error, realization index already present")
-        if overwrite and realidx in self.realindices:
-            self.remove_realizations(realidx)
-
-        # Add the data from the incoming realization key by key
-        for key in realization.keys():
-            df = realization.get_df(key)
-            if isinstance(df, dict):  # dicts to go to one-row dataframes
-                df = pd.DataFrame(index=[1], data=df)
-            if isinstance(df, (str, int, float)):
-                df = pd.DataFrame(index=[1], columns=[key], data=df)
-            df["REAL"] = realidx
-            if key not in self.data.keys():
-                self.data[key] = df
+        if existing:
+            self.remove_realizations(existing)
+
+        # Collect the data from the incoming realizations key by key
+        frames = OrderedDict()
+        for realidx, realization in realitems:
+            for key in realization.keys():
+                df = realization.get_df(key)
+                if isinstance(df, dict):  # dicts to go to one-row dataframes
+                    df = pd.DataFrame(index=[1], data=df)
+                if isinstance(df, (str, int, float, np.integer, np.floating)):
+                    df = pd.DataFrame(index=[1], columns=[key], data=df)
+                frames.setdefault(key, []).append((realidx, df.assign(REAL=realidx)))
+        addedindices = set()
+        for key, keyframes in frames.items():
+            # The row positions of the new data follow the existing rows
+            rows = {}
+            offset = 0
+            dframes = [df for _, df in keyframes]
+            if key in self.data.keys():
+                rows = dict(self._realization_rows(key))
+                offset = len(self.data[key])
+                dframes.insert(0, self.data[key])
+            for realidx, df in keyframes:
+                if len(df):
+                    rows[realidx] = np.arange(offset, offset + len(df))
+                    addedindices.add(realidx)
+                offset += len(df)
+            if len(dframes) == 1:
+                self.data[key] = dframes[0]
             else:
-                self.data[key] = self.data[key].append(df, ignore_index=True, sort=True)
-        self.update_realindices()
+                self.data[key] = pd.concat(dframes, ignore_index=True, sort=True)
+            self._realrows[key] = rows
+        self.realindices = list(set(self.realindices) | addedindices)
 
     def remove_realizations(self, deleteindices):
         """Remove realizations from internal data
@@ -208,11 +327,20 @@ class VirtualEnsemble(object):
             logger.warning(
                 "Skipping undefined realization indices %s", str(indicesnotknown)
             )
-        # There might be Pandas tricks to avoid this outer loop.
-        for realindex in indicestodelete:
+        if indicestodelete:
             for key in self.data:
-                self.data[key] = self.data[key][self.data[key]["REAL"] != realindex]
-        self.update_realindices()
+                rows = self._realization_rows(key)
+                deleterows = [
+                    rows[realidx] for realidx in indicestodelete if realidx in rows
+                ]
+                if not deleterows:
+                    continue
+                keep = np.ones(len(self.data[key]), dtype=bool)
+                keep[np.concatenate(deleterows)] = False
+                self.data[key] = self.data[key].iloc[np.flatnonzero(keep)]
+        self.realindices = [
+            realidx for realidx in self.realindices if realidx not in indicestodelete
+        ]
         logger.info(
             "Removed %s realization(s) from VirtualEnsemble", len(indicestodelete)
         )
@@ -233,14 +361,22 @@ class VirtualEnsemble(object):
             else:
                 logger.warning("Ensemble did not contain %s", localpath)
 
-    def agg(self, aggregation, keylist=None, excludekeys=None):
+    def agg(
+        self, aggregation, keylist=None, excludekeys=None, workers=None, executor=None
+    ):
         """Aggregate the ensemble data into a VirtualRealization
 
         All data will be attempted aggregated. String data will typically
         be dropped in the result.
 
+        Several aggregations can be asked for at once, they are then
+        all computed from the same pass over the data for each key.
+        The columns to group by and aggregate are worked out once for
+        each key, and reused in later calls until the columns or their
+        dtypes change.
+
         Arguments:
-            aggregation: string, supported modes are
+            aggregation: string or list of strings, supported modes are
                 'mean', 'median', 'p10', 'p90', 'min',
                 'max', 'std, 'var', 'pXX' where X is a number
             keylist: list of strings, indicating which keys
@@ -248,81 +384,22 @@ class VirtualEnsemble(object):
                 (default), all data will be attempted included.
             excludekeys: list of strings that should be excluded if
                 keylist is empty, otherwise ignored
+            workers: int, number of threads to aggregate keys with.
+            executor: concurrent.futures.Executor to aggregate keys
+                with, overrides workers.
         Returns:
-            VirtualRealization. Its name will include the aggregation operator
-
-        WARNING: CODE DUPLICATION from ensemble.py
+            VirtualRealization. Its name will include the aggregation
+            operator. If aggregation is a list, a dict from each
+            aggregation to its VirtualRealization.
         """
-        quantilematcher = re.compile(r"p(\d\d)")
-        supported_aggs = ["mean", "median", "min", "max", "std", "var"]
-        if aggregation not in supported_aggs and not quantilematcher.match(aggregation):
-            raise ValueError(
-                "{arg} is not a".format(arg=aggregation)
-                + "supported ensemble aggregation"
-            )
-
-        # Generate a new empty object:
-        vreal = VirtualRealization(self._name + " " + aggregation)
-
-        # Determine keys to use
-        if isinstance(keylist, str):
-            keylist = [keylist]
-        if not keylist:  # Empty list means all keys.
-            if not isinstance(excludekeys, list):
-                excludekeys = [excludekeys]
-            keys = set(self.data.keys()) - set(excludekeys)
-        else:
-            keys = keylist
-
-        for key in keys:
-            # Aggregate over this ensemble:
-            # Ensure we operate on fully qualified localpath's
-            key = self.shortcut2path(key)
-            data = self.get_df(key).drop(columns="REAL")
-
-            # Look for data we should group by. This would be beneficial
-            # to get from a metadata file, and not by pure guesswork.
-            groupbycolumncandidates = [
-                "DATE",
-                "FIPNUM",
-                "ZONE",
-                "REGION",
-                "JOBINDEX",
-                "Zone",
-                "Region_index",
-            ]
-
-            groupby = [x for x in groupbycolumncandidates if x in data.columns]
-
-            # Filter to only numerical columns and groupby columns:
-            numerical_and_groupby_cols = list(
-                set(list(groupby) + list(data.select_dtypes(include="number").columns))
-            )
-            data = data[numerical_and_groupby_cols]
-
-            dtypes = data.dtypes.unique()
-            if not (int in dtypes or float in dtypes):
-                logger.info("No numerical data to aggregate in %s", key)
-                continue
-            if groupby:
-                aggobject = data.groupby(groupby)
-            else:
-                aggobject = data
-
-            if quantilematcher.match(aggregation):
-                quantile = int(quantilematcher.match(aggregation).group(1))
-                aggregated = aggobject.quantile(q=quantile / 100.0)
-            else:
-                # Passing through the variable 'aggregation' to
-                # Pandas, thus supporting more than we have listed in
-                # the docstring.
-                aggregated = aggobject.agg(aggregation)
-
-            if groupby:
-                aggregated.reset_index(inplace=True)
-
-            vreal.append(key, aggregated)
-        return vreal
+        return self._aggregator.agg(
+            self,
+            aggregation,
+            keylist=keylist,
+            excludekeys=excludekeys,
+            workers=workers,
+            executor=executor,
+        )
 
     def append(self, key, dataframe, overwrite=False):
         """Append a dataframe to the internal datastore
@@ -348,19 +425,80 @@ class VirtualEnsemble(object):
             return
         self.data[key] = dataframe
 
-    def to_disk(self, path):
-        """Dump all data to disk, in a retrieveable manner."""
-        # Mature analogue function in VirtualRealization before commencing this
-        raise NotImplementedError
+    def to_disk(self, filesystempath, delete=False, fileformat=None):
+        """Dump all data to disk, in a retrieveable manner.
+
+        Each dataframe is written to a file named by its localpath (key),
+        in Parquet format if pyarrow is installed, otherwise as CSV.
+        A manifest file, _manifest.json, records the files, their
+        formats, and the column dtypes.
+
+        Args:
+            filesystempath: string with a directory, absolute or
+                relative. If it exists already, it must be empty,
+                unless delete is True.
+            delete: boolean, whether to delete an existing directory.
+            fileformat: string, "parquet" or "csv". Default is Parquet
+                if available.
+        """
+        if os.path.exists(filesystempath):
+            if delete:
+                shutil.rmtree(filesystempath)
+                os.mkdir(filesystempath)
+            else:
+                if os.listdir(filesystempath):
+                    logger.critical("Refusing to write to non-empty directory")
+                    raise IOError("Directory %s not empty" % filesystempath)
+        else:
+            os.mkdir(filesystempath)
+        if fileformat is None:
+            fileformat = "parquet" if HAVE_PYARROW else "csv"
+
+        keyentries = OrderedDict()
+        for key in sorted(self.keys()):
+            logger.info("Dumping %s", key)
+            keyentries[key] = write_frame(
+                self.data[key], filesystempath, key, fileformat=fileformat
+            )
+        write_manifest(
+            filesystempath,
+            {
+                "type": "VirtualEnsemble",
+                "name": self._name,
+                "longdescription": self._longdescription,
+                "realindices": [int(realidx) for realidx in self.realindices],
+                "keys": keyentries,
+            },
+        )
 
-    def load_disk(self, directory):
+    def load_disk(self, filesystempath, lazy=True):
         """Load data from disk.
 
         Data must be written like to_disk() would have
-        written it.
+        written it. Existing data in the object is wiped.
+
+        Args:
+            filesystempath: string with the directory to load from.
+            lazy: boolean. If True (default), the data for each key
+                is only read when it is accessed, f.ex. by get_df()
+                or agg().
         """
-        # Mature analogue function in VirtualRealization before commencing this
-        raise NotImplementedError
+        manifest = read_manifest(filesystempath)
+        if manifest is None or manifest.get("type") != "VirtualEnsemble":
+            raise IOError("No VirtualEnsemble found in " + str(filesystempath))
+        if self._name == "VirtualEnsemble":
+            self._name = manifest["name"]
+        if not self._longdescription:
+            self._longdescription = manifest.get("longdescription")
+
+        self.data = LazyDataStore()
+        for key, keyentry in manifest["keys"].items():
+            self.data.set_loader(
+                key, functools.partial(read_frame, filesystempath, keyentry)
+            )
+            if not lazy:
+                self.data[key]  # pylint: disable=pointless-statement
+        self.realindices = manifest["realindices"]
 
     def __repr__(self):
         """Textual representation of the object"""
@@ -413,12 +551,26 @@ class VirtualEnsemble(object):
         Function analoguous to the EclSum direct get'ters in ScratchEnsemble,
         but here we have to resort to what we have internalized.
 
-        This will perform interpolation in each realizations data to
-        the requested time_index, this is done by creating VirtualRealization
-        object for all realizations, which can do the interpolation, and
-        the result is merged and returned. This creates some overhead, so
-        if you do not need the interpolation, stick with get_df() instead.
+        This will perform interpolation of the internalized data to
+        the requested time_index, for all realizations at once. Cumulative
+        vectors are interpolated in time, rates are backfilled. If you do
+        not need the interpolation, stick with get_df() instead.
+
+        Args:
+            column_keys: str or list of str with column names,
+                may contain wildcards (glob-style). Default is
+                to match every key that is known.
+            time_index: str or list of datetimes. If a string, the
+                dates are taken from the date range of each realization.
         """
+        if not column_keys:
+            column_keys = "*"  # Match everything
+        if isinstance(column_keys, str):
+            column_keys = [column_keys]
+        if not time_index:
+            time_index = "monthly"
+        if not isinstance(time_index, (str, list)):
+            raise TypeError
 
         # Get a list ala ['yearly', 'daily']
         available_smry = [
@@ -450,30 +602,46 @@ class VirtualEnsemble(object):
 
         logger.info("Using %s for interpolation", chosen_smry)
 
-        # Explicit creation of VirtualRealization allows for later
-        # multiprocessing of the interpolation.
-        # We do not use the internal function get_realization() because
-        # that copies all internalized data, while we only need
-        # summary data.
-
-        smry_path = "unsmry--" + chosen_smry
-        smry = self.get_df(smry_path)
-        smry_interpolated = []
-        for realidx in smry["REAL"].unique():
-            vreal = VirtualRealization()
-            # Inject the summary data for that specific realization
-            vreal.append(smry_path, smry[smry["REAL"] == realidx])
-
-            # Now ask the VirtualRealization to do interpolation
-            interp = vreal.get_smry(column_keys=column_keys, time_index=time_index)
-            # Assume we get back a dataframe indexed by the dates from vreal
-            # We must reset that index, and ensure the index column
-            # gets a correct name
-            interp.index = interp.index.set_names(["DATE"])
-            interp = interp.reset_index()
-            interp["REAL"] = realidx
-            smry_interpolated.append(interp)
-        return pd.concat(smry_interpolated, ignore_index=True, sort=False)
+        smry = self.get_df("unsmry--" + chosen_smry)
+        vectors = [
+            col
+            for col in smry.columns
+            if col not in ["DATE", "REAL"]
+            and any(fnmatch.fnmatch(col, key) for key in column_keys)
+        ]
+        if not vectors:
+            raise ValueError("No column keys found")
+        cumulative = VirtualRealization()._smry_cumulative(vectors)
+
+        if isinstance(time_index, list):
+            return resample_smry(smry, vectors, cumulative, time_index)
+
+        # The dates for a frequency string are given by the first and
+        # last date in each realization, realizations sharing these
+        # are resampled together.
+        reals = smry["REAL"].unique()
+        spans = (
+            pd.to_datetime(smry["DATE"])
+            .groupby(smry["REAL"], sort=False)
+            .agg(["min", "max"])
+        )
+        resampled = []
+        for (start_date, end_date), span in spans.groupby(["min", "max"], sort=False):
+            resampled.append(
+                resample_smry(
+                    smry[smry["REAL"].isin(span.index)],
+                    vectors,
+                    cumulative,
+                    smry_date_range(start_date, end_date, time_index),
+                )
+            )
+        if len(resampled) == 1:
+            return resampled[0]
+        resampled = pd.concat(resampled, ignore_index=True, sort=False)
+        order = pd.Index(reals).get_indexer(resampled["REAL"])
+        return resampled.iloc[np.argsort(order, kind="mergesort")].reset_index(
+            drop=True
+        )
 
     def get_smry_stats(self, column_keys=None, time_index="monthly", quantiles=None):
         """
@@ -520,22 +688,9 @@ class VirtualEnsemble(object):
         # Obtain an aggregated dataframe for only the needed columns over
         # the entire ensemble. This will fail if we don't have the
         # time frequency already internalized.
-        dframe = (
-            self.get_smry(time_index=time_index, column_keys=column_keys)
-            .drop(columns="REAL")
-            .groupby("DATE")
-        )
+        dframe = self.get_smry(time_index=time_index, column_keys=column_keys)
 
-        # Build a dictionary of dataframes to be concatenated
-        dframes = {}
-        dframes["mean"] = dframe.mean()
-        for quantile in quantiles:
-            quantile_str = "p" + str(quantile)
-            dframes[quantile_str] = dframe.quantile(q=1 - quantile / 100.0)
-        dframes["maximum"] = dframe.max()
-        dframes["minimum"] = dframe.min()
-
-        return pd.concat(dframes, names=["STATISTIC"], sort=False)
+        return smry_stats(dframe, quantiles, invert_quantiles=True)
 
     def get_volumetric_rates(
         self, column_keys=None, time_index="monthly", time_unit=None
@@ -572,12 +727,11 @@ class VirtualEnsemble(object):
                 is compatible with the date index and the cumulative data.
 
         """
+        smrykeys = [key for key in self.keys() if "unsmry" in key]
         vol_rates_dfs = []
         for realidx in self.realindices:
-            # Warning: This is potentially a big overhead
-            # if a lot of non-summary-related data has been
-            # internalized:
-            vreal = self.get_realization(realidx)
+            # Only summary data is needed for the rates:
+            vreal = self._get_realization(realidx, smrykeys)
             vol_rate_df = vreal.get_volumetric_rates(column_keys, time_index, time_unit)
             # Indexed by DATE, ensure index name is correct:
             vol_rate_df.index = vol_rate_df.index.set_names(["DATE"])
@@ -595,3 +749,4 @@ class VirtualEnsemble(object):
     def name(self):
         """The name of the virtual ensemble as set during initialization"""
         return self._name
+
@@ -5,12 +5,26 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import json
 import fnmatch
 import shutil
+import functools
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
 
 from .etc import Interaction
+from .datastore import (
+    LazyDataStore,
+    write_value,
+    read_value,
+    pack_value,
+    unpack_value,
+    write_manifest,
+    read_manifest,
+    MANIFEST_VERSION,
+)
 
 fmux = Interaction()
 logger = fmux.basiclogger(__name__)
@@ -31,10 +45,8 @@ class VirtualRealization(object):
     def __init__(self, description=None, data=None, longdescription=None):
         self._description = description
         self._longdescription = longdescription
-        if data:
-            self.data = data
-        else:
-            self.data = {}
+        # Data loaded from disk is read on first access
+        self.data = LazyDataStore(data)
 
     def keys(self):
         """Return the keys of all data in internal datastore"""
@@ -66,16 +78,23 @@ class VirtualRealization(object):
         """Represent the realization. Show only the last part of the path"""
         return "<VirtualRealization, {}>".format(self._description)
 
-    def to_disk(self, filesystempath, delete=False):
+    def to_disk(self, filesystempath, delete=False, fileformat="csv"):
         """Write the virtual realization to the filesystem.
 
         All data will be dumped to the requested directory according
-        to their localpaths (keys).
+        to their localpaths (keys). Dataframes are written as CSV,
+        or in Parquet format if requested. Dicts and scalars are
+        written as text files. A manifest file,
+        _manifest.json, records the type of each key, the values of
+        dicts and scalars and the dtypes of dataframes, for load_disk().
 
         Args:
             filesystempath : string with a directory, absolute or
                 relative. If it exists already, it must be empty,
                 otherwise we give up.
+            delete: boolean, whether to delete an existing directory.
+            fileformat: string, "csv" or "parquet", the format
+                for dataframes. Default is CSV. Parquet requires pyarrow.
         """
         if os.path.exists(filesystempath):
             if delete:
@@ -89,57 +108,83 @@ class VirtualRealization(object):
             os.mkdir(filesystempath)
 
         with open(os.path.join(filesystempath, "_description"), "w") as fhandle:
-            fhandle.write(self._description)
+            fhandle.write(str(self._description))
         if self._longdescription:
             with open(os.path.join(filesystempath, "_longdescription"), "w") as fhandle:
                 fhandle.write(str(self._longdescription))
         with open(os.path.join(filesystempath, "__repr__"), "w") as fhandle:
             fhandle.write(self.__repr__())
 
+        keyentries = OrderedDict()
         for key in self.keys():
-            dirname = os.path.join(filesystempath, os.path.dirname(key))
-            if dirname:
-                if not os.path.exists(dirname):
-                    os.makedirs(dirname)
-
-            data = self.get_df(key)
-            filename = os.path.join(dirname, os.path.basename(key))
-            if isinstance(data, pd.DataFrame):
-                logger.info("Dumping %s", key)
-                data.to_csv(filename, index=False)
-            elif isinstance(data, dict):
-                with open(filename, "w") as fhandle:
-                    for paramkey in data.keys():
-                        fhandle.write(paramkey + " " + str(data[paramkey]) + "\n")
-            elif isinstance(data, (str, float, int, np.integer, np.floating)):
-                with open(filename, "w") as fhandle:
-                    fhandle.write(str(data))
-            else:
+            logger.info("Dumping %s", key)
+            try:
+                keyentries[key] = write_value(
+                    self.data[key], filesystempath, key, fileformat=fileformat
+                )
+            except TypeError:
                 logger.warning(
-                    "Don't know how to dump %s " + "of type %s to disk", key, type(key)
+                    "Don't know how to dump %s of type %s to disk",
+                    key,
+                    type(self.data[key]),
                 )
+        write_manifest(
+            filesystempath,
+            {
+                "type": "VirtualRealization",
+                "description": self._description,
+                "longdescription": self._longdescription,
+                "keys": keyentries,
+            },
+        )
 
-    def load_disk(self, filesystempath):
+    def load_disk(self, filesystempath, lazy=True):
         """Load data for a virtual realization from disk.
 
         Existing data in the current object will be wiped,
         this function is intended for initialization
 
-        WARNING: This code is really shaky. We need metafiles written
-        by to_json() for robust parsing of files on disk, f.ex. are
-        txt files really key-value data (dicts) or csv files?
+        The data is read according to the manifest written by
+        to_disk(). Directories without a manifest, written by older
+        versions, are loaded by guessing the file formats,
+        see _load_disk_legacy().
+
+        Args:
+            filesystempath: path to a directory that to_disk() has
+                written to (or a really careful user)
+            lazy: boolean. If True (default), dataframes are only read
+                when they are accessed.
+        """
+        logger.info("Loading virtual realization from %s", filesystempath)
+        manifest = read_manifest(filesystempath)
+        self.data = LazyDataStore()
+        if manifest is None:
+            self._load_disk_legacy(filesystempath)
+            return
+        if manifest.get("type") != "VirtualRealization":
+            raise IOError("No VirtualRealization found in " + str(filesystempath))
+        self._description = manifest["description"]
+        self._longdescription = manifest.get("longdescription")
+        for key, keyentry in manifest["keys"].items():
+            if keyentry["kind"] == "frame" and lazy:
+                self.data.set_loader(
+                    key, functools.partial(read_value, filesystempath, keyentry)
+                )
+            else:
+                self.data[key] = read_value(filesystempath, keyentry)
 
-        Currently, the file format is guessed based on the contents
+    def _load_disk_legacy(self, filesystempath):
+        """Load a directory written by to_disk() before manifests
+        were written
+
+        The file format is guessed based on the contents
         of the two first lines:
         * CSV files contains commas, and more than one line
         * key-value files contains two space-separated values, and at least one line
         * scalar files contain only one item and one line
 
-        Args:
-            filesystempath: path to a directory that to_disk() has
-                written to (or a really careful user)
+        Files not matching any of these are skipped, with a warning.
         """
-        logger.info("Loading virtual realization from %s", filesystempath)
         for root, _, filenames in os.walk(filesystempath):
             for filename in filenames:
                 if filename == "_description":
@@ -150,8 +195,7 @@ class VirtualRealization(object):
                 elif filename == "STATUS":
                     self.append("STATUS", pd.read_csv(os.path.join(root, filename)))
                     logger.info("got STATUS")
-                elif filename == "__repr__":
-                    # Not implemented..
+                elif filename in ["__repr__", "_longdescription"]:
                     continue
                 else:
                     # GUESS scalar, key-value txt or CSV from the first
@@ -160,10 +204,12 @@ class VirtualRealization(object):
                         lines = realfile.readlines()
 
                     linecount = len(lines)
+                    if not linecount:
+                        logger.warning("Skipping empty file %s", filename)
+                        continue
                     commafields = len(lines[0].split(","))
                     spacefields = len(lines[0].split())
 
-                    print(filename, commafields, spacefields, linecount)
                     if spacefields == 2 and commafields == 1:
                         # key-value txt file!
                         self.append(
@@ -190,6 +236,8 @@ class VirtualRealization(object):
                         # CSV file!
                         self.append(filename, pd.read_csv(os.path.join(root, filename)))
                         logger.info("Read csv file %s", filename)
+                    else:
+                        logger.warning("Could not determine format of %s", filename)
 
     def to_json(self):
         """
@@ -198,7 +246,32 @@ class VirtualRealization(object):
         Resulting json string is compatible with the
         accompanying load_json() function
         """
-        raise NotImplementedError
+        return json.dumps(
+            {
+                "type": "VirtualRealization",
+                "version": MANIFEST_VERSION,
+                "description": self._description,
+                "longdescription": self._longdescription,
+                "keys": OrderedDict(
+                    [(key, pack_value(self.data[key])) for key in self.keys()]
+                ),
+            },
+            default=str,
+        )
+
+    def load_json(self, jsonstring):
+        """Load realization data from a json string made by to_json()
+
+        Existing data in the current object will be wiped.
+        """
+        dump = json.loads(jsonstring, object_pairs_hook=OrderedDict)
+        if dump.get("type") != "VirtualRealization":
+            raise ValueError("No VirtualRealization found in json string")
+        self._description = dump["description"]
+        self._longdescription = dump.get("longdescription")
+        self.data = LazyDataStore()
+        for key, keyentry in dump["keys"].items():
+            self.data[key] = unpack_value(keyentry)
 
     def get_df(self, localpath):
         """Access the internal datastore which contains dataframes, dicts
@@ -454,16 +527,11 @@ class VirtualRealization(object):
         available_dates = [pd.to_datetime(x) for x in list(available_dates)]
         start_date = min(available_dates)
         end_date = max(available_dates)
-        pd_freq_mnenomics = {"monthly": "MS", "yearly": "YS", "daily": "D"}
         if normalize:
             raise NotImplementedError
             # (start_date, end_date) = normalize_dates(start_date, end_date,
             #                                         freq)
-        if freq not in pd_freq_mnenomics:
-            raise ValueError("Requested frequency %s not supported" % freq)
-        datetimes = pd.date_range(start_date, end_date, freq=pd_freq_mnenomics[freq])
-        # Convert from Pandas' datetime64 to datetime.date:
-        return [x.date() for x in datetimes]
+        return smry_date_range(start_date, end_date, freq)
 
     def _glob_smry_keys(self, column_keys):
         """Glob a list of column keys
@@ -551,3 +619,22 @@ class VirtualRealization(object):
     def name(self):
         """Return name of ensemble"""
         return self._description
+
+
+def smry_date_range(start_date, end_date, freq):
+    """Return list of dates with a given frequency between
+    a start and an end date, both inclusive.
+
+    Args:
+        start_date: datetime or date
+        end_date: datetime or date
+        freq: string, 'daily', 'monthly' or 'yearly'
+    Returns:
+        list of datetime.date
+    """
+    pd_freq_mnenomics = {"monthly": "MS", "yearly": "YS", "daily": "D"}
+    if freq not in pd_freq_mnenomics:
+        raise ValueError("Requested frequency %s not supported" % freq)
+    datetimes = pd.date_range(start_date, end_date, freq=pd_freq_mnenomics[freq])
+    # Convert from Pandas' datetime64 to datetime.date:
+    return [x.date() for x in datetimes]
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fmu.ensemble import etc
+from fmu.ensemble import VirtualEnsemble, VirtualRealization
+from fmu.ensemble.aggregation import Aggregator, aggregate_frame, check_aggregations
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+def test_aggregate_frame():
+    """Test the one-pass aggregation against pandas"""
+    rng = np.random.RandomState(3)
+    nreals = 9
+    dframe = pd.DataFrame(
+        {
+            "ZONE": np.tile(["UPPER", "LOWER", "MID"], nreals),
+            "FIPNUM": np.tile([2, 1, 2], nreals),
+            "STOIIP": rng.rand(3 * nreals),
+            "PORV": rng.randint(0, 100, 3 * nreals),
+        }
+    )
+    dframe.loc[4, "STOIIP"] = np.nan
+    dframe.loc[5, "ZONE"] = np.nan
+    aggregations = ["mean", "median", "min", "max", "std", "var", "p10", "p90"]
+
+    aggregated = aggregate_frame(dframe, ["ZONE", "FIPNUM"], aggregations)
+    assert list(aggregated.keys()) == aggregations
+    grouped = dframe.groupby(["ZONE", "FIPNUM"])
+    for aggregation in aggregations:
+        if aggregation.startswith("p"):
+            expected = grouped.quantile(int(aggregation[1:]) / 100.0)
+        else:
+            expected = grouped.agg(aggregation)
+        pd.testing.assert_frame_equal(
+            aggregated[aggregation], expected.reset_index(), check_dtype=False
+        )
+    assert aggregated["max"]["PORV"].dtype == dframe["PORV"].dtype
+
+    # Without grouping, we get Series:
+    scalars = aggregate_frame(dframe[["STOIIP", "PORV"]], [], ["mean", "p90"])
+    pd.testing.assert_series_equal(scalars["mean"], dframe[["STOIIP", "PORV"]].mean())
+    pd.testing.assert_series_equal(
+        scalars["p90"], dframe[["STOIIP", "PORV"]].quantile(0.9), check_names=False
+    )
+
+    check_aggregations(["mean", "p37"])
+    with pytest.raises(ValueError):
+        check_aggregations(["mean", "foobar"])
+
+
+def test_virtual_agg():
+    """Test aggregating several statistics at once in a VirtualEnsemble"""
+    vens = VirtualEnsemble(name="aggtest")
+    for realidx in range(4):
+        vreal = VirtualRealization()
+        vreal.append(
+            "share/results/volumes/simulator_volume_fipnum.csv",
+            pd.DataFrame({"FIPNUM": [1, 2], "STOIIP_OIL": [realidx, 2 * realidx]}),
+        )
+        vreal.append(
+            "parameters.txt",
+            pd.DataFrame(
+                {"FOO": [realidx], "BAR": [1.0], "MODEL": ["model" + str(realidx)]}
+            ),
+        )
+        vreal.append("npv.txt", realidx * 1000)
+        vens.add_realization(vreal, realidx=realidx)
+
+    stats = vens.agg(["mean", "p10", "max"], workers=2)
+    assert list(stats.keys()) == ["mean", "p10", "max"]
+    assert isinstance(stats["mean"], VirtualRealization)
+    volumes = stats["max"]["simulator_volume_fipnum"]
+    assert list(volumes["STOIIP_OIL"]) == [3, 6]
+    # String parameters are not grouped by:
+    assert stats["mean"]["parameters.txt"] == {"FOO": 1.5, "BAR": 1.0}
+    assert stats["max"]["parameters.txt"]["FOO"] == 3
+    # Scalars are not converted to numbers:
+    assert stats["mean"]["npv.txt"] == {"npv.txt": 1500.0}
+
+    # Single aggregations give the same result:
+    pd.testing.assert_frame_equal(
+        vens.agg("p10")["simulator_volume_fipnum"],
+        stats["p10"]["simulator_volume_fipnum"],
+    )
+
+    # Only the data for each key is sent to a process pool, the plans
+    # are made and kept in the calling process:
+    concurrent = pytest.importorskip("concurrent.futures")
+    with concurrent.ProcessPoolExecutor(max_workers=2) as executor:
+        procstats = vens.agg(["mean", "max"], executor=executor)
+    pd.testing.assert_frame_equal(procstats["max"]["simulator_volume_fipnum"], volumes)
+    assert procstats["mean"]["parameters.txt"] == stats["mean"]["parameters.txt"]
+    assert sorted(vens._aggregator._plans) == [
+        "npv.txt",
+        "parameters.txt",
+        "share/results/volumes/simulator_volume_fipnum.csv",
+    ]
+
+
+def test_aggregator_plans():
+    """Test that aggregation plans are reused until the schema changes"""
+    aggregator = Aggregator()
+    dframe = pd.DataFrame(
+        {
+            "REAL": [0, 0, 1, 1],
+            "ZONE": ["UPPER", "LOWER", "UPPER", "LOWER"],
+            "STOIIP": [1.0, 2.0, 3.0, 4.0],
+            "WELL": ["OP1", "OP1", "OP2", "OP2"],
+        }
+    )
+    plan = aggregator.plan("volumes", dframe)
+    assert plan == (["ZONE", "WELL"], ["STOIIP"])
+    assert aggregator.plan("volumes", dframe.copy()) is plan
+
+    # STATUS is not grouped by its strings:
+    assert aggregator.plan("STATUS", dframe) == (["ZONE"], ["STOIIP"])
+    # Nor is anything with group_strings=False:
+    assert Aggregator(group_strings=False).plan("volumes", dframe) == (
+        ["ZONE"],
+        ["STOIIP"],
+    )
+
+    # A new column gives a new plan:
+    dframe["PORV"] = [1, 2, 3, 4]
+    assert aggregator.plan("volumes", dframe) == (["ZONE", "WELL"], ["STOIIP", "PORV"])
+
+    # So does a new dtype:
+    dframe["PORV"] = dframe["PORV"].astype(str)
+    assert aggregator.plan("volumes", dframe) == (
+        ["ZONE", "WELL", "PORV"],
+        ["STOIIP"],
+    )
+
+    assert aggregator.plan("strings", dframe[["REAL", "WELL"]]) is None
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fmu.ensemble import etc
+from fmu.ensemble.cache import DiskCache, LRUCache
+from fmu.ensemble.realization import (
+    _pack_geometry,
+    _unpack_geometry,
+    GRID_INDEX_COLUMNS,
+    GRID_CORNER_COLUMNS,
+    GRID_CENTRE_COLUMNS,
+)
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+def test_lrucache():
+    """Test eviction order, budgets and counters of the LRU cache"""
+    cache = LRUCache(maxcount=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["evictions"] == 1
+
+    # peek() does not count
+    assert cache.peek("a") == 1
+    assert cache.hits == 1
+
+    cache = LRUCache(maxbytes=100)
+    cache.put("a", "A", nbytes=40)
+    cache.put("b", "B", nbytes=40)
+    assert cache.nbytes == 80
+    cache.put("c", "C", nbytes=40)
+    assert len(cache) == 2
+    assert "a" not in cache
+    assert cache.nbytes == 80
+
+    # Replacing an entry updates the size
+    cache.put("c", "C", nbytes=10)
+    assert cache.nbytes == 50
+
+    # Too large entries are not kept
+    cache.put("d", "D", nbytes=200)
+    assert not len(cache)
+    assert cache.nbytes == 0
+
+    cache.put("a", "A", nbytes=40)
+    cache.put("b", "B", nbytes=40)
+    cache.resize(maxcount=1)
+    assert len(cache) == 1
+    assert "b" in cache
+    assert cache.pop("b") == "B"
+    assert cache.nbytes == 0
+
+    cache.put("a", "A")
+    cache.get("a")
+    cache.clear()
+    assert not len(cache)
+    assert cache.stats()["hits"] == 0
+    assert "LRUCache" in repr(cache)
+
+    # Evicted, replaced and cleared values are handed to on_evict
+    evicted = []
+    cache = LRUCache(maxcount=2, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.put("c", "C")
+    assert evicted == ["a"]
+    cache.put("b", "B2")
+    assert evicted == ["a", "b"]
+    assert cache.pop("b") == "B2"
+    assert evicted == ["a", "b"]
+    cache.clear()
+    assert evicted == ["a", "b", "c"]
+
+
+def test_diskcache_geometry(tmp="TMP"):
+    """Test storing grid geometry as compact arrays in the disk cache"""
+    cachedir = os.path.join(tmp, "geometrycache")
+    if os.path.exists(cachedir):
+        shutil.rmtree(cachedir)
+    cache = DiskCache(cachedir)
+
+    rng = np.random.RandomState(6)
+    ncells = 50
+    geometry = pd.DataFrame(
+        rng.randint(0, 10, size=(ncells, 4)), columns=GRID_INDEX_COLUMNS
+    )
+    # Typical map coordinates, where float32 alone would lose precision:
+    offsets = np.array([456000.0, 5930000.0, 1600.0])
+    corners = rng.rand(ncells, 8, 3) * 1000 + offsets
+    geometry = geometry.join(
+        pd.DataFrame(corners.reshape(ncells, 24), columns=GRID_CORNER_COLUMNS)
+    ).join(pd.DataFrame(corners.mean(axis=1), columns=GRID_CENTRE_COLUMNS))
+
+    key = cache.key(os.path.join(tmp, "FOO.EGRID"), "grid_geometry", False)
+    cache.put_arrays(key, _pack_geometry(geometry))
+    arrays = cache.get_arrays(key)
+    assert arrays["corners"].dtype == np.float32
+
+    unpacked = _unpack_geometry(arrays)
+    assert list(unpacked.columns) == list(geometry.columns)
+    assert (unpacked[GRID_INDEX_COLUMNS] == geometry[GRID_INDEX_COLUMNS]).all().all()
+    # Millimeter precision is kept:
+    assert np.abs(unpacked.values - geometry.values).max() < 1e-3
+
+    with pytest.raises(KeyError):
+        cache.get_arrays("nonexisting")
+    shutil.rmtree(cachedir)
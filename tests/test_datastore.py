@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fmu.ensemble import etc
+from fmu.ensemble.datastore import (
+    LazyDataStore,
+    write_frame,
+    read_frame,
+    write_manifest,
+    read_manifest,
+    pack_value,
+    unpack_value,
+    HAVE_PYARROW,
+    MANIFEST_FILENAME,
+)
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+def test_lazydatastore():
+    """Test that values are loaded on first access only"""
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return "loaded"
+
+    store = LazyDataStore({"a": 1})
+    store.set_loader("b", loader)
+    assert list(store.keys()) == ["a", "b"]
+    assert store.is_loaded("a")
+    assert not store.is_loaded("b")
+    assert not calls
+    assert store["b"] == "loaded"
+    assert store["b"] == "loaded"
+    assert len(calls) == 1
+    assert store.is_loaded("b")
+    del store["a"]
+    assert "a" not in store
+    assert len(store) == 1
+
+
+def test_frame_roundtrip(tmp="TMP"):
+    """Test that dataframes and their dtypes survive writing to disk"""
+    dframe = pd.DataFrame(
+        {
+            "REAL": [0, 1, 2],
+            "DATE": [datetime.date(2000, 1, 1)] * 3,
+            "TIME": pd.to_datetime(["2000-01-01", "2000-01-02", "2000-01-03"]),
+            "FOPT": [1.0, 2.0, 3.0],
+            "ZONE": ["A", "B", "C"],
+            "COUNT": pd.Series([1, 2, 3], dtype="int32"),
+            "ARGS": [["a"], ["b", "c"], None],
+        }
+    )
+    directory = os.path.join(tmp, "datastore")
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    fileformats = ["csv"]
+    if HAVE_PYARROW:
+        fileformats.append("parquet")
+    for fileformat in fileformats:
+        entry = write_frame(dframe, directory, "some/table.csv", fileformat)
+        assert entry["format"] == fileformat
+        assert os.path.exists(os.path.join(directory, entry["file"]))
+        pd.testing.assert_frame_equal(read_frame(directory, entry), dframe)
+
+    pd.testing.assert_frame_equal(unpack_value(pack_value(dframe)), dframe)
+    # ISO strings with a timezone designator, as written by older versions:
+    isoentry = pack_value(dframe[["TIME"]])
+    isoentry["value"] = [[str(time.date()) + "T00:00:00.000Z"] for time in dframe.TIME]
+    pd.testing.assert_frame_equal(unpack_value(isoentry), dframe[["TIME"]])
+    utcframe = pd.DataFrame({"TIME": dframe.TIME.dt.tz_localize("UTC")})
+    pd.testing.assert_frame_equal(unpack_value(pack_value(utcframe)), utcframe)
+    assert unpack_value(pack_value({"FWL": 1700.0, "ZONE": "A"})) == {
+        "FWL": 1700.0,
+        "ZONE": "A",
+    }
+    assert unpack_value(pack_value(np.int64(3444))) == 3444
+
+    emptyentry = write_frame(dframe.iloc[0:0], directory, "empty", "csv")
+    assert emptyentry["file"] == "empty"
+    assert read_frame(directory, emptyentry).empty
+
+    with pytest.raises(ValueError):
+        write_frame(dframe, directory, "table", "feather")
+
+    write_manifest(directory, {"type": "test", "keys": {"some/table.csv": entry}})
+    assert os.path.exists(os.path.join(directory, MANIFEST_FILENAME))
+    manifest = read_manifest(directory)
+    assert manifest["type"] == "test"
+    assert manifest["keys"]["some/table.csv"] == entry
+    assert read_manifest(os.path.join(directory, "some")) is None
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+from ecl import EclDataType
+from ecl.eclfile import EclKW, FortIO, openFortIO
+
+from fmu.ensemble import etc
+from fmu.ensemble import ScratchRealization
+from fmu.ensemble.eclfiles import EclFileCache
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+def _write_keywords(filename, keywords):
+    """Write a list of (name, values) as a restart format file"""
+    with openFortIO(filename, mode=FortIO.WRITE_MODE) as fortio:
+        for name, values in keywords:
+            if values.dtype.kind == "i":
+                ecltype = EclDataType.ECL_INT
+            else:
+                ecltype = EclDataType.ECL_FLOAT
+            eclkw = EclKW(name, len(values), ecltype)
+            eclkw.numpy_view()[:] = values
+            eclkw.fwrite(fortio)
+
+
+def test_eclfilecache(tmp="TMP"):
+    """Test that files are closed on eviction, but not while read from"""
+    eclfiledir = os.path.join(tmp, "eclfilecache")
+    if os.path.exists(eclfiledir):
+        shutil.rmtree(eclfiledir)
+    os.makedirs(eclfiledir)
+    filenames = [os.path.join(eclfiledir, "FOO{}.INIT".format(idx)) for idx in range(3)]
+    for idx, filename in enumerate(filenames):
+        _write_keywords(
+            filename, [("PORV", np.arange(4.0) + idx), ("FIPNUM", np.arange(4))]
+        )
+
+    cache = EclFileCache(maxcount=2)
+    assert sorted(cache.keys(filenames[0])) == ["FIPNUM", "PORV"]
+    with cache.open(filenames[0]) as eclfile:
+        first = eclfile
+        # Evicting a file in use postpones closing it
+        cache.resize(maxcount=0)
+        assert not len(cache)
+        assert eclfile
+        assert list(eclfile.iget_named_kw("PORV", 0).numpy_view()) == [0, 1, 2, 3]
+    assert not first
+
+    cache.resize(maxcount=2)
+    for filename in filenames:
+        with cache.open(filename) as eclfile:
+            assert eclfile.iget_named_kw("PORV", 0)[0] == filenames.index(filename)
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 2
+
+    # Concurrent readers share the open files
+    cache.clear()
+    threads = [
+        threading.Thread(target=cache.keys, args=(filename,))
+        for filename in filenames * 4
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 2
+    assert "EclFileCache" in repr(cache)
+
+    with pytest.raises(OSError):
+        with cache.open(os.path.join(eclfiledir, "BAR.INIT")):
+            pass
+    shutil.rmtree(eclfiledir)
+
+
+def test_unrst_keyword(tmp="TMP"):
+    """Test reading single report steps from a restart file"""
+    realdir = os.path.join(tmp, "unrstreal", "realization-0")
+    if os.path.exists(realdir):
+        shutil.rmtree(realdir)
+    modeldir = os.path.join(realdir, "eclipse", "model")
+    os.makedirs(modeldir)
+    porv = np.array([1.0, 0.0, 2.0, 3.0])
+    _write_keywords(os.path.join(modeldir, "FOO.INIT"), [("PORV", porv)])
+    report_steps = []
+    for seqnum in range(3):
+        report_steps.append(("SEQNUM", np.array([seqnum])))
+        report_steps.append(("SWAT", np.arange(3.0) + 10 * seqnum))
+    _write_keywords(os.path.join(modeldir, "FOO.UNRST"), report_steps)
+
+    real = ScratchRealization(realdir)
+    assert list(real.init_keys) == ["PORV"]
+    assert sorted(real.unrst_keys) == ["SEQNUM", "SWAT"]
+    assert list(real.actnum.numpy_view()) == [1, 0, 1, 1]
+    swat = real.get_global_unrst_keyword("SWAT", 1)
+    assert list(swat.numpy_view()) == [10, 0, 11, 12]
+    assert real.get_global_unrst_keyword("SWAT", -1)[3] == 22
+    with pytest.raises(IndexError):
+        real.get_global_unrst_keyword("SWAT", 3)
+    with pytest.raises(KeyError):
+        real.get_global_unrst_keyword("SGAS", 0)
+    assert len(ScratchRealization.eclfile_cache) == 2
+
+    # get_unrst() gives a file owned by the caller, not closed by the cache
+    unrst = real.get_unrst()
+    ScratchRealization.eclfile_cache.clear()
+    assert unrst
+    assert unrst.iget_named_kw("SWAT", 2)[0] == 20
+    shutil.rmtree(os.path.join(tmp, "unrstreal"))
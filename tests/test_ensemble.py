@@ -7,6 +7,7 @@ from __future__ import print_function
 
 import os
 import shutil
+from collections import OrderedDict
 
 import numpy
 import pandas as pd
@@ -14,7 +15,9 @@ import pandas as pd
 import pytest
 
 from fmu.ensemble import etc
-from fmu.ensemble import ScratchEnsemble, ScratchRealization
+from fmu.ensemble import ScratchEnsemble, ScratchRealization, SummaryCube
+from fmu.ensemble.ensemble import volumetric_rates
+from fmu.ensemble.realization import ECLSUM_CACHE_MAXCOUNT, date_intervals
 
 try:
     SKIP_FMU_TOOLS = False
@@ -523,6 +526,18 @@ def test_volumetric_rates():
     assert "FOPR" in vol_rate_df
     assert "FWPR" in vol_rate_df
 
+    # The same as computing each realization in turn:
+    expected = []
+    for realidx, real in ens._realizations.items():
+        real_rates = real.get_volumetric_rates(
+            column_keys=["F*T", "W*T*"], time_index="yearly"
+        ).reset_index()
+        real_rates.insert(0, "REAL", realidx)
+        expected.append(real_rates)
+    pd.testing.assert_frame_equal(
+        vol_rate_df, pd.concat(expected, ignore_index=True, sort=False)
+    )
+
     # Test each realization individually
     for realidx in vol_rate_df["REAL"].unique():
         vol_rate_real = vol_rate_df.set_index("REAL").loc[realidx]
@@ -530,6 +545,62 @@ def test_volumetric_rates():
         assert len(vol_rate_real) == 5
         assert vol_rate_real["FOPR"].sum() == cum_real["FOPT"].iloc[-1]
 
+    # Batched computation should agree with each realization:
+    vol_rate_months = ens.get_volumetric_rates(
+        column_keys=["FOPT", "FWPT"], time_index="yearly", time_unit="months"
+    )
+    assert list(vol_rate_months.columns) == ["REAL", "DATE", "FOPR", "FWPR"]
+    for realidx, real in ens._realizations.items():
+        real_rates = real.get_volumetric_rates(
+            column_keys=["FOPT", "FWPT"], time_index="yearly", time_unit="months"
+        )
+        ens_rates = vol_rate_months.set_index("REAL").loc[realidx].set_index("DATE")
+        pd.testing.assert_frame_equal(
+            ens_rates, real_rates, check_freq=False, check_like=True
+        )
+
+    assert ens.get_volumetric_rates(column_keys="FOOBAR").empty
+    with pytest.raises(ValueError):
+        ens.get_volumetric_rates(column_keys="FOPT", time_unit="bogus")
+
+
+def test_batched_volumetric_rates():
+    """Test that rates computed for several realizations at once are
+    the same as for one realization at a time"""
+    cum_dfs = OrderedDict()
+    cum_dfs[3] = pd.DataFrame(
+        {"FOPT": [0.0, 10.0, 30.0, 60.0], "FWPT": [0.0, 1.0, 2.0, 4.0]},
+        index=pd.to_datetime(["2000-01-01", "2001-01-01", "2002-01-01", "2003-01-01"]),
+    )
+    # Other dates, a missing value, and no FWPT:
+    cum_dfs[1] = pd.DataFrame(
+        {"FOPT": [0.0, numpy.nan, 5.0, 20.0]},
+        index=pd.to_datetime(["2000-01-01", "2000-02-15", "2000-07-01", "2001-01-01"]),
+    )
+    cum_dfs[2] = pd.DataFrame({"FOPT": [7.0]}, index=pd.to_datetime(["2000-01-01"]))
+
+    for time_unit in [None, "days", "months", "years"]:
+        expected = []
+        for realidx, cum_df in cum_dfs.items():
+            # As in ScratchRealization.get_volumetric_rates():
+            diff_cum = cum_df.diff().shift(-1).fillna(value=0)
+            if time_unit:
+                intervals = numpy.append(date_intervals(diff_cum.index, time_unit), 0)
+                diff_cum = diff_cum.div(intervals, axis=0).fillna(value=0)
+            diff_cum.columns = [col.replace("T", "R") for col in diff_cum.columns]
+            diff_cum.index.name = "DATE"
+            diff_cum = diff_cum.reset_index()
+            diff_cum.insert(0, "REAL", realidx)
+            expected.append(diff_cum)
+        pd.testing.assert_frame_equal(
+            volumetric_rates(cum_dfs, time_unit),
+            pd.concat(expected, ignore_index=True, sort=False),
+        )
+
+    rates = volumetric_rates(cum_dfs)
+    assert list(rates["REAL"]) == [3, 3, 3, 3, 1, 1, 1, 1, 2]
+    assert rates["FWPR"].isnull().sum() == 5
+
 
 def test_filter():
     """Test filtering of realizations in ensembles
@@ -729,6 +800,14 @@ def test_ertrunpathfile():
     # because ECLBASE is given in the runpathfile
     assert sum(["UNSMRY" in x for x in ens.files["BASENAME"].unique()]) == 5
 
+    # Initialize concurrently:
+    parens = ScratchEnsemble(
+        "ensfromrunpath", runpathfile=testdir + "/data/ert-runpath-file", workers=3
+    )
+    assert sorted(parens.keys()) == sorted(ens.keys())
+    assert sorted(parens._realizations.keys()) == sorted(ens._realizations.keys())
+    assert len(parens.files) == len(ens.files)
+
     os.chdir(cwd)
 
 
@@ -797,6 +876,57 @@ def test_eclsumcaching():
     assert not any([x._eclsum for (idx, x) in ens._realizations.items()])
 
 
+def test_eclsum_lrucache():
+    """Test the shared EclSum cache with a budget"""
+
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    eclsum_cache = ScratchRealization.eclsum_cache
+    assert eclsum_cache.maxcount == ECLSUM_CACHE_MAXCOUNT
+    eclsum_cache.clear()
+    eclsum_cache.resize(maxcount=2)
+
+    dirs = testdir + "/data/testensemble-reek001/" + "realization-*/iter-0"
+    ens = ScratchEnsemble("reektest", dirs)
+    ens.get_smry(column_keys=["FOPT"])
+    assert len(eclsum_cache) == 2
+    assert eclsum_cache.misses == len(ens)
+    assert eclsum_cache.evictions == len(ens) - 2
+    assert sum([bool(x._eclsum) for x in ens._realizations.values()]) == 2
+
+    # A new ensemble object over the same files reuses the cached objects
+    ens2 = ScratchEnsemble("reektest", dirs)
+    realindices = list(ens._realizations.keys())
+    ens2[realindices[-1]].get_smry(column_keys=["FOPT"])
+    assert eclsum_cache.hits == 1
+    assert eclsum_cache.nbytes > 0
+
+    # Evicted objects are reopened on demand:
+    assert not ens[realindices[0]].get_smry(column_keys=["FOPT"]).empty
+
+    # A rewritten UNSMRY file is not served from the cache:
+    real = ens[realindices[0]]
+    eclsum = real.get_eclsum()
+    unsmry = real._eclsum_key[0]
+    stat = os.stat(unsmry)
+    os.utime(unsmry, (stat.st_atime, stat.st_mtime + 1))
+    try:
+        assert real.get_eclsum() is not eclsum
+    finally:
+        os.utime(unsmry, (stat.st_atime, stat.st_mtime))
+
+    eclsum_cache.resize(maxbytes=0)
+    assert not len(eclsum_cache)
+    assert not any([x._eclsum for x in ens._realizations.values()])
+
+    eclsum_cache.resize(maxcount=ECLSUM_CACHE_MAXCOUNT)
+    eclsum_cache.clear()
+
+
 def test_filedescriptors():
     """Test how filedescriptors are used.
 
@@ -835,6 +965,108 @@ def test_filedescriptors():
     assert fd_count1 == fd_count4
 
 
+def test_parallel_load_smry():
+    """Test loading summary data concurrently"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    dirs = testdir + "/data/testensemble-reek001/" + "realization-*/iter-0"
+    ens = ScratchEnsemble("reektest", dirs)
+    serial = ens.load_smry(time_index="yearly", column_keys=["FOPT", "FGPT"])
+
+    ens = ScratchEnsemble("reektest", dirs)
+    threaded = ens.load_smry(
+        time_index="yearly", column_keys=["FOPT", "FGPT"], workers=3
+    )
+    pd.testing.assert_frame_equal(serial, threaded)
+    assert all([x._eclsum for (idx, x) in ens._realizations.items()])
+
+    ens = ScratchEnsemble("reektest", dirs)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        forked = ens.load_smry(
+            time_index="yearly", column_keys=["FOPT", "FGPT"], executor=executor
+        )
+    pd.testing.assert_frame_equal(serial, forked)
+    # The frames must be internalized in this process' realizations:
+    assert "share/results/tables/unsmry--yearly.csv" in ens[0].keys()
+
+
+def test_parallel_init():
+    """Test initializing ensembles concurrently"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    dirs = testdir + "/data/testensemble-reek001/" + "realization-*/iter-0"
+    ens = ScratchEnsemble("reektest", dirs)
+    parens = ScratchEnsemble("reektest", dirs, workers=4)
+    assert len(parens) == len(ens) == 5
+    assert sorted(parens._realizations.keys()) == sorted(ens._realizations.keys())
+    pd.testing.assert_frame_equal(
+        parens.parameters.sort_values("REAL").reset_index(drop=True),
+        ens.parameters.sort_values("REAL").reset_index(drop=True),
+    )
+
+    lazyens = ScratchEnsemble("reektest", dirs, lazy=True, workers=4)
+    pd.testing.assert_frame_equal(
+        lazyens.parameters.sort_values("REAL").reset_index(drop=True),
+        ens.parameters.sort_values("REAL").reset_index(drop=True),
+    )
+
+    # Unparseable realization indices are still skipped:
+    badregexp = ScratchEnsemble(
+        "reektest", dirs, realidxregexp=r"foobar-(\d+)", workers=2
+    )
+    assert not badregexp
+
+
+def test_smry_cube():
+    """Test loading summary data into a dense SummaryCube"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    reekensemble = ScratchEnsemble(
+        "reektest", testdir + "/data/testensemble-reek001/" + "realization-*/iter-0"
+    )
+    cube = reekensemble.load_smry(
+        time_index="yearly", column_keys=["FOPT", "FGPT"], stacked=False
+    )
+    assert isinstance(cube, SummaryCube)
+    assert cube.shape == (5, len(reekensemble.get_smry_dates(freq="yearly")), 2)
+    assert cube.vectors == ["FGPT", "FOPT"]
+    assert list(cube.reals) == [0, 1, 2, 3, 4]
+    # Nothing is internalized:
+    assert "share/results/tables/unsmry--yearly.csv" not in reekensemble.keys()
+
+    stacked = reekensemble.load_smry(time_index="yearly", column_keys=["FOPT", "FGPT"])
+    fopt = cube["FOPT"]
+    assert list(fopt.columns) == [0, 1, 2, 3, 4]
+    assert fopt.index.name == "DATE"
+    stackedfopt = stacked.pivot(index="DATE", columns="REAL", values="FOPT")
+    assert numpy.allclose(fopt.values, stackedfopt.values)
+    assert numpy.allclose(
+        cube.to_frame()["FOPT"].values,
+        stacked.sort_values(["REAL", "DATE"])["FOPT"].values,
+    )
+
+    # Raw dates give the union of dates, with NaN where
+    # a realization does not have data:
+    rawcube = reekensemble.load_smry(column_keys="FOPT", stacked=False, workers=2)
+    assert rawcube.shape[1] == len(reekensemble.get_smry_dates(freq="raw"))
+    rawstacked = reekensemble.get_smry(column_keys="FOPT")
+    assert numpy.isfinite(rawcube.values).sum() == len(rawstacked)
+
+
 def test_read_eclgrid():
     """Test reading Eclipse grids of a full ensemble
 
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+from fmu.ensemble import etc
+from fmu.ensemble import ScratchRealization
+from fmu.ensemble.fileregistry import FileRegistry
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+def test_fileregistry():
+    """Test insertion, replacement and lookup in the file registry"""
+    registry = FileRegistry()
+    assert not len(registry)
+    assert list(registry.to_dataframe().columns) == FileRegistry.COLUMNS
+
+    registry.add(
+        {
+            "FULLPATH": "/foo/STATUS",
+            "FILETYPE": "STATUS",
+            "LOCALPATH": "STATUS",
+            "BASENAME": "STATUS",
+        }
+    )
+    registry.add(
+        {
+            "FULLPATH": "/foo/eclipse/model/FOO.UNSMRY",
+            "FILETYPE": "UNSMRY",
+            "LOCALPATH": "eclipse/model/FOO.UNSMRY",
+            "BASENAME": "FOO.UNSMRY",
+            "GRID": "simgrid",
+        }
+    )
+    assert len(registry) == 2
+    assert "/foo/STATUS" in registry
+    assert registry.has_localpath("eclipse/model/FOO.UNSMRY")
+    assert registry.by_localpath("STATUS")["FULLPATH"] == "/foo/STATUS"
+    assert len(registry.by_filetype("UNSMRY")) == 1
+    assert not registry.by_filetype("INIT")
+
+    files = registry.to_dataframe()
+    assert list(files.columns) == FileRegistry.COLUMNS + ["GRID"]
+    assert len(files[files["GRID"] == "simgrid"]) == 1
+
+    # Rediscovery without metadata replaces the row:
+    registry.add(
+        {
+            "FULLPATH": "/foo/eclipse/model/FOO.UNSMRY",
+            "FILETYPE": "UNSMRY",
+            "LOCALPATH": "eclipse/model/FOO.UNSMRY",
+            "BASENAME": "FOO.UNSMRY",
+        }
+    )
+    assert len(registry) == 2
+    assert registry.to_dataframe()["GRID"].isnull().all()
+    assert list(registry.to_dataframe()["LOCALPATH"]) == [
+        "STATUS",
+        "eclipse/model/FOO.UNSMRY",
+    ]
+    assert len(FileRegistry.from_dataframe(files)) == 2
+
+    registry.remove("/foo/eclipse/model/FOO.UNSMRY")
+    assert not registry.by_filetype("UNSMRY")
+    assert not registry.has_localpath("eclipse/model/FOO.UNSMRY")
+    assert len(registry) == 1
+
+
+def test_realization_files():
+    """Test that the files dataframe reflects the registry,
+    and that assigning to it replaces the registry"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    realdir = os.path.join(testdir, "data/testensemble-reek001", "realization-0/iter-0")
+    real = ScratchRealization(realdir)
+    files = real.files
+    assert "parameters.txt" in files["LOCALPATH"].values
+
+    # Modifying the returned dataframe has no effect:
+    files.drop(files.index, inplace=True)
+    assert len(real.files) == 4
+
+    # unless it is assigned back:
+    real.files = files
+    assert real.files.empty
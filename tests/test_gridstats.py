@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import pytest
+
+from ecl import EclDataType
+from ecl.eclfile import EclKW
+
+from fmu.ensemble import etc
+from fmu.ensemble import ScratchEnsemble
+from fmu.ensemble.gridstats import CellStats, CellQuantiles
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+def test_cellstats():
+    """Test the streaming cell statistics against numpy"""
+    rng = np.random.RandomState(4)
+    values = rng.rand(6, 10) * 100
+    active = rng.rand(6, 10) > 0.3
+    active[:, 0] = False  # A cell never active
+    active[:, 1] = True
+
+    stats = CellStats(10)
+    for realvalues, realactive in zip(values, active):
+        stats.add(realvalues, realactive)
+
+    assert len(stats) == 10
+    assert list(stats.count) == list(active.sum(axis=0))
+    masked = np.ma.masked_array(values, mask=~active)
+    assert np.allclose(stats.mean[1:], masked.mean(axis=0)[1:])
+    assert np.allclose(stats.std[1:], masked.std(axis=0)[1:])
+    assert stats.mean[0] == 0
+    assert stats.std[0] == 0
+
+
+@pytest.mark.parametrize("maxbytes", [None, 200])
+def test_cellquantiles(maxbytes):
+    """Test blockwise cell quantiles, in memory and in a temporary file"""
+    rng = np.random.RandomState(5)
+    values = rng.rand(7, 25) * 100
+    active = rng.rand(7, 25) > 0.3
+    active[:, 0] = False
+
+    with CellQuantiles(25, 7, maxbytes=maxbytes) as cellquantiles:
+        for realvalues, realactive in zip(values, active):
+            cellquantiles.add(realvalues, realactive)
+        assert ("on disk" in repr(cellquantiles)) == (maxbytes is not None)
+        p10, p50, p90 = cellquantiles.quantiles([0.1, 0.5, 0.9])
+        with pytest.raises(ValueError):
+            cellquantiles.add(values[0], active[0])
+
+    masked = np.where(active, values, np.nan)
+    assert np.allclose(p10[1:], np.nanpercentile(masked, 10, axis=0)[1:])
+    assert np.allclose(p50[1:], np.nanmedian(masked, axis=0)[1:])
+    assert np.allclose(p90[1:], np.nanpercentile(masked, 90, axis=0)[1:])
+    assert p50[0] == 0
+
+
+class _GridRealization(object):
+    """Stand-in for a ScratchRealization with one INIT keyword,
+    counting the reads"""
+
+    def __init__(self, values, active):
+        self.values = values
+        self.actnum = EclKW("ACTNUM", len(active), EclDataType.ECL_INT)
+        self.actnum.numpy_view()[:] = active
+        self.reads = 0
+
+    def get_global_init_keyword(self, prop):
+        self.reads += 1
+        eclkw = EclKW(prop, len(self.values), EclDataType.ECL_FLOAT)
+        eclkw.numpy_view()[:] = np.where(self.actnum.numpy_view(), self.values, 0)
+        return eclkw
+
+
+@pytest.mark.parametrize("workers", [None, 3])
+def test_keyword_agg(workers):
+    """Test that moments and quantiles are computed in one read
+    of each realization"""
+    rng = np.random.RandomState(6)
+    values = rng.rand(6, 20)
+    active = rng.rand(6, 20) > 0.2
+    ens = ScratchEnsemble("gridstats")
+    ens._realizations = {
+        realidx: _GridRealization(values[realidx], active[realidx])
+        for realidx in range(6)
+    }
+    ens._global_size = 20
+
+    aggregated = ens._keyword_agg(
+        "PORO", ["mean", "std", "p10", "median"], workers=workers
+    )
+    assert all(real.reads == 1 for real in ens._realizations.values())
+    masked = np.where(active, values, np.nan)
+    assert np.allclose(aggregated["mean"], np.nan_to_num(np.nanmean(masked, axis=0)))
+    assert np.allclose(aggregated["std"], np.nan_to_num(np.nanstd(masked, axis=0)))
+    assert np.allclose(
+        aggregated["p10"], np.nan_to_num(np.nanpercentile(masked, 10, axis=0))
+    )
+    assert np.allclose(
+        aggregated["median"], np.nan_to_num(np.nanmedian(masked, axis=0))
+    )
@@ -16,6 +16,7 @@ import pytest
 
 from fmu.ensemble import etc
 from fmu.ensemble import Observations, ScratchRealization, ScratchEnsemble, EnsembleSet
+from fmu.ensemble import VirtualEnsemble, VirtualRealization
 
 fmux = etc.Interaction()
 logger = fmux.basiclogger(__name__, level="WARNING")
@@ -42,9 +43,27 @@ def test_observation_import(tmp="TMP"):
     assert len(obs["smry"]) == 7
     assert len(obs["rft"]) == 2
 
+    # Every smry date is one observation, rft is not counted:
+    assert len(obs) == 21
+    obstable = obs.observation_table()
+    assert len(obstable) == 21
+    assert set(obstable["OBSTYPE"]) == {"smry"}
+    assert obstable["OBSKEY"].iloc[0] == "WBP4:OP_1"
+    assert obstable["MEASERROR"].iloc[0] == 4
+
     assert isinstance(obs["smry"], list)
     assert isinstance(obs["rft"], list)
 
+    # Observation sets with only rft observations are not empty:
+    assert not Observations({"rft": obs["rft"]}).empty
+
+    # Modifying the observations directly is picked up:
+    smryunits = obs["smry"]
+    obs.observations["smry"] = smryunits[0:1]
+    assert len(obs.observation_table()) == len(smryunits[0]["observations"])
+    obs.observations["smry"] = smryunits
+    assert len(obs.observation_table()) == 21
+
     # Dump back to disk
     if not os.path.exists(tmp):
         os.mkdir(tmp)
@@ -228,6 +247,17 @@ def test_smry():
     assert mismatch.L1.sum() > 0
     assert mismatch.L2.sum() > 0
 
+    # The batched extraction of summary data must give the
+    # same as extracting each observation date by itself:
+    for _, row in mismatch[mismatch["OBSTYPE"] == "smry"].iterrows():
+        simvalue = real.get_smry(time_index=[row["DATE"]], column_keys=[row["OBSKEY"]])[
+            row["OBSKEY"]
+        ].values[0]
+        assert row["SIMVALUE"] == pytest.approx(simvalue)
+        assert row["MISMATCH"] == pytest.approx(simvalue - row["OBSVALUE"])
+        assert row["SIGN"] == np.sign(row["MISMATCH"])
+        assert row["L2"] == row["MISMATCH"] ** 2
+
     # This should work, but either the observation object
     # must do the smry interpolation in dataframes, or
     # the virtual realization should implement get_smry()
@@ -432,6 +462,106 @@ def test_vens_mismatch():
     assert 0 in mismatch_subset["REAL"].unique()
 
 
+def test_vens_mismatch_processpool():
+    """Test mismatch for a virtualized ensemble in worker processes"""
+    concurrent = pytest.importorskip("concurrent.futures")
+    vens = VirtualEnsemble(name="processpool")
+    for realidx in range(4):
+        vreal = VirtualRealization()
+        vreal.append("parameters.txt", pd.DataFrame({"FOO": [float(realidx)]}))
+        vens.add_realization(vreal, realidx=realidx)
+    obs = Observations(
+        {"txt": [{"localpath": "parameters.txt", "key": "FOO", "value": 1}]}
+    )
+    with concurrent.ProcessPoolExecutor(max_workers=2) as executor:
+        mismatch = obs.mismatch(vens, executor=executor)
+    pd.testing.assert_frame_equal(mismatch, obs.mismatch(vens))
+    assert list(mismatch["MISMATCH"]) == [-1.0, 0.0, 1.0, 2.0]
+
+
+def test_compiled_once(monkeypatch):
+    """Test that the observations are checked for modifications once
+    per computation, not once per realization"""
+    from fmu.ensemble import observations
+
+    vens = VirtualEnsemble(name="compiledonce")
+    for realidx in range(4):
+        vreal = VirtualRealization()
+        vreal.append("parameters.txt", pd.DataFrame({"FOO": [float(realidx)]}))
+        vens.add_realization(vreal, realidx=realidx)
+    obs = Observations(
+        {"txt": [{"localpath": "parameters.txt", "key": "FOO", "value": 1}]}
+    )
+    digests = []
+
+    def counting_digest(observationdict):
+        digests.append(observationdict)
+        return digest(observationdict)
+
+    digest = observations._observations_digest
+    monkeypatch.setattr(observations, "_observations_digest", counting_digest)
+    obs.mismatch(vens)
+    assert len(digests) == 1
+    obs.misfit(vens)
+    assert len(digests) == 2
+    assert len(obs) == 1
+
+
+def test_misfit_unknown_observation(monkeypatch):
+    """Test that mismatches not matching an observation give an error
+    in misfit, and are not put in place of another observation"""
+    vens = VirtualEnsemble(name="unknownobs")
+    for realidx in range(2):
+        vreal = VirtualRealization()
+        vreal.append("parameters.txt", pd.DataFrame({"FOO": [float(realidx)]}))
+        vens.add_realization(vreal, realidx=realidx)
+    obs = Observations(
+        {"txt": [{"localpath": "parameters.txt", "key": "FOO", "value": 1}]}
+    )
+    mismatch = obs.mismatch(vens)
+    bogus = mismatch.iloc[0:1].assign(OBSKEY="parameters.txt/BOGUS")
+    monkeypatch.setattr(
+        obs,
+        "_mismatch",
+        lambda *args, **kwargs: pd.concat([mismatch, bogus], ignore_index=True),
+    )
+    with pytest.raises(ValueError):
+        obs.misfit(vens)
+
+
+def test_smry_nan_sign():
+    """Test that missing simulated values give zero sign in the mismatch"""
+    vens = VirtualEnsemble(name="nansign")
+    for realidx in range(2):
+        vreal = VirtualRealization()
+        vreal.append(
+            "unsmry--yearly",
+            pd.DataFrame(
+                {
+                    "DATE": pd.to_datetime(["2000-01-01", "2001-01-01"]),
+                    "FOPT": [np.nan, np.nan] if realidx else [1.0, 5.0],
+                }
+            ),
+        )
+        vens.add_realization(vreal, realidx=realidx)
+    obs = Observations(
+        {
+            "smry": [
+                {
+                    "key": "FOPT",
+                    "observations": [
+                        {"date": datetime.date(2000, 1, 1), "value": 2, "error": 1},
+                        {"date": datetime.date(2001, 1, 1), "value": 2, "error": 1},
+                    ],
+                }
+            ]
+        }
+    )
+    mismatch = obs.mismatch(vens)
+    assert list(mismatch["SIGN"]) == [-1, 1, 0, 0]
+    assert mismatch[mismatch["REAL"] == 1]["MISMATCH"].isnull().all()
+
+
 def test_ens_failedreals():
     """Ensure we can calculate mismatch where some realizations
     do not have UNSMRY data"""
@@ -465,6 +595,7 @@ def test_ens_failedreals():
     ens.find_files("eclipse/model/*UNSMRY")
     real3files = ens[3].files
     real3files.loc[real3files["FILETYPE"] == "UNSMRY", "FULLPATH"] = "FOO"
+    ens[3].files = real3files
 
     # Check that we only have EclSum for 2 and not for 3:
     assert ens[2].get_eclsum()
@@ -528,6 +659,18 @@ def test_ensset_mismatch():
     mis_pr = obs_pr.mismatch(ensset)
     assert len(mis_pr) == 10
 
+    # Concurrent computation gives the same result, in the same order:
+    from concurrent.futures import ProcessPoolExecutor
+
+    pd.testing.assert_frame_equal(mis_pr, obs_pr.mismatch(ensset, workers=3))
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pd.testing.assert_frame_equal(
+            mis_pr, obs_pr.mismatch(ensset, executor=executor)
+        )
+    pd.testing.assert_frame_equal(
+        obs_pr.mismatch(iter0), obs_pr.mismatch(iter0, workers=2)
+    )
+
     # We should also be able to input dates as strings, and they
     # should be attempted parsed to datetime.date:
     obs_pr = Observations(
@@ -617,6 +760,7 @@ def test_virtual_observations():
         # Create empty observation object
         obs = Observations({})
         obs.load_smry(virtreal, summaryvector, time_index="yearly")
+        assert len(obs) == len(virtreal.get_df("unsmry--yearly"))
 
         # Calculate how far each realization is from this observation set
         # (only one row pr. realization, as FOPTH is only one observation unit)
@@ -630,3 +774,94 @@ def test_virtual_observations():
     assert representative_realizations["meanrealization"] == 4
     assert representative_realizations["p90realization"] == 2
     assert representative_realizations["p10realization"] == 1
+
+
+def test_misfit():
+    """Test misfit calculation for ensembles, with and without covariances"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+    ens = ScratchEnsemble(
+        "test", testdir + "/data/testensemble-reek001/" + "realization-*/iter-0/"
+    )
+    obs = Observations(
+        {
+            "smry": [
+                {
+                    "key": "FOPT",
+                    "observations": [
+                        {"date": "2001-01-01", "error": 100000, "value": 1000000},
+                        {"date": "2002-01-01", "error": 200000, "value": 2000000},
+                    ],
+                }
+            ],
+            "txt": [{"localpath": "parameters.txt", "key": "FWL", "value": 1700}],
+        }
+    )
+    obstable = obs.observation_table()
+    assert len(obstable) == 3
+    assert obstable["LABEL"].is_unique
+
+    misfit = obs.misfit(ens)
+    assert list(misfit.columns) == ["REAL", "MISFIT"]
+    assert len(misfit) == len(ens)
+
+    # Compare with the sum over the mismatch table:
+    mismatch = obs.mismatch(ens)
+    manual = (
+        (mismatch["L2"] / mismatch["MEASERROR"] ** 2).groupby(mismatch["REAL"]).sum()
+    )
+    misfit = misfit.set_index("REAL")["MISFIT"]
+    assert np.allclose(misfit.loc[manual.index].values, manual.values)
+    for realidx, real in ens._realizations.items():
+        assert obs.misfit(real) == pytest.approx(misfit.loc[realidx])
+        assert obs._realization_misfit(real) == pytest.approx(misfit.loc[realidx])
+
+    # Diagonal covariance, as vector or matrix:
+    variances = obstable["MEASERROR"].values.astype(float) ** 2
+    diagmisfit = obs.misfit(ens, covariance=variances).set_index("REAL")["MISFIT"]
+    assert np.allclose(diagmisfit.values, misfit.values)
+    covariance = np.diag(variances)
+    diagmisfit = obs.misfit(ens, covariance=covariance).set_index("REAL")["MISFIT"]
+    assert np.allclose(diagmisfit.values, misfit.values)
+
+    # Correlated errors:
+    covariance[0, 1] = covariance[1, 0] = 0.5 * 100000 * 200000
+    corrmisfit = obs.misfit(ens, covariance=covariance).set_index("REAL")["MISFIT"]
+    for realidx in manual.index:
+        realmismatch = mismatch[mismatch["REAL"] == realidx]
+        residuals = np.zeros(3)  # Missing observations count as zero
+        for _, row in realmismatch.iterrows():
+            if row["OBSTYPE"] == "smry":
+                obsidx = list(obstable["DATE"]).index(row["DATE"])
+            else:
+                obsidx = 2
+            residuals[obsidx] = row["MISMATCH"]
+        assert corrmisfit.loc[realidx] == pytest.approx(
+            residuals.dot(np.linalg.solve(covariance, residuals))
+        )
+
+    with pytest.raises(ValueError):
+        obs.misfit(ens, covariance=np.diag([1, 1]))
+    with pytest.raises(ValueError):
+        obs.misfit(ens, covariance=np.ones(2))
+    with pytest.raises(ValueError):
+        obs.misfit(ens, covariance=np.ones((3, 2)))
+    with pytest.raises(ValueError):
+        obs.misfit(ens, covariance=-np.eye(3))
+
+    zeroerror = Observations(
+        {
+            "smry": [
+                {
+                    "key": "FOPT",
+                    "observations": [{"date": "2001-01-01", "error": 0, "value": 0}],
+                }
+            ]
+        }
+    )
+    with pytest.raises(ValueError):
+        zeroerror.misfit(ens)
+    assert (zeroerror.misfit(ens, defaulterrors=True)["MISFIT"] > 0).all()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import gc
+import weakref
+
+import pytest
+
+from fmu.ensemble import etc
+from fmu.ensemble.parallel import parallel_map
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+class _Result(object):
+    """Stand-in for a large result, for tracking its lifetime"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _square(value):
+    if value < 0:
+        raise ValueError("Negative")
+    return _Result(value * value)
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parallel_map_bounded(ordered):
+    """Test that results are released once consumed"""
+    alive = weakref.WeakSet()
+    results = {}
+    maxalive = 0
+    for item, result in parallel_map(_square, range(20), workers=4, ordered=ordered):
+        alive.add(result)
+        results[item] = result.value
+        del result
+        gc.collect()
+        maxalive = max(maxalive, len(alive))
+    assert results == {item: item * item for item in range(20)}
+    assert maxalive <= 5
+
+    if ordered:
+        assert [
+            item for item, _ in parallel_map(_square, range(20), workers=4)
+        ] == list(range(20))
+
+    with pytest.raises(ValueError):
+        list(parallel_map(_square, [1, -1, 2], workers=2, ordered=ordered))
+
+    # Items are taken from generators as they are submitted
+    taken = []
+
+    def generate():
+        for item in range(20):
+            taken.append(item)
+            yield item
+
+    for count, _ in enumerate(
+        parallel_map(_square, generate(), workers=4, ordered=ordered)
+    ):
+        assert len(taken) <= count + 5
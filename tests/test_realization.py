@@ -345,6 +345,87 @@ def test_datenormalization():
     assert str(real.get_df("unsmry--yearly")["DATE"].values[-1]) == "2004-01-01"
 
 
+def test_lazy_realization():
+    """Test that lazy realizations defer parsing of default files"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    realdir = os.path.join(testdir, "data/testensemble-reek001", "realization-0/iter-0")
+    real = ensemble.ScratchRealization(realdir)
+    lazyreal = ensemble.ScratchRealization(realdir, lazy=True)
+    assert lazyreal.index == 0
+    assert not lazyreal._defaults_loaded
+
+    # First access to the data parses the defaults:
+    assert lazyreal.parameters == real.parameters
+    assert lazyreal._defaults_loaded
+    assert sorted(lazyreal.keys()) == sorted(real.keys())
+    assert lazyreal["OK"] == real["OK"]
+    pd.testing.assert_frame_equal(lazyreal.get_df("STATUS"), real.get_df("STATUS"))
+    assert len(lazyreal.files) == len(real.files) == 4
+
+    # Filtering triggers parsing:
+    lazyreal = ensemble.ScratchRealization(realdir, lazy=True)
+    assert lazyreal.contains("STATUS")
+    lazyreal = ensemble.ScratchRealization(realdir, lazy=True)
+    assert "parameters.txt" in lazyreal.to_virtual().keys()
+
+
+def test_cachedir(tmp="TMP"):
+    """Test that parsed file contents are cached on disk, and
+    that changed files are reparsed"""
+    testdir = os.path.dirname(os.path.abspath(__file__))
+    realdir = os.path.join(testdir, "data/testensemble-reek001", "realization-0/iter-0")
+    copyrealdir = os.path.join(tmp, "cachetest/realization-0/iter-0")
+    cachedir = os.path.join(tmp, "cachetest/cache")
+    if os.path.exists(os.path.join(tmp, "cachetest")):
+        shutil.rmtree(os.path.join(tmp, "cachetest"))
+    shutil.copytree(realdir, copyrealdir)
+
+    real = ensemble.ScratchRealization(realdir)
+    vol_df = real.load_csv("share/results/volumes/simulator_volume_fipnum.csv")
+
+    cachedreal = ensemble.ScratchRealization(copyrealdir, cachedir=cachedir)
+    cachedreal.load_csv("share/results/volumes/simulator_volume_fipnum.csv")
+    # STATUS, OK, parameters.txt and the csv file:
+    assert len(os.listdir(cachedir)) == 4
+
+    # Reopen, now from the cache:
+    cachedreal = ensemble.ScratchRealization(copyrealdir, cachedir=cachedir)
+    pd.testing.assert_frame_equal(
+        cachedreal.load_csv("share/results/volumes/simulator_volume_fipnum.csv"),
+        vol_df,
+    )
+    pd.testing.assert_frame_equal(cachedreal["STATUS"], real["STATUS"])
+    assert cachedreal.parameters.keys() == real.parameters.keys()
+    assert cachedreal.parameters["RMS_SEED"] == real.parameters["RMS_SEED"]
+    assert cachedreal["OK"] == real["OK"]
+    assert len(os.listdir(cachedir)) == 4
+
+    # Different parse arguments are cached separately:
+    cachedreal.load_txt("parameters.txt", convert_numeric=False, force_reread=True)
+    assert isinstance(cachedreal.parameters["RMS_SEED"], str)
+    assert len(os.listdir(cachedir)) == 5
+
+    # Changed files must be reparsed:
+    with open(os.path.join(copyrealdir, "parameters.txt"), "a") as paramfile:
+        paramfile.write("CACHETEST 42\n")
+    cachedreal = ensemble.ScratchRealization(copyrealdir, cachedir=cachedir)
+    assert cachedreal.parameters["CACHETEST"] == 42
+
+    # Ensembles pass the cache directory on:
+    ens = ensemble.ScratchEnsemble(
+        "cachetest",
+        os.path.join(tmp, "cachetest/realization-*/iter-0"),
+        cachedir=cachedir,
+    )
+    assert ens.parameters["CACHETEST"].values[0] == 42
+    assert len(os.listdir(cachedir)) == 6
+
+
 def test_singlereal_ecl(tmp="TMP"):
     """Test Eclipse specific functionality for realizations"""
 
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Testing fmu-ensemble."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fmu.ensemble import etc
+from fmu.ensemble import SummaryCube
+from fmu.ensemble.summarycube import smry_stats, resample_smry
+
+fmux = etc.Interaction()
+logger = fmux.basiclogger(__name__, level="WARNING")
+
+if not fmux.testsetup():
+    raise SystemExit()
+
+
+def test_summarycube():
+    """Test the axes and the conversions of a SummaryCube"""
+    dates = [datetime.date(2000, 1, 1), datetime.date(2001, 1, 1)]
+    values = np.arange(12, dtype=float).reshape(3, 2, 2)
+    values[2, 1, :] = np.nan  # Realization 4 lacks the last date
+    cube = SummaryCube(values, [0, 1, 4], dates, ["FOPT", "FWPT"])
+
+    assert cube.shape == (3, 2, 2)
+    assert len(cube) == 2
+    assert "FOPT" in cube
+    assert cube.keys() == ["FOPT", "FWPT"]
+
+    fwpt = cube["FWPT"]
+    assert list(fwpt.columns) == [0, 1, 4]
+    assert fwpt.index.name == "DATE"
+    assert fwpt.loc["2001-01-01", 1] == 7
+    assert np.isnan(fwpt.loc["2001-01-01", 4])
+
+    stacked = cube.to_frame()
+    assert list(stacked.columns) == ["REAL", "DATE", "FOPT", "FWPT"]
+    assert len(stacked) == 5
+    assert len(cube.to_frame(dropna=False)) == 6
+
+    with pytest.raises(KeyError):
+        cube["FOO"]
+    with pytest.raises(ValueError):
+        SummaryCube(values, [0, 1], dates, ["FOPT", "FWPT"])
+
+
+def test_smry_stats():
+    """Test the one-pass statistics engine against pandas"""
+    rng = np.random.RandomState(1)
+    dates = pd.date_range("2000-01-01", periods=6, freq="MS")
+    dframe = pd.DataFrame(
+        {
+            "REAL": np.repeat(np.arange(7), len(dates)),
+            "DATE": np.tile(dates, 7),
+            "FOPT": rng.rand(7 * len(dates)),
+            "FWPT": rng.rand(7 * len(dates)),
+        }
+    )
+    dframe.loc[::5, "FOPT"] = np.nan
+    # Realization 6 does not have the first date:
+    dframe = dframe.drop(6 * len(dates))
+
+    stats = smry_stats(dframe, [10, 37, 90])
+    assert list(stats.index.levels[0]) == [
+        "mean",
+        "p10",
+        "p37",
+        "p90",
+        "maximum",
+        "minimum",
+    ]
+    assert stats.index.names == ["STATISTIC", "DATE"]
+    grouped = dframe.drop(columns="REAL").groupby("DATE")
+    pd.testing.assert_frame_equal(stats.loc["mean"], grouped.mean(), check_names=False)
+    pd.testing.assert_frame_equal(
+        stats.loc["maximum"], grouped.max(), check_names=False
+    )
+    pd.testing.assert_frame_equal(
+        stats.loc["minimum"], grouped.min(), check_names=False
+    )
+    for quantile in [10, 37, 90]:
+        pd.testing.assert_frame_equal(
+            stats.loc["p" + str(quantile)],
+            grouped.quantile(quantile / 100.0),
+            check_names=False,
+        )
+    inverted = smry_stats(dframe, [10], invert_quantiles=True)
+    pd.testing.assert_frame_equal(
+        inverted.loc["p10"], grouped.quantile(0.9), check_names=False
+    )
+
+    # The cube gives the same statistics:
+    values = np.full((7, len(dates), 2), np.nan)
+    values[dframe["REAL"].values, dates.get_indexer(dframe["DATE"])] = dframe[
+        ["FOPT", "FWPT"]
+    ].values
+    cube = SummaryCube(values, range(7), dates, ["FOPT", "FWPT"])
+    pd.testing.assert_frame_equal(cube.stats([10, 37, 90]), stats)
+
+
+def test_resample_smry():
+    """Test the vectorized resampler against pandas interpolation"""
+    rng = np.random.RandomState(2)
+    dates = pd.date_range("2000-01-01", periods=4, freq="YS")
+    dframe = pd.DataFrame(
+        {
+            "REAL": np.repeat([3, 1, 2], len(dates)),
+            "DATE": np.tile(dates, 3),
+            "FOPT": np.cumsum(rng.rand(3 * len(dates))),
+            "FOPR": rng.rand(3 * len(dates)),
+        }
+    )
+    # Realization 2 lacks the last date, and one value:
+    dframe = dframe.drop(3 * len(dates) - 1)
+    dframe.loc[1, "FOPT"] = np.nan
+    time_index = list(pd.date_range("1999-07-01", "2003-07-01", freq="QS"))
+
+    resampled = resample_smry(dframe, ["FOPT", "FOPR"], [True, False], time_index)
+    assert list(resampled.columns) == ["DATE", "FOPT", "FOPR", "REAL"]
+    assert list(resampled["REAL"].unique()) == [3, 1, 2]
+    assert len(resampled) == 3 * len(time_index)
+
+    for realidx in [3, 1, 2]:
+        smry = dframe[dframe["REAL"] == realidx].set_index("DATE")
+        smry = smry[["FOPT", "FOPR"]].append(
+            pd.DataFrame(index=pd.DatetimeIndex(time_index)), sort=False
+        )
+        smry = smry[~smry.index.duplicated(keep="first")].sort_index()
+        smry["FOPT"] = (
+            smry["FOPT"]
+            .interpolate(method="time")
+            .fillna(method="ffill")
+            .fillna(method="bfill")
+        )
+        smry["FOPR"] = smry["FOPR"].fillna(method="bfill").fillna(value=0)
+        real = resampled[resampled["REAL"] == realidx].set_index("DATE")
+        pd.testing.assert_frame_equal(
+            real[["FOPT", "FOPR"]],
+            smry.loc[time_index],
+            check_names=False,
+        )
@@ -10,7 +10,8 @@ import pandas as pd
 import pytest
 
 from fmu.ensemble import etc
-from fmu.ensemble import ScratchEnsemble
+from fmu.ensemble import ScratchEnsemble, VirtualEnsemble
+from fmu.ensemble.datastore import HAVE_PYARROW, read_manifest
 
 fmux = etc.Interaction()
 logger = fmux.basiclogger(__name__, level="WARNING")
@@ -237,3 +238,184 @@ def test_volumetric_rates():
     assert "DATE" in vol_rates
     assert "FOPR" in vol_rates
     assert len(vol_rates) == 25
+
+
+def test_todisk(tmp="TMP"):
+    """Test that we can write VirtualEnsembles to disk and load them back"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    reekensemble = ScratchEnsemble(
+        "reektest", testdir + "/data/testensemble-reek001/" + "realization-*/iter-0"
+    )
+    reekensemble.load_smry(time_index="yearly", column_keys=["F*"])
+    reekensemble.load_scalar("npv.txt")
+    reekensemble.load_txt("outputs.txt")
+    vens = reekensemble.to_virtual(name="reektest")
+
+    if not os.path.exists(tmp):
+        os.mkdir(tmp)
+    vensdir = os.path.join(tmp, "vens_reek001")
+    fileformats = ["csv"]
+    if HAVE_PYARROW:
+        fileformats.append("parquet")
+    for fileformat in fileformats:
+        vens.to_disk(vensdir, delete=True, fileformat=fileformat)
+        assert os.path.exists(os.path.join(vensdir, "_manifest.json"))
+        assert list(read_manifest(vensdir)["keys"]) == sorted(vens.keys())
+        with pytest.raises(IOError):
+            vens.to_disk(vensdir)
+
+        fromdisk = VirtualEnsemble()
+        fromdisk.load_disk(vensdir)
+        assert fromdisk.name == "reektest"
+        assert set(fromdisk.keys()) == set(vens.keys())
+        assert sorted(fromdisk.realindices) == sorted(vens.realindices)
+
+        # Nothing is read before it is needed:
+        assert not any([fromdisk.data.is_loaded(key) for key in fromdisk.keys()])
+        smry = fromdisk.get_df("unsmry--yearly")
+        assert fromdisk.data.is_loaded("share/results/tables/unsmry--yearly.csv")
+        assert not fromdisk.data.is_loaded("parameters.txt")
+
+        for key in vens.keys():
+            # CSV does not preserve empty strings nor mixed types, so
+            # only the shape is checked for tables with strings
+            assert list(fromdisk.get_df(key).columns) == list(vens.get_df(key).columns)
+            assert len(fromdisk.get_df(key)) == len(vens.get_df(key))
+        for key in ["unsmry--yearly", "parameters.txt", "outputs.txt"]:
+            pd.testing.assert_frame_equal(
+                fromdisk.get_df(key), vens.get_df(key).reset_index(drop=True)
+            )
+        assert smry["DATE"].dtype == vens.get_df("unsmry--yearly")["DATE"].dtype
+        pd.testing.assert_frame_equal(
+            fromdisk.agg("mean").get_df("unsmry--yearly"),
+            vens.agg("mean").get_df("unsmry--yearly"),
+        )
+
+    eager = VirtualEnsemble("eager")
+    eager.load_disk(vensdir, lazy=False)
+    assert eager.name == "eager"
+    assert all([eager.data.is_loaded(key) for key in eager.keys()])
+
+    with pytest.raises(IOError):
+        VirtualEnsemble().load_disk(tmp)
+
+
+def test_add_realizations():
+    """Test adding realizations to a VirtualEnsemble, one by one
+    and in batches"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    reekensemble = ScratchEnsemble(
+        "reektest", testdir + "/data/testensemble-reek001/" + "realization-*/iter-0"
+    )
+    reekensemble.load_scalar("npv.txt")
+    reekensemble.load_txt("outputs.txt")
+    realindices = sorted(reekensemble._realizations.keys())
+    realizations = [reekensemble[realidx] for realidx in realindices]
+
+    onebyone = VirtualEnsemble("onebyone")
+    for realization in realizations:
+        onebyone.add_realization(realization)
+    batch = VirtualEnsemble("batch")
+    batch.add_realizations(realizations)
+    assert sorted(batch.realindices) == realindices
+    assert set(batch.keys()) == set(onebyone.keys())
+    for key in batch.keys():
+        pd.testing.assert_frame_equal(batch.get_df(key), onebyone.get_df(key))
+
+    # The scratch realizations are not modified:
+    assert "REAL" not in realizations[0].get_df("parameters.txt")
+
+    with pytest.raises(ValueError):
+        batch.add_realizations(realizations[0:1])
+    with pytest.raises(ValueError):
+        VirtualEnsemble().add_realizations(realizations[0:1] * 2)
+    with pytest.raises(ValueError):
+        VirtualEnsemble().add_realizations([realizations[0].to_virtual()])
+
+    # Virtual realizations need explicit indices, also 0:
+    virtuals = VirtualEnsemble()
+    virtuals.add_realizations(
+        {0: realizations[1].to_virtual(), 10: realizations[2].to_virtual()}
+    )
+    assert sorted(virtuals.realindices) == [0, 10]
+    virtuals.add_realization(realizations[3].to_virtual(), realidx=0, overwrite=True)
+    assert sorted(virtuals.realindices) == [0, 10]
+    npv = virtuals.get_realization(0).get_df("npv.txt")
+    assert npv["npv.txt"] == realizations[3].get_df("npv.txt")
+
+    # ScratchEnsemble.filter() makes a VirtualEnsemble in one batch:
+    filtered = reekensemble.filter("npv.txt", inplace=False)
+    assert sorted(filtered.realindices) == realindices
+
+
+def test_realization_rows():
+    """Test that realizations are sliced correctly through the row index,
+    also after data is added, removed or replaced"""
+    if "__file__" in globals():
+        # Easen up copying test code into interactive sessions
+        testdir = os.path.dirname(os.path.abspath(__file__))
+    else:
+        testdir = os.path.abspath(".")
+
+    reekensemble = ScratchEnsemble(
+        "reektest", testdir + "/data/testensemble-reek001/" + "realization-*/iter-0"
+    )
+    reekensemble.load_txt("outputs.txt")
+    vens = reekensemble.to_virtual()
+    realindices = sorted(vens.realindices)
+
+    def check_slicing(vens):
+        for key in vens.keys():
+            data = vens.get_df(key)
+            for realidx in vens.realindices:
+                pd.testing.assert_frame_equal(
+                    vens._realization_frame(key, realidx),
+                    data[data["REAL"] == realidx],
+                )
+
+    check_slicing(vens)
+    outputs = vens.get_realization(realindices[1]).get_df("outputs.txt")
+    assert outputs == reekensemble[realindices[1]].get_df("outputs.txt")
+
+    vens.remove_realizations(realindices[0:2])
+    assert sorted(vens.realindices) == realindices[2:]
+    # The row positions for the old dataframes are dropped
+    assert not vens._realrows
+    check_slicing(vens)
+
+    vens.add_realizations({realindices[0]: reekensemble[realindices[0]]})
+    assert sorted(vens.realindices) == [realindices[0]] + realindices[2:]
+    check_slicing(vens)
+
+    # Replaced data is reindexed:
+    replaced = vens.get_df("parameters.txt").iloc[::-1].copy()
+    replaced["FWL"] = -replaced["REAL"]
+    vens.append("parameters.txt", replaced, overwrite=True)
+    check_slicing(vens)
+    assert (
+        vens.get_realization(realindices[2]).get_df("parameters.txt")["FWL"]
+        == -realindices[2]
+    )
+
+    # Data modified in place and set again is reindexed:
+    parameters = vens.data["parameters.txt"]
+    parameters.sort_values("REAL", inplace=True)
+    vens.data["parameters.txt"] = parameters
+    check_slicing(vens)
+    parameters.drop(parameters.index[0], inplace=True)
+    vens.data["parameters.txt"] = parameters
+    check_slicing(vens)
+
+    # So is data in a new datastore:
+    vens.data = {"parameters.txt": replaced.iloc[::-1]}
+    check_slicing(vens)
@@ -92,6 +92,7 @@ def test_virtual_todisk(tmp="TMP"):
         os.mkdir(tmp)
     print(os.path.join(tmp, "virtreal1"))
     vreal.to_disk(os.path.join(tmp, "virtreal1"), delete=True)
+    assert os.path.exists(os.path.join(tmp, "virtreal1/_manifest.json"))
     assert os.path.exists(os.path.join(tmp, "virtreal1/parameters.txt"))
     assert os.path.exists(os.path.join(tmp, "virtreal1/STATUS"))
     assert os.path.exists(
@@ -136,6 +137,37 @@ def test_virtual_fromdisk(tmp="TMP"):
     )
     assert real.get_df("npv.txt") == 3444
 
+    # The round trip is exact:
+    assert set(vreal.keys()) == set(real.keys())
+    pd.testing.assert_series_equal(
+        pd.Series(vreal.get_df("parameters.txt")),
+        pd.Series(real.get_df("parameters.txt")),
+    )
+    assert vreal.get_df("npv.txt") == real.get_df("npv.txt")
+    pd.testing.assert_frame_equal(
+        vreal.get_df("unsmry--yearly"), real.get_df("unsmry--yearly")
+    )
+    pd.testing.assert_frame_equal(vreal.get_df("STATUS"), real.get_df("STATUS"))
+
+    # Also through json:
+    fromjson = ensemble.VirtualRealization()
+    fromjson.load_json(real.to_virtual().to_json())
+    pd.testing.assert_series_equal(
+        pd.Series(fromjson.get_df("parameters.txt")),
+        pd.Series(real.get_df("parameters.txt")),
+    )
+    pd.testing.assert_frame_equal(
+        fromjson.get_df("unsmry--yearly"), real.get_df("unsmry--yearly")
+    )
+
+    # Directories without a manifest are loaded by guessing file types
+    os.remove(os.path.join(tmp, "virtreal2", "_manifest.json"))
+    legacy = ensemble.VirtualRealization("foo")
+    legacy.load_disk(os.path.join(tmp, "virtreal2"))
+    assert "unsmry--yearly.csv" in legacy.keys()
+    assert legacy.get_df("npv.txt") == 3444
+    assert legacy.get_df("parameters.txt")["FWL"] == real.get_df("parameters")["FWL"]
+
 
 def test_get_smry():
     """Check that we can to get_smry() on virtual realizations"""